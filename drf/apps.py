@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class DrfConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'drf'
+
+    def ready(self):
+        from drf import db_routers, signals  # noqa: F401
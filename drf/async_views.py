@@ -0,0 +1,124 @@
+from django.http import HttpResponse
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import status
+from rest_framework.exceptions import (
+    APIException, AuthenticationFailed, NotAuthenticated, NotFound)
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from drf.common_methods import TokenUser
+from drf.messages import JWTAuthentication, MessageViewSet
+from drf.models import Message
+from drf.search import FullTextSearchFilter
+from drf.serializers import MessageSerializer
+from drf.users import SwitchablePagination
+
+
+class AsyncAPIView(View):
+    """Minimal async counterpart of ``APIView`` for ASGI deployments.
+
+    Authenticates with ``JWTAuthentication.aauthenticate()``, parses and
+    renders with the configured DRF classes and turns ``APIException`` into
+    the same error bodies as DRF's exception handler. Like ``APIView`` it is
+    exempt from CSRF checks, as it only accepts bearer tokens.
+    """
+
+    authentication = JWTAuthentication()
+
+    @method_decorator(csrf_exempt)
+    async def dispatch(self, request, *args, **kwargs):
+        request = Request(request, parsers=[
+            parser() for parser in api_settings.DEFAULT_PARSER_CLASSES
+        ])
+        self.request = request
+        try:
+            # A claims token's user is verified but not loaded; handlers
+            # that need the row call aget_user().
+            request.user, _ = await self.authentication.aauthenticate(request)
+            return await super().dispatch(request, *args, **kwargs)
+        except APIException as exc:
+            return self.handle_exception(exc)
+
+    async def aget_user(self, request):
+        user = request.user
+        if type(user) is TokenUser:
+            user = await user.aload()
+        return user
+
+    def handle_exception(self, exc):
+        status_code = exc.status_code
+        if isinstance(exc, (NotAuthenticated, AuthenticationFailed)):
+            # JWTAuthentication has no authenticate_header(), so DRF
+            # answers these with 403 as well.
+            status_code = status.HTTP_403_FORBIDDEN
+        if isinstance(exc.detail, (list, dict)):
+            data = exc.detail
+        else:
+            data = {'detail': exc.detail}
+        return self.render(data, status_code)
+
+    def render(self, data, status_code=status.HTTP_200_OK):
+        renderer = api_settings.DEFAULT_RENDERER_CLASSES[0]()
+        return HttpResponse(
+            renderer.render(data), status=status_code,
+            content_type=renderer.media_type,
+        )
+
+
+class AsyncMessageListView(AsyncAPIView):
+    """Async ``GET``/``POST`` on messages, same contract as the viewset."""
+
+    pagination_class = SwitchablePagination
+    filter_backends = [FullTextSearchFilter]
+    search_fields = ['title', 'body']
+
+    # For ?pagination=cached, which calls it on the view.
+    get_cached_count = MessageViewSet.get_cached_count
+
+    async def get(self, request):
+        queryset = Message.objects.for_user(request.user.pk).order_by('id')
+        for backend in self.filter_backends:
+            queryset = backend().filter_queryset(request, queryset, self)
+
+        paginator = self.pagination_class()
+        page = await paginator.apaginate_queryset(queryset, request, self)
+        if page:
+            # Every row belongs to the user; set it instead of letting the
+            # (sync) related descriptor load it per row.
+            user = await self.aget_user(request)
+            for message in page:
+                message.user = user
+        serializer = MessageSerializer(
+            page, many=True, context={'request': request}
+        )
+        return self.render(
+            paginator.get_paginated_response(serializer.data).data
+        )
+
+    async def post(self, request):
+        serializer = MessageSerializer(
+            data=request.data, context={'request': request}
+        )
+        serializer.is_valid(raise_exception=True)
+        user = await self.aget_user(request)
+        message = await user.message_set.acreate(
+            **serializer.validated_data
+        )
+        return self.render(serializer.to_representation(message),
+                           status.HTTP_201_CREATED)
+
+
+class AsyncMessageDetailView(AsyncAPIView):
+    async def get(self, request, pk):
+        try:
+            message = await Message.objects.for_user(
+                request.user.pk
+            ).aget(pk=pk)
+        except Message.DoesNotExist:
+            raise NotFound('No Message matches the given query.')
+        message.user = await self.aget_user(request)
+        serializer = MessageSerializer(
+            message, context={'request': request}
+        )
+        return self.render(serializer.data)
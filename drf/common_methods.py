@@ -1,8 +1,14 @@
 from decouple import config
 from django.core.validators import validate_email
 from django.core.exceptions import ValidationError
+from django.db.models import F
+from django.utils import timezone
+from django.utils.functional import SimpleLazyObject, empty
+from rest_framework.exceptions import APIException, AuthenticationFailed
 import jwt
+from .db_routers import reading_from_replicas, replica_reads
 from .models import User
+from .token_cache import token_cache
 
 JWT_SECRET_KEY = config('JWT_SECRET_KEY')
 
@@ -11,9 +17,110 @@ class AuthorizeError(Exception):
     pass
 
 
-def create_jwt(email):
+class ConflictError(APIException):
+    status_code = 409
+    default_detail = 'user with this email already exists.'
+    default_code = 'conflict'
 
-    return jwt.encode({'email': email}, JWT_SECRET_KEY, algorithm="HS256")
+
+class TokenUser(SimpleLazyObject):
+    """User resolved from the ``uid``/``ver`` claims of a JWT.
+
+    ``pk`` and ``id`` come straight from the token; the row is only loaded
+    when any other attribute is accessed. ``authorization()`` checks the
+    token version before handing the user out (see ``verify()``).
+    """
+
+    is_authenticated = True
+    is_anonymous = False
+
+    def __init__(self, user_id, token_version):
+        def load():
+            user = User.objects.filter(pk=user_id).first()
+            if user is None and reading_from_replicas():
+                # The user may not have reached the replica yet.
+                with replica_reads(False):
+                    user = User.objects.filter(pk=user_id).first()
+            return self.check_version(user)
+
+        super().__init__(load)
+        self.__dict__['_user_id'] = user_id
+        self.__dict__['_token_version'] = token_version
+        self.__dict__['_verified'] = False
+
+    @property
+    def pk(self):
+        return self.__dict__['_user_id']
+
+    id = pk
+
+    @property
+    def token_version(self):
+        return self.__dict__['_token_version']
+
+    @property
+    def verified(self):
+        return self.__dict__['_verified']
+
+    def check_token_version(self, token_version):
+        if token_version is None or token_version != self.token_version:
+            raise AuthorizeError
+        token_cache.set_version(self.pk, token_version)
+        self.__dict__['_verified'] = True
+
+    def version_query(self):
+        return User.objects.filter(pk=self.pk).values_list(
+            'token_version', flat=True
+        )
+
+    def verify(self):
+        """Reject revoked tokens and deleted users.
+
+        The current version is cached per user in ``token_cache`` until the
+        user is saved or deleted, so this is mostly free.
+        """
+        token_version = token_cache.get_version(self.pk)
+        if token_version is None:
+            token_version = self.version_query().first()
+            if token_version is None and reading_from_replicas():
+                # The user may not have reached the replica yet.
+                with replica_reads(False):
+                    token_version = self.version_query().first()
+        self.check_token_version(token_version)
+
+    async def averify(self):
+        token_version = token_cache.get_version(self.pk)
+        if token_version is None:
+            token_version = await self.version_query().afirst()
+        self.check_token_version(token_version)
+
+    def check_version(self, user):
+        if user is None or user.token_version != self.token_version:
+            raise AuthenticationFailed('invalid jwt.')
+        return user
+
+    async def aload(self):
+        """Load the row from async code, where attribute access can't."""
+        if self._wrapped is empty:
+            self._wrapped = self.check_version(
+                await User.objects.filter(pk=self.pk).afirst()
+            )
+        return self._wrapped
+
+
+def create_jwt(email, user_id=None, token_version=0):
+    payload = {'email': email}
+    if user_id is not None:
+        payload['uid'] = user_id
+        payload['ver'] = token_version
+    return jwt.encode(payload, JWT_SECRET_KEY, algorithm="HS256")
+
+
+def adjust_message_count(user_id, delta):
+    User.objects.filter(pk=user_id).update(
+        message_count=F('message_count') + delta,
+        version=F('version') + 1, updated_at=timezone.now(),
+    )
 
 
 def valid_email(email):
@@ -26,21 +133,69 @@ def valid_email(email):
         return True, 'email is incorrect'
 
 
-def authorization(bearer_token):
+def decode_bearer_token(bearer_token):
+    """Everything authorization() can do without the database.
+
+    Returns ``(token, user, email)``: ``user`` is set for cached and
+    claims tokens, otherwise ``email`` still has to be looked up. The
+    ``TokenUser`` of a claims token that isn't cached yet is unverified.
+    """
     if bearer_token is None:
         raise AuthorizeError
 
+    token = bearer_token[7:]
+    user = token_cache.get(token)
+    if user is not None:
+        return token, user, None
+
     try:
         load_data = jwt.decode(
-            bearer_token[7:], JWT_SECRET_KEY, algorithms=["HS256"]
+            token, JWT_SECRET_KEY, algorithms=["HS256"]
             )
     except jwt.InvalidTokenError as e:
         raise AuthorizeError from e
 
+    user_id = load_data.get('uid')
+    if user_id is not None:
+        token_version = load_data.get('ver')
+        if not isinstance(user_id, int) or not isinstance(token_version, int):
+            raise AuthorizeError
+        return token, TokenUser(user_id, token_version), None
+
     error, _ = valid_email(load_data.get('email'))
     if error:
         raise AuthorizeError
-    objects = User.objects.filter(email=load_data.get('email'))
-    if not objects.exists():
+    return token, None, load_data.get('email')
+
+
+def authorization(bearer_token):
+    token, user, email = decode_bearer_token(bearer_token)
+    if isinstance(user, TokenUser) and not user.verified:
+        user.verify()
+        token_cache.set(token, user)
+    if user is not None:
+        return user
+    user = User.objects.filter(email=email).first()
+    if user is None and reading_from_replicas():
+        # The user may not have reached the replica yet.
+        with replica_reads(False):
+            user = User.objects.filter(email=email).first()
+    if user is None:
         raise AuthorizeError
-    return objects[0]
+    token_cache.set(token, user)
+    return user
+
+
+async def aauthorization(bearer_token):
+    token, user, email = decode_bearer_token(bearer_token)
+    if isinstance(user, TokenUser) and not user.verified:
+        await user.averify()
+        token_cache.set(token, user)
+    if user is not None:
+        return user
+    try:
+        user = await User.objects.aget(email=email)
+    except User.DoesNotExist as e:
+        raise AuthorizeError from e
+    token_cache.set(token, user)
+    return user
@@ -0,0 +1,167 @@
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from decouple import config
+from django.conf import settings
+from django.core import checks
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+REPLICA_STICKY_SECONDS = config(
+    'REPLICA_STICKY_SECONDS', default=5, cast=float
+)
+REPLICA_HEALTH_CHECK_INTERVAL = config(
+    'REPLICA_HEALTH_CHECK_INTERVAL', default=10, cast=float
+)
+# Must be shared by every worker, or a user's next read may go to a
+# replica that hasn't seen their write yet.
+REPLICA_PIN_CACHE_ALIAS = config(
+    'REPLICA_PIN_CACHE_ALIAS', default='replica-pins'
+)
+
+_replica_reads = ContextVar('replica_reads', default=False)
+
+
+def use_replicas(enabled):
+    """Let reads in the current context go to replicas (or stop them)."""
+    _replica_reads.set(enabled)
+
+
+@contextmanager
+def replica_reads(enabled=True):
+    token = _replica_reads.set(enabled)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+def reading_from_replicas():
+    return _replica_reads.get() and bool(settings.DATABASE_REPLICAS)
+
+
+def pin_key(user_id):
+    return 'drf:pinned:%s' % user_id
+
+
+def pin_cache():
+    return caches[REPLICA_PIN_CACHE_ALIAS]
+
+
+def pin_user(user_id):
+    """Send the user's reads to the primary for a while after a write."""
+    if settings.DATABASE_REPLICAS and user_id is not None:
+        pin_cache().set(pin_key(user_id), True, REPLICA_STICKY_SECONDS)
+
+
+def is_pinned(user_id):
+    return (
+        user_id is not None
+        and pin_cache().get(pin_key(user_id)) is not None
+    )
+
+
+@checks.register(checks.Tags.database)
+def check_pin_cache(app_configs, **kwargs):
+    backend = settings.CACHES.get(REPLICA_PIN_CACHE_ALIAS, {}).get('BACKEND')
+    if not settings.DATABASE_REPLICAS or (
+        backend and not backend.endswith('.LocMemCache')
+    ):
+        return []
+    return [checks.Warning(
+        'Read-your-writes pins are kept in the %r cache, which is local '
+        'to each process.' % REPLICA_PIN_CACHE_ALIAS,
+        hint='Set REPLICA_PIN_CACHE_BACKEND (e.g. RedisCache) and '
+             'REPLICA_PIN_CACHE_LOCATION when running more than one '
+             'worker with DATABASE_REPLICAS.',
+        id='drf.W001',
+    )]
+
+
+class ReplicaPool:
+    """Weighted choice among the replicas that passed their health check.
+
+    Each replica is checked with ``SELECT 1`` at most once per
+    ``check_interval`` seconds per process.
+    """
+
+    def __init__(self, check_interval=REPLICA_HEALTH_CHECK_INTERVAL):
+        self.check_interval = check_interval
+        self._checked = {}
+        self._lock = threading.Lock()
+
+    def check(self, alias):
+        try:
+            with connections[alias].cursor() as cursor:
+                cursor.execute('SELECT 1')
+        except DatabaseError:
+            return False
+        return True
+
+    def is_healthy(self, alias):
+        now = time.monotonic()
+        with self._lock:
+            checked = self._checked.get(alias)
+        if checked is not None and now - checked[0] < self.check_interval:
+            return checked[1]
+        healthy = self.check(alias)
+        with self._lock:
+            self._checked[alias] = (now, healthy)
+        return healthy
+
+    def reset(self):
+        with self._lock:
+            self._checked.clear()
+
+    def choose(self):
+        replicas = [
+            alias for alias in settings.DATABASE_REPLICAS
+            if self.is_healthy(alias)
+        ]
+        if not replicas:
+            return None
+        weights = [
+            settings.DATABASE_REPLICA_WEIGHTS.get(alias, 1)
+            for alias in replicas
+        ]
+        return random.choices(replicas, weights)[0]
+
+
+replica_pool = ReplicaPool()
+
+
+class ReplicaRouter:
+    """Writes go to the primary, reads to a replica when enabled.
+
+    Reads are only sent to replicas inside ``replica_reads()`` (or after
+    ``use_replicas(True)``); everything else, including reads made while
+    handling a write, stays on the primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        if reading_from_replicas():
+            replica = replica_pool.choose()
+            if replica is not None:
+                return replica
+        # Not the database of an ``instance`` hint, which may be a replica
+        # or a message shard.
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        # Without this, saving a row read from a replica would write to it.
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema through replication.
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
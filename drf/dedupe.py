@@ -0,0 +1,37 @@
+from django.db import transaction
+from django.db.models import Count, Min
+
+
+def merge_duplicate_users(
+        user_model, message_model, dry_run=False, using='default'):
+    """Fold users sharing an email into the oldest row.
+
+    Messages of the duplicates are reassigned to the kept user before the
+    duplicates are deleted. Returns ``[(email, kept_id, merged_ids), ...]``.
+    Takes the model classes as arguments so migrations can pass historical
+    models.
+    """
+    users = user_model.objects.using(using)
+    messages = message_model.objects.using(using)
+    duplicates = (
+        users.values('email')
+        .annotate(rows=Count('id'), kept_id=Min('id'))
+        .filter(rows__gt=1)
+        .order_by('email')
+    )
+    merged = []
+    with transaction.atomic(using=using):
+        for row in duplicates:
+            merged_ids = list(
+                users.filter(email=row['email'])
+                .exclude(pk=row['kept_id'])
+                .values_list('pk', flat=True)
+            )
+            merged.append((row['email'], row['kept_id'], merged_ids))
+            if dry_run:
+                continue
+            messages.filter(user_id__in=merged_ids).update(
+                user_id=row['kept_id']
+            )
+            users.filter(pk__in=merged_ids).delete()
+    return merged
@@ -0,0 +1,64 @@
+import threading
+
+from decouple import config
+from django.core.cache import caches
+from drf.renderers import JSONFragment
+
+FRAGMENT_CACHE = config('FRAGMENT_CACHE', default=False, cast=bool)
+FRAGMENT_CACHE_ALIAS = config('FRAGMENT_CACHE_ALIAS', default='fragments')
+
+
+class FragmentCache:
+    """Rendered JSON of single rows, on top of a Django cache alias.
+
+    Keys must change whenever the representation does (e.g. embed the row
+    version), so entries are never invalidated, only aged out.
+    """
+
+    def __init__(self, alias=FRAGMENT_CACHE_ALIAS):
+        self.alias = alias
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    @staticmethod
+    def make_key(key):
+        return 'drf:fragment:%s' % key
+
+    def get_many(self, keys):
+        """``{key: JSONFragment}`` for the keys that are cached."""
+        found = self.cache.get_many([self.make_key(key) for key in keys])
+        fragments = {
+            key: JSONFragment(found[self.make_key(key)])
+            for key in keys if self.make_key(key) in found
+        }
+        with self._lock:
+            self.hits += len(fragments)
+            self.misses += len(keys) - len(fragments)
+        return fragments
+
+    def set_many(self, fragments):
+        self.cache.set_many({
+            self.make_key(key): fragment.contents
+            for key, fragment in fragments.items()
+        })
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+            }
+
+    def reset_stats(self):
+        with self._lock:
+            self.hits = self.misses = 0
+
+
+fragment_cache = FragmentCache()
@@ -0,0 +1,111 @@
+import contextlib
+import itertools
+import statistics
+import time
+from django.core.management.color import no_style
+from django.db import connection, reset_queries
+from django.db.models import Max
+from django.test.utils import (
+    setup_test_environment, teardown_test_environment)
+from drf.common_methods import create_jwt
+from drf.models import User, Message
+from drf.sharding import next_id, sharding_enabled
+from drf.token_cache import token_cache
+
+SEED_BATCH_SIZE = 1000
+
+
+@contextlib.contextmanager
+def bench_database(keepdb=False, name=None):
+    """Run the block against a throwaway test database.
+
+    ``name`` overrides the test database name, e.g. a file for SQLite, whose
+    default test database lives in memory.
+    """
+    test_settings = connection.settings_dict['TEST']
+    old_test_name = test_settings['NAME']
+    if name is not None:
+        test_settings['NAME'] = name
+    setup_test_environment()
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(
+        verbosity=0, autoclobber=True, keepdb=keepdb
+    )
+    try:
+        yield
+    finally:
+        token_cache.clear()
+        connection.creation.destroy_test_db(
+            old_name, verbosity=0, keepdb=keepdb
+        )
+        teardown_test_environment()
+        test_settings['NAME'] = old_test_name
+
+
+def seed(users, messages_per_user, title_size=40, body_size=400):
+    """Insert ``users`` users with ``messages_per_user`` messages each.
+
+    Rows are built and inserted ``SEED_BATCH_SIZE`` at a time, so memory
+    stays flat at any scale. Returns the bearer tokens of the created users.
+    """
+    tokens = []
+    sharded = sharding_enabled()
+    # Allocated up front to sign the tokens: snowflake ids like
+    # UserSerializer when sharded, otherwise the sequence's next values.
+    next_pk = (User.objects.aggregate(Max('pk'))['pk__max'] or 0) + 1
+    for first in range(0, users, SEED_BATCH_SIZE):
+        created = []
+        for i in range(first, min(users, first + SEED_BATCH_SIZE)):
+            if sharded:
+                pk = next_id()
+            else:
+                pk, next_pk = next_pk, next_pk + 1
+            email = 'bench%d@example.com' % i
+            created.append(User(
+                pk=pk, email=email, json_web_token=create_jwt(email, pk, 0),
+                message_count=messages_per_user,
+            ))
+        User.objects.bulk_create(created)
+        tokens.extend('Bearer ' + user.json_web_token for user in created)
+
+        messages = (
+            Message(
+                user_id=user.pk,
+                title=('title %d ' % i).ljust(title_size, 't'),
+                body=('body %d ' % i).ljust(body_size, 'b'),
+            )
+            for user in created for i in range(messages_per_user)
+        )
+        while batch := list(itertools.islice(messages, SEED_BATCH_SIZE)):
+            Message.objects.bulk_create(batch)
+        # With DEBUG on, the connections keep every INSERT otherwise.
+        reset_queries()
+    with connection.cursor() as cursor:
+        for statement in connection.ops.sequence_reset_sql(
+            no_style(), [User]
+        ):
+            cursor.execute(statement)
+    return tokens
+
+
+def timed(func, repeat):
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - start)
+    return durations
+
+
+def summarize(durations):
+    ordered = sorted(durations)
+
+    def percentile(p):
+        return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+    return {
+        'mean': statistics.fmean(ordered),
+        'p50': percentile(0.50),
+        'p95': percentile(0.95),
+        'p99': percentile(0.99),
+    }
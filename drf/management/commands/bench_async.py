@@ -0,0 +1,82 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.test import AsyncClient, Client
+from django.urls import reverse
+from ._bench import bench_database, seed, summarize
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare throughput and tail latency of the sync message views '
+        '(one thread per in-flight request) with the async ones (one event '
+        'loop) under concurrent load.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=20)
+        parser.add_argument('--messages', type=int, default=50)
+        parser.add_argument('--concurrency', type=int, default=32)
+        parser.add_argument('--requests', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        with bench_database():
+            tokens = seed(options['users'], options['messages'])
+            jobs = [
+                {'Authorization': tokens[i % len(tokens)]}
+                for i in range(options['requests'])
+            ]
+            rows = [
+                ('sync', self.run_sync(
+                    reverse('message-list'), jobs, options['concurrency']
+                )),
+                ('async', asyncio.run(self.run_async(
+                    reverse('async-message-list'), jobs,
+                    options['concurrency']
+                ))),
+            ]
+
+        self.stdout.write('%-8s %10s %10s %10s %10s' % (
+            '', 'req/s', 'p50 ms', 'p95 ms', 'p99 ms'
+        ))
+        for name, (elapsed, durations) in rows:
+            stats = summarize(durations)
+            self.stdout.write('%-8s %10.1f %10.2f %10.2f %10.2f' % (
+                name, len(durations) / elapsed, stats['p50'] * 1e3,
+                stats['p95'] * 1e3, stats['p99'] * 1e3,
+            ))
+
+    def run_sync(self, url, jobs, concurrency):
+        def request(headers):
+            start = time.perf_counter()
+            response = Client().get(url, headers=headers)
+            assert response.status_code == 200, response.status_code
+            return time.perf_counter() - start
+
+        def close_connection():
+            connections.close_all()
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(concurrency) as executor:
+            durations = list(executor.map(request, jobs))
+            # Worker threads keep their connections open otherwise.
+            for _ in range(concurrency):
+                executor.submit(close_connection)
+        return time.perf_counter() - start, durations
+
+    async def run_async(self, url, jobs, concurrency):
+        semaphore = asyncio.Semaphore(concurrency)
+        client = AsyncClient()
+
+        async def request(headers):
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.get(url, headers=headers)
+                assert response.status_code == 200, response.status_code
+                return time.perf_counter() - start
+
+        start = time.perf_counter()
+        durations = await asyncio.gather(*map(request, jobs))
+        return time.perf_counter() - start, durations
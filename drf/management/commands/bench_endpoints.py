@@ -0,0 +1,404 @@
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections, reset_queries
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from drf.common_methods import adjust_message_count
+from drf.models import User, Message
+from ._bench import bench_database, seed, summarize
+
+DEFAULT_BASELINES = os.path.join(
+    settings.BASE_DIR, 'benchmarks', 'baselines.json'
+)
+# Requests made one at a time before the timed run, all as the same user
+# on the same rows; the last one is the one whose queries are counted,
+# once caches are warm.
+WARMUP = 3
+BATCH = 10
+
+
+class Workload:
+    """Request factories for every route, over the seeded rows.
+
+    Each factory takes a job index and returns ``(method, url, data,
+    headers, expected status)``. The warm-up jobs share the rows of the
+    last one, whose queries are counted.
+    """
+
+    def __init__(self, jobs):
+        self.users = list(User.objects.order_by('pk').values_list(
+            'pk', 'json_web_token'
+        )[:1000])
+        self.tokens = {
+            pk: {'Authorization': 'Bearer ' + token}
+            for pk, token in self.users
+        }
+        self.head = list(Message.objects.order_by('pk').values_list(
+            'pk', 'user_id'
+        )[:jobs])
+        self.run_id = time.time_ns()
+
+    def slot(self, i):
+        return max(i - WARMUP + 1, 0)
+
+    def user(self, i):
+        return self.users[self.slot(i) % len(self.users)][0]
+
+    def message(self, i):
+        pk, user_id = self.head[self.slot(i) % len(self.head)]
+        return pk, self.tokens.get(user_id, {})
+
+    def victims(self, i, count):
+        """``count`` new messages of a user for a deleting job to remove.
+
+        The seeded rows are left alone, so the scale doesn't shrink.
+        """
+        user_id = self.user(i)
+        created = Message.objects.bulk_create([
+            Message(user_id=user_id, title='victim', body='victim')
+            for _ in range(count)
+        ])
+        adjust_message_count(user_id, count)
+        return [message.pk for message in created], self.tokens[user_id]
+
+    def endpoints(self):
+        message_list = reverse('message-list')
+        return {
+            'user-create': lambda i: (
+                'post', reverse('user-list'),
+                {'email': 'load%d.%d@example.com' % (self.run_id, i)},
+                {}, 201,
+            ),
+            'user-list': lambda i: (
+                'get', reverse('user-list'), {'limit': 20}, {}, 200,
+            ),
+            'user-retrieve': lambda i: (
+                'get', reverse('user-detail', args=[self.user(i)]), None,
+                {}, 200,
+            ),
+            'message-list': lambda i: (
+                'get', message_list, {'limit': 20},
+                self.tokens[self.user(i)], 200,
+            ),
+            'message-search': lambda i: (
+                'get', message_list,
+                {'search': str(self.slot(i) % 10), 'limit': 20},
+                self.tokens[self.user(i)], 200,
+            ),
+            'message-retrieve': lambda i: (
+                'get', reverse('message-detail', args=[self.message(i)[0]]),
+                None, self.message(i)[1], 200,
+            ),
+            'message-export': lambda i: (
+                'get', reverse('message-export'), {'format': 'csv'},
+                self.tokens[self.user(i)], 200,
+            ),
+            'async-message-list': lambda i: (
+                'get', reverse('async-message-list'), {'limit': 20},
+                self.tokens[self.user(i)], 200,
+            ),
+            'async-message-retrieve': lambda i: (
+                'get', reverse(
+                    'async-message-detail', args=[self.message(i)[0]]
+                ), None, self.message(i)[1], 200,
+            ),
+            'message-create': lambda i: (
+                'post', message_list,
+                {'title': 'load', 'body': 'load %d' % i},
+                self.tokens[self.user(i)], 201,
+            ),
+            'message-bulk-create': lambda i: (
+                'post', reverse('message-bulk-create'),
+                [{'title': 'bulk', 'body': 'bulk %d' % j}
+                 for j in range(BATCH)],
+                self.tokens[self.user(i)], 201,
+            ),
+            'message-update': lambda i: (
+                'put', reverse('message-detail', args=[self.message(i)[0]]),
+                {'title': 'updated', 'body': 'updated %d' % i},
+                self.message(i)[1], 200,
+            ),
+            'message-batch-update': lambda i: self.batch_update(i),
+            'message-delete': lambda i: self.delete(i),
+            'message-batch-delete': lambda i: self.batch_delete(i),
+        }
+
+    def batch_update(self, i):
+        pks = [
+            self.head[(self.slot(i) + j) % len(self.head)]
+            for j in range(BATCH)
+        ]
+        user_id = pks[0][1]
+        return (
+            'patch', reverse('message-batch-update'),
+            [{'id': pk, 'body': 'batch %d' % i}
+             for pk, owner in pks if owner == user_id],
+            self.tokens.get(user_id, {}), 200,
+        )
+
+    def delete(self, i):
+        (pk,), headers = self.victims(i, 1)
+        return (
+            'delete', reverse('message-detail', args=[pk]), None, headers,
+            204,
+        )
+
+    def batch_delete(self, i):
+        pks, headers = self.victims(i, BATCH)
+        return (
+            'delete', reverse('message-batch-update'), {'ids': pks},
+            headers, 200,
+        )
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark every route at a given data scale with concurrent '
+        'clients: throughput, p50/p95/p99 latency and queries per request. '
+        'Compares the results with the stored baselines for that scale and '
+        'fails on regressions; --save records new baselines. Latency '
+        'baselines only hold on the machine that recorded them, query '
+        'counts hold everywhere.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--messages', type=int, default=1000,
+            help='Messages to seed, e.g. 1000 up to 10000000.',
+        )
+        parser.add_argument(
+            '--users', type=int,
+            help='Users to seed (default: one per 100 messages).',
+        )
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument(
+            '--requests', type=int, default=200,
+            help='Timed requests per endpoint.',
+        )
+        parser.add_argument(
+            '--endpoint', action='append',
+            help='Only run these endpoints (default: all).',
+        )
+        parser.add_argument('--baselines', default=DEFAULT_BASELINES)
+        parser.add_argument(
+            '--threshold', type=float, default=0.25,
+            help='Allowed relative slowdown of p95 latency and throughput.',
+        )
+        parser.add_argument(
+            '--save', action='store_true',
+            help='Store the results as the baselines for this scale.',
+        )
+        parser.add_argument(
+            '--database',
+            help='Keep the seeded test database here (an SQLite file) and '
+                 'reuse it on the next run.',
+        )
+
+    def handle(self, *args, **options):
+        if (
+            connection.vendor == 'sqlite'
+            and settings.SQLITE_PROFILE != 'production'
+        ):
+            # Without WAL and IMMEDIATE transactions concurrent clients
+            # fail with "database is locked" instead of measuring anything.
+            raise CommandError(
+                'Run the benchmark with SQLITE_PROFILE=production.'
+            )
+        users = options['users'] or max(1, options['messages'] // 100)
+        per_user = max(1, options['messages'] // users)
+        jobs = options['requests'] + WARMUP
+
+        with tempfile.TemporaryDirectory() as directory:
+            name = options['database']
+            if name is None and connection.vendor == 'sqlite':
+                # The in-memory test database serializes concurrent writers
+                # on table locks.
+                name = os.path.join(directory, 'bench.sqlite3')
+            with bench_database(
+                keepdb=options['database'] is not None, name=name
+            ):
+                if not User.objects.filter(
+                    email__startswith='bench'
+                ).exists():
+                    self.stdout.write('Seeding %d users x %d messages' % (
+                        users, per_user
+                    ))
+                    seed(users, per_user)
+                workload = Workload(jobs)
+                endpoints = workload.endpoints()
+                selected = options['endpoint'] or list(endpoints)
+                unknown = set(selected) - set(endpoints)
+                if unknown:
+                    raise CommandError('Unknown endpoints: %s' % ', '.join(
+                        sorted(unknown)
+                    ))
+                results = {
+                    name: self.measure(
+                        endpoints[name], jobs, options['concurrency']
+                    )
+                    for name in selected
+                }
+
+        self.report(results)
+        scale = str(users * per_user)
+        database = connection.vendor
+        if database == 'sqlite':
+            database += '-' + settings.SQLITE_PROFILE
+        run = {
+            'database': database,
+            'concurrency': options['concurrency'],
+            'requests': options['requests'],
+            'endpoints': results,
+        }
+        if options['save']:
+            self.save(options['baselines'], scale, run)
+            return
+        regressions = self.compare(
+            options['baselines'], scale, run, options['threshold']
+        )
+        if regressions:
+            raise CommandError('%d regression(s) against the baselines.' % (
+                regressions
+            ))
+
+    def measure(self, endpoint, jobs, concurrency):
+        # Built up front: the deleting endpoints insert their rows here.
+        requests = [endpoint(i) for i in range(jobs)]
+        client = Client(raise_request_exception=False)
+        # A full query log (DEBUG) would make the capture below count 0.
+        reset_queries()
+        for request in requests[:WARMUP]:
+            with CaptureQueriesContext(connection) as queries:
+                self.send(client, *request)
+        local = threading.local()
+
+        def timed_request(request):
+            if not hasattr(local, 'client'):
+                local.client = Client(raise_request_exception=False)
+            start = time.perf_counter()
+            ok = self.send(local.client, *request)
+            return time.perf_counter() - start, ok
+
+        def close_connection():
+            connections.close_all()
+
+        # Failures are counted in the results instead of logged.
+        logger = logging.getLogger('django.request')
+        level = logger.level
+        logger.setLevel(logging.CRITICAL)
+        start = time.perf_counter()
+        try:
+            with ThreadPoolExecutor(concurrency) as executor:
+                timings = list(
+                    executor.map(timed_request, requests[WARMUP:])
+                )
+                for _ in range(concurrency):
+                    executor.submit(close_connection)
+        finally:
+            logger.setLevel(level)
+        elapsed = time.perf_counter() - start
+
+        stats = summarize([duration for duration, _ in timings])
+        return {
+            'rps': round(len(timings) / elapsed, 1),
+            'p50_ms': round(stats['p50'] * 1e3, 3),
+            'p95_ms': round(stats['p95'] * 1e3, 3),
+            'p99_ms': round(stats['p99'] * 1e3, 3),
+            'queries': len(queries),
+            'errors': sum(not ok for _, ok in timings),
+        }
+
+    def send(self, client, method, url, data, headers, expected):
+        if method == 'get':
+            response = client.get(url, data, headers=headers)
+        else:
+            response = getattr(client, method)(
+                url, json.dumps(data), content_type='application/json',
+                headers=headers,
+            )
+        if response.streaming:
+            b''.join(response.streaming_content)
+        return response.status_code == expected
+
+    def report(self, results):
+        self.stdout.write('%-24s %9s %9s %9s %9s %8s %7s' % (
+            '', 'req/s', 'p50 ms', 'p95 ms', 'p99 ms', 'queries', 'errors'
+        ))
+        for name, result in results.items():
+            self.stdout.write('%-24s %9.1f %9.2f %9.2f %9.2f %8d %7d' % (
+                name, result['rps'], result['p50_ms'], result['p95_ms'],
+                result['p99_ms'], result['queries'], result['errors'],
+            ))
+
+    def load(self, path):
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def save(self, path, scale, run):
+        baselines = self.load(path)
+        baselines[scale] = run
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+            f.write('\n')
+        self.stdout.write('Saved the baselines for %s messages to %s' % (
+            scale, path
+        ))
+
+    def compare(self, path, scale, run, threshold):
+        baseline = self.load(path).get(scale)
+        if baseline is None:
+            self.stdout.write('No baselines for %s messages in %s' % (
+                scale, path
+            ))
+            return 0
+        # Latency only compares under the same load.
+        same_load = all(
+            baseline.get(key) == run[key]
+            for key in ('database', 'concurrency', 'requests')
+        )
+        if not same_load:
+            self.stdout.write(
+                'The baselines ran on %(database)s with --concurrency '
+                '%(concurrency)d --requests %(requests)d; comparing query '
+                'counts only.' % baseline
+            )
+        regressions = 0
+        for name, result in run['endpoints'].items():
+            base = baseline['endpoints'].get(name)
+            if base is None:
+                continue
+            problems = []
+            if result['errors'] > base['errors']:
+                problems.append('failed requests %d -> %d' % (
+                    base['errors'], result['errors']
+                ))
+            if result['queries'] > base['queries']:
+                problems.append('queries %d -> %d' % (
+                    base['queries'], result['queries']
+                ))
+            if same_load and result['p95_ms'] > base['p95_ms'] * (
+                1 + threshold
+            ):
+                problems.append('p95 %.2fms -> %.2fms' % (
+                    base['p95_ms'], result['p95_ms']
+                ))
+            if same_load and result['rps'] < base['rps'] * (1 - threshold):
+                problems.append('throughput %.1f -> %.1f req/s' % (
+                    base['rps'], result['rps']
+                ))
+            if problems:
+                regressions += 1
+                self.stderr.write('%s: %s' % (name, ', '.join(problems)))
+        return regressions
@@ -0,0 +1,74 @@
+import io
+from unittest import mock
+from django.core.management.base import BaseCommand
+from django.test import Client
+from django.urls import reverse
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from drf.messages import MessageViewSet
+from drf.renderers import FastJSONParser, FastJSONRenderer, orjson
+from ._bench import bench_database, seed, summarize, timed
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare FastJSONRenderer/FastJSONParser with the DRF defaults on '
+        'a /drf/messages/ page.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=50)
+        parser.add_argument('--repeat', type=int, default=2000)
+        parser.add_argument('--requests', type=int, default=300)
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            'orjson: %s' % (orjson.__version__ if orjson else 'missing')
+        )
+        with bench_database():
+            bearer_token = seed(1, options['limit'])[0]
+            client = Client()
+            url = reverse('message-list')
+            params = {'limit': options['limit']}
+            headers = {'Authorization': bearer_token}
+            data = client.get(url, params, headers=headers).data
+            content = JSONRenderer().render(data)
+
+            rows = []
+            for name, renderer in (
+                ('JSONRenderer', JSONRenderer()),
+                ('FastJSONRenderer', FastJSONRenderer()),
+            ):
+                rows.append(('render ' + name, timed(
+                    lambda: renderer.render(data), options['repeat']
+                )))
+            for name, parser in (
+                ('JSONParser', JSONParser()),
+                ('FastJSONParser', FastJSONParser()),
+            ):
+                rows.append(('parse ' + name, timed(
+                    lambda: parser.parse(io.BytesIO(content)),
+                    options['repeat']
+                )))
+            for renderer_class in (JSONRenderer, FastJSONRenderer):
+                with mock.patch.object(
+                    MessageViewSet, 'renderer_classes', [renderer_class]
+                ):
+                    rows.append((
+                        'GET page ' + renderer_class.__name__,
+                        timed(
+                            lambda: client.get(url, params, headers=headers),
+                            options['requests']
+                        ),
+                    ))
+
+        self.stdout.write('page: %d bytes' % len(content))
+        self.stdout.write(
+            '%-32s %10s %10s %10s' % ('', 'mean us', 'p50 us', 'p99 us')
+        )
+        for name, durations in rows:
+            stats = summarize(durations)
+            self.stdout.write('%-32s %10.1f %10.1f %10.1f' % (
+                name, stats['mean'] * 1e6, stats['p50'] * 1e6,
+                stats['p99'] * 1e6,
+            ))
@@ -0,0 +1,65 @@
+from django.core.management.base import BaseCommand
+from django.test import Client, override_settings
+from django.urls import reverse
+from ._bench import bench_database, seed, summarize, timed
+
+# MIDDLEWARE as generated by startproject, applied to every path.
+STOCK_MIDDLEWARE = [
+    'django.middleware.security.SecurityMiddleware',
+    'django.contrib.sessions.middleware.SessionMiddleware',
+    'django.middleware.common.CommonMiddleware',
+    'django.middleware.csrf.CsrfViewMiddleware',
+    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'django.contrib.messages.middleware.MessageMiddleware',
+    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+]
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure the per-request cost of the stock middleware stack against '
+        'the configured one, which skips the session, CSRF, auth and '
+        'messages middleware under API_PATH_PREFIXES.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        with bench_database():
+            headers = {'Authorization': seed(1, 10)[0]}
+            requests = {
+                'messages': lambda client: client.get(
+                    reverse('message-list'), {'limit': 10}, headers=headers
+                ),
+                'create': lambda client: client.post(
+                    reverse('message-list'), {'title': 't', 'body': 'b'},
+                    content_type='application/json', headers=headers,
+                ),
+                'users': lambda client: client.get(
+                    reverse('user-list'), {'limit': 10}
+                ),
+            }
+            rows = []
+            for name, request in requests.items():
+                with override_settings(MIDDLEWARE=STOCK_MIDDLEWARE):
+                    stock = self.measure(request, options['repeat'])
+                lean = self.measure(request, options['repeat'])
+                rows.append((name, stock, lean))
+
+        self.stdout.write('%-10s %12s %12s %12s %12s' % (
+            '', 'stock p50', 'lean p50', 'saved us', 'saved %'
+        ))
+        for name, stock, lean in rows:
+            saved = stock['p50'] - lean['p50']
+            self.stdout.write('%-10s %10.1fus %10.1fus %12.1f %11.1f%%' % (
+                name, stock['p50'] * 1e6, lean['p50'] * 1e6, saved * 1e6,
+                saved / stock['p50'] * 100,
+            ))
+
+    def measure(self, request, repeat):
+        # The middleware chain is built on a client's first request.
+        client = Client()
+        for _ in range(50):
+            request(client)
+        return summarize(timed(lambda: request(client), repeat))
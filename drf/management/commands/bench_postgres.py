@@ -0,0 +1,110 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.db.models import Min
+from django.test import Client
+from django.urls import reverse
+from drf.models import User, Message
+from ._bench import bench_database, seed, summarize
+
+# (CONN_MAX_AGE, OPTIONS) layered over the configured database.
+VARIANTS = {
+    'connect': (0, {'pool': False, 'prepare_threshold': None}),
+    'persistent': (600, {'pool': False, 'prepare_threshold': None}),
+    'prepared': (600, {'pool': False, 'prepare_threshold': 5}),
+    'pool': (0, {'pool': {'min_size': 4}, 'prepare_threshold': 5}),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare connection handling on PostgreSQL: a connection per '
+        'request, persistent connections, prepared statements and a '
+        'connection pool, on message list and detail requests. Creates and '
+        'drops a test database on the configured server, e.g. a throwaway '
+        '`docker run --rm -p 5432:5432 -e POSTGRES_HOST_AUTH_METHOD=trust '
+        'postgres` with DATABASE_ENGINE=postgresql.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=20)
+        parser.add_argument('--messages', type=int, default=50)
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument('--requests', type=int, default=2000)
+        parser.add_argument(
+            '--variant', action='append', choices=VARIANTS,
+            help='Run only these variants (default: all).',
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError(
+                'The default database is not PostgreSQL; set '
+                'DATABASE_ENGINE=postgresql.'
+            )
+        settings_dict = connection.settings_dict
+        old = settings_dict['CONN_MAX_AGE'], dict(settings_dict['OPTIONS'])
+        rows = []
+        with bench_database():
+            seed(options['users'], options['messages'])
+            first_ids = dict(Message.objects.values('user_id').annotate(
+                first=Min('id')
+            ).values_list('user_id', 'first'))
+            users = list(User.objects.filter(pk__in=first_ids))
+            jobs = []
+            for i in range(options['requests']):
+                user = users[i % len(users)]
+                url = reverse('message-list') if i % 2 else reverse(
+                    'message-detail', args=[first_ids[user.pk]]
+                )
+                jobs.append((url, {
+                    'Authorization': 'Bearer ' + user.json_web_token
+                }))
+            try:
+                for name in options['variant'] or VARIANTS:
+                    conn_max_age, variant_options = VARIANTS[name]
+                    self.configure(conn_max_age, {
+                        **old[1], 'server_side_binding': True,
+                        **variant_options,
+                    })
+                    rows.append((name, self.run(
+                        jobs, options['concurrency']
+                    )))
+            finally:
+                self.configure(*old)
+
+        self.stdout.write('%-12s %10s %10s %10s %10s' % (
+            '', 'req/s', 'p50 ms', 'p95 ms', 'p99 ms'
+        ))
+        for name, (elapsed, durations) in rows:
+            stats = summarize(durations)
+            self.stdout.write('%-12s %10.1f %10.2f %10.2f %10.2f' % (
+                name, len(durations) / elapsed, stats['p50'] * 1e3,
+                stats['p95'] * 1e3, stats['p99'] * 1e3,
+            ))
+
+    def configure(self, conn_max_age, options):
+        connections.close_all()
+        connection.close_pool()
+        # Every thread's connection is built from this same dict.
+        connection.settings_dict['CONN_MAX_AGE'] = conn_max_age
+        connection.settings_dict['OPTIONS'] = options
+
+    def run(self, jobs, concurrency):
+        def request(job):
+            url, headers = job
+            start = time.perf_counter()
+            response = Client().get(url, headers=headers)
+            assert response.status_code == 200, response.status_code
+            return time.perf_counter() - start
+
+        def close_connection():
+            connections.close_all()
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(concurrency) as executor:
+            durations = list(executor.map(request, jobs))
+            for _ in range(concurrency):
+                executor.submit(close_connection)
+        return time.perf_counter() - start, durations
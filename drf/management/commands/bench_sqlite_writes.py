@@ -0,0 +1,113 @@
+import collections
+import json
+import os
+import tempfile
+import threading
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection, connections
+from django.test import Client
+from django.urls import reverse
+from ._bench import bench_database, seed, summarize
+
+
+class Command(BaseCommand):
+    help = (
+        'Hammer /drf/messages/ with concurrent writer and reader threads on '
+        'a file-based SQLite database and report throughput, latency and '
+        'lock errors. Run it with SQLITE_PROFILE=development and '
+        'SQLITE_PROFILE=production to compare.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=20)
+        parser.add_argument('--writers', type=int, default=32)
+        parser.add_argument('--readers', type=int, default=8)
+        parser.add_argument(
+            '--requests', type=int, default=50,
+            help='Requests per thread.',
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('The default database is not SQLite.')
+
+        with tempfile.TemporaryDirectory() as directory:
+            # An in-memory database has no file locks to contend on.
+            with bench_database(
+                name=os.path.join(directory, 'bench.sqlite3')
+            ):
+                tokens = seed(options['users'], 10)
+                results, elapsed = self.run(tokens, options)
+                with connection.cursor() as cursor:
+                    cursor.execute('PRAGMA journal_mode')
+                    journal_mode = cursor.fetchone()[0]
+
+        self.stdout.write('profile %s, journal_mode %s, %.1fs' % (
+            settings.SQLITE_PROFILE, journal_mode, elapsed
+        ))
+        self.stdout.write('%-8s %8s %8s %10s %10s %10s %10s' % (
+            '', 'ok', 'errors', 'req/s', 'p50 ms', 'p95 ms', 'p99 ms'
+        ))
+        for kind in ('write', 'read'):
+            durations, errors = results[kind]
+            if not durations:
+                continue
+            stats = summarize(durations)
+            self.stdout.write('%-8s %8d %8d %10.1f %10.2f %10.2f %10.2f' % (
+                kind, len(durations), sum(errors.values()),
+                len(durations) / elapsed, stats['p50'] * 1e3,
+                stats['p95'] * 1e3, stats['p99'] * 1e3,
+            ))
+            for error, count in errors.most_common():
+                self.stdout.write('    %6d x %s' % (count, error))
+
+    def run(self, tokens, options):
+        url = reverse('message-list')
+        results = {
+            kind: ([], collections.Counter()) for kind in ('write', 'read')
+        }
+        lock = threading.Lock()
+        start_line = threading.Barrier(options['writers'] + options['readers'])
+
+        def worker(index, kind):
+            client = Client()
+            headers = {'Authorization': tokens[index % len(tokens)]}
+            durations, errors = [], collections.Counter()
+            start_line.wait()
+            for i in range(options['requests']):
+                start = time.perf_counter()
+                try:
+                    if kind == 'write':
+                        response = client.post(url, json.dumps({
+                            'title': 'title %d' % i, 'body': 'body %d' % i,
+                        }), content_type='application/json', headers=headers)
+                    else:
+                        response = client.get(url, headers=headers)
+                except OperationalError as exc:
+                    errors[str(exc)] += 1
+                    continue
+                if response.status_code >= 400:
+                    errors['HTTP %d' % response.status_code] += 1
+                    continue
+                durations.append(time.perf_counter() - start)
+            # Persistent connections outlive the requests.
+            connections.close_all()
+            with lock:
+                results[kind][0].extend(durations)
+                results[kind][1].update(errors)
+
+        threads = [
+            threading.Thread(target=worker, args=(index, 'write'))
+            for index in range(options['writers'])
+        ] + [
+            threading.Thread(target=worker, args=(index, 'read'))
+            for index in range(options['readers'])
+        ]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results, time.perf_counter() - start
@@ -0,0 +1,262 @@
+import math
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import Max
+from django.utils import timezone
+from drf.common_methods import create_jwt
+from drf.models import User, Message
+from drf.search import install_message_search, uninstall_message_search
+from drf.sharding import next_id, shard_for_user, sharding_enabled
+
+USER_COLUMNS = (
+    'id', 'email', 'json_web_token', 'token_version', 'message_count',
+    'create_at', 'updated_at', 'version',
+)
+MESSAGE_COLUMNS = (
+    'id', 'user_id', 'title', 'body', 'create_at', 'updated_at', 'version',
+)
+# Median and spread of the log-normal title and body lengths, clipped to
+# the column limits.
+TITLE_LENGTH = (40, 0.6, 512)
+BODY_LENGTH = (300, 0.9, 2048)
+
+
+def sign_tokens(users):
+    """JWTs for ``[(pk, email), ...]``; runs in the process pool."""
+    return [create_jwt(email, pk, 0) for pk, email in users]
+
+
+def make_corpus(rng, size=1 << 20):
+    """Random text that titles and bodies are sliced from.
+
+    A fixed vocabulary keeps full-text search selective and realistic.
+    """
+    letters = 'abcdefghijklmnopqrstuvwxyz'
+    vocabulary = [
+        ''.join(rng.choices(letters, k=rng.randint(2, 10)))
+        for _ in range(5000)
+    ]
+    words, length = [], 0
+    while length < size:
+        word = rng.choice(vocabulary)
+        words.append(word)
+        length += len(word) + 1
+    return ' '.join(words)
+
+
+def message_counts(rng, users, messages, shape):
+    """Split ``messages`` over ``users`` along a Pareto distribution.
+
+    A shape around 1.16 gives the 80/20 rule: a fifth of the users own
+    most of the messages.
+    """
+    weights = [rng.paretovariate(shape) for _ in range(users)]
+    total = sum(weights)
+    counts = [int(messages * weight / total) for weight in weights]
+    # Hand out what rounding down left over, heaviest users first.
+    heaviest = sorted(range(users), key=weights.__getitem__, reverse=True)
+    for index in heaviest[:messages - sum(counts)]:
+        counts[index] += 1
+    return counts
+
+
+class Command(BaseCommand):
+    help = (
+        'Generate users and messages fast, for load tests: raw batched '
+        'inserts (COPY on PostgreSQL, executemany in WAL mode on SQLite), '
+        'JWTs signed across a process pool, log-normal title and body '
+        'sizes and a Pareto-skewed number of messages per user. The same '
+        '--seed gives the same data.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10000)
+        parser.add_argument('--messages', type=int, default=1000000)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--skew', type=float, default=1.16,
+            help='Pareto shape of messages per user; lower is more skewed.',
+        )
+        parser.add_argument('--batch-size', type=int, default=10000)
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count(),
+            help='Processes signing JWTs; 1 signs in this process.',
+        )
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+        parser.add_argument(
+            '--keep-search-index', action='store_true',
+            help='Index messages for search row by row instead of dropping '
+                 'the index and rebuilding it at the end; faster when '
+                 'adding a few rows to many.',
+        )
+
+    def handle(self, *args, **options):
+        if options['users'] < 1 or options['messages'] < 0:
+            raise CommandError(
+                'Need at least one user and a non-negative message count.'
+            )
+        alias = options['database']
+        rng = random.Random(options['seed'])
+        # Shards use the same backend as the directory database.
+        self.now = connections[alias].ops.adapt_datetimefield_value(
+            timezone.now()
+        )
+        self.corpus = make_corpus(rng)
+        self.batch_size = options['batch_size']
+        for connection in self.connections(alias):
+            # Pragmas can't change inside a transaction, e.g. in tests.
+            if (
+                connection.vendor == 'sqlite'
+                and not connection.in_atomic_block
+            ):
+                with connection.cursor() as cursor:
+                    cursor.execute('PRAGMA journal_mode = WAL')
+                    # Generated data can be generated again.
+                    cursor.execute('PRAGMA synchronous = OFF')
+                    cursor.execute('PRAGMA cache_size = -262144')
+            if not options['keep_search_index']:
+                with connection.schema_editor() as editor:
+                    uninstall_message_search(editor)
+
+        try:
+            self.generate(alias, rng, options)
+        finally:
+            start = time.perf_counter()
+            for connection in self.connections(alias):
+                statements = connection.ops.sequence_reset_sql(
+                    no_style(), [User, Message]
+                )
+                with connection.cursor() as cursor:
+                    for statement in statements:
+                        cursor.execute(statement)
+                if not options['keep_search_index']:
+                    with connection.schema_editor() as editor:
+                        install_message_search(editor)
+            self.stdout.write('Sequences and search index in %.1fs' % (
+                time.perf_counter() - start
+            ))
+
+    def generate(self, alias, rng, options):
+        counts = message_counts(
+            rng, options['users'], options['messages'], options['skew']
+        )
+        first_user = (User.objects.using(alias).aggregate(
+            Max('pk')
+        )['pk__max'] or 0) + 1
+        start = time.perf_counter()
+        self.write_users(alias, first_user, counts, options)
+        self.stdout.write('%d users in %.1fs' % (
+            len(counts), time.perf_counter() - start
+        ))
+
+        start = time.perf_counter()
+        self.write_messages(alias, rng, first_user, counts)
+        elapsed = time.perf_counter() - start
+        self.stdout.write('%d messages in %.1fs (%.0f rows/s)' % (
+            options['messages'], elapsed,
+            options['messages'] / elapsed if elapsed else 0,
+        ))
+
+    def connections(self, alias):
+        aliases = [alias]
+        if alias == DEFAULT_DB_ALIAS and sharding_enabled():
+            aliases += settings.MESSAGE_SHARDS
+        return [connections[name] for name in dict.fromkeys(aliases)]
+
+    def write_users(self, alias, first_user, counts, options):
+        users = [
+            (first_user + index, 'user%d@load.test' % (first_user + index))
+            for index in range(len(counts))
+        ]
+        chunks = [
+            users[start:start + self.batch_size]
+            for start in range(0, len(users), self.batch_size)
+        ]
+        if options['workers'] > 1:
+            executor = ProcessPoolExecutor(
+                options['workers'], initializer=django.setup
+            )
+            tokens = executor.map(sign_tokens, chunks)
+        else:
+            executor = None
+            tokens = map(sign_tokens, chunks)
+
+        now = self.now
+        try:
+            for chunk, chunk_tokens in zip(chunks, tokens):
+                rows = [
+                    (pk, email, token, 0, counts[pk - first_user], now,
+                     now, 1)
+                    for (pk, email), token in zip(chunk, chunk_tokens)
+                ]
+                self.insert(alias, User, USER_COLUMNS, rows)
+                if alias == DEFAULT_DB_ALIAS and sharding_enabled():
+                    # Mirrored as foreign key targets, like mirror_users().
+                    by_shard = {}
+                    for row in rows:
+                        by_shard.setdefault(
+                            shard_for_user(row[0]), []
+                        ).append(row)
+                    for shard, shard_rows in by_shard.items():
+                        self.insert(shard, User, USER_COLUMNS, shard_rows)
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+    def write_messages(self, alias, rng, first_user, counts):
+        sharded = alias == DEFAULT_DB_ALIAS and sharding_enabled()
+        next_pk = (Message.objects.using(alias).aggregate(
+            Max('pk')
+        )['pk__max'] or 0) + 1
+        corpus, limit = self.corpus, len(self.corpus)
+        now = self.now
+        batches = {}
+        for index, count in enumerate(counts):
+            user_id = first_user + index
+            target = shard_for_user(user_id) if sharded else alias
+            batch = batches.setdefault(target, [])
+            for _ in range(count):
+                title = self.text(rng, corpus, limit, *TITLE_LENGTH)
+                body = self.text(rng, corpus, limit, *BODY_LENGTH)
+                if sharded:
+                    pk = next_id()
+                else:
+                    pk, next_pk = next_pk, next_pk + 1
+                batch.append((pk, user_id, title, body, now, now, 1))
+                if len(batch) >= self.batch_size:
+                    self.insert(target, Message, MESSAGE_COLUMNS, batch)
+                    batch.clear()
+        for target, batch in batches.items():
+            if batch:
+                self.insert(target, Message, MESSAGE_COLUMNS, batch)
+
+    def text(self, rng, corpus, limit, median, sigma, maximum):
+        length = min(maximum, max(1, int(rng.lognormvariate(
+            math.log(median), sigma
+        ))))
+        offset = rng.randrange(limit - length)
+        return corpus[offset:offset + length].strip() or 'x'
+
+    def insert(self, alias, model, columns, rows):
+        connection = connections[alias]
+        table = connection.ops.quote_name(model._meta.db_table)
+        names = ', '.join(map(connection.ops.quote_name, columns))
+        with transaction.atomic(using=alias):
+            with connection.cursor() as cursor:
+                if connection.vendor == 'postgresql':
+                    with cursor.copy('COPY %s (%s) FROM STDIN' % (
+                        table, names
+                    )) as copy:
+                        for row in rows:
+                            copy.write_row(row)
+                else:
+                    cursor.executemany('INSERT INTO %s (%s) VALUES (%s)' % (
+                        table, names, ', '.join(['%s'] * len(columns))
+                    ), rows)
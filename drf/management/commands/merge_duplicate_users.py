@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from drf.dedupe import merge_duplicate_users
+from drf.models import User, Message
+
+
+class Command(BaseCommand):
+    help = 'Find users sharing an email and merge them into the oldest row.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Only report the duplicates, do not change anything.',
+        )
+
+    def handle(self, *args, **options):
+        merged = merge_duplicate_users(
+            User, Message, dry_run=options['dry_run']
+        )
+        for email, kept_id, merged_ids in merged:
+            self.stdout.write(
+                f'{email}: keep {kept_id}, merge {merged_ids}'
+            )
+        action = 'Found' if options['dry_run'] else 'Merged'
+        self.stdout.write(self.style.SUCCESS(
+            f'{action} {len(merged)} duplicated email(s).'
+        ))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand, CommandError
+from drf import profiling
+
+
+class Command(BaseCommand):
+    help = (
+        'Print a header that makes ProfilerMiddleware profile a request, '
+        'valid for PROFILE_HEADER_MAX_AGE seconds.'
+    )
+
+    def handle(self, *args, **options):
+        if not profiling.PROFILE_SECRET:
+            raise CommandError('PROFILE_SECRET is not set.')
+        self.stdout.write('%s: %s' % (
+            profiling.PROFILE_HEADER, profiling.sign_profile_request()
+        ))
@@ -0,0 +1,109 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from drf.models import User, Message
+from drf.response_cache import response_cache
+from drf.sharding import mirror_users, shard_for_user
+
+
+def delete_rows(alias, model, ids):
+    """``DELETE FROM <table> WHERE id IN (...)`` on ``alias``.
+
+    Neither the collector nor the delete signals run: moved messages keep
+    their count and a shard's user row is only a mirror.
+    """
+    connection = connections[alias]
+    quote_name = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.execute('DELETE FROM %s WHERE %s IN (%s)' % (
+            quote_name(model._meta.db_table),
+            quote_name(model._meta.pk.column),
+            ', '.join(['%s'] * len(ids)),
+        ), ids)
+
+
+class Command(BaseCommand):
+    help = (
+        'Mirror users onto MESSAGE_SHARDS and move every message that is '
+        'not on its user\'s shard there, including messages still on the '
+        'directory database. Safe to rerun after an interruption.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--source', action='append', default=[],
+            help='Also empty this database, e.g. a shard being removed.',
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Only report how many messages would move.',
+        )
+
+    def handle(self, *args, **options):
+        if not settings.MESSAGE_SHARDS:
+            raise CommandError('MESSAGE_SHARDS is empty.')
+        batch_size = options['batch_size']
+
+        if not options['dry_run']:
+            users = User.objects.using(DEFAULT_DB_ALIAS).order_by('pk')
+            for start in range(0, users.count(), batch_size):
+                mirror_users(users[start:start + batch_size])
+
+        sources = dict.fromkeys([
+            DEFAULT_DB_ALIAS, *settings.MESSAGE_SHARDS, *options['source']
+        ])
+        for source in sources:
+            user_ids = list(Message.objects.using(source).order_by(
+            ).values_list('user_id', flat=True).distinct())
+            known = set(User.objects.using(DEFAULT_DB_ALIAS).filter(
+                pk__in=user_ids
+            ).values_list('pk', flat=True))
+            for user_id in user_ids:
+                target = shard_for_user(user_id)
+                if target == source:
+                    continue
+                if user_id not in known:
+                    self.stderr.write(
+                        'user %s: not in the directory, skipped' % user_id
+                    )
+                    continue
+                if options['dry_run']:
+                    moved = Message.objects.using(source).filter(
+                        user_id=user_id
+                    ).count()
+                else:
+                    moved = self.move(user_id, source, target, batch_size)
+                self.stdout.write('user %s: %d messages %s -> %s' % (
+                    user_id, moved, source, target
+                ))
+
+    def move(self, user_id, source, target, batch_size):
+        fields = Message._meta.concrete_fields
+        queryset = Message.objects.using(source).filter(user_id=user_id)
+        moved = 0
+        while True:
+            batch = list(queryset.order_by('pk')[:batch_size])
+            if not batch:
+                break
+            # Ids stay as they are: shard ids never collide and directory
+            # ids are far below them. Copying before deleting, and ignoring
+            # rows already copied, makes a rerun pick up where it stopped.
+            with transaction.atomic(using=target):
+                Message.objects.using(target).bulk_create([
+                    Message(**{
+                        field.attname: getattr(message, field.attname)
+                        for field in fields
+                    })
+                    for message in batch
+                ], ignore_conflicts=True)
+            with transaction.atomic(using=source):
+                delete_rows(
+                    source, Message, [message.pk for message in batch]
+                )
+            moved += len(batch)
+
+        if source != DEFAULT_DB_ALIAS:
+            delete_rows(source, User, [user_id])
+        response_cache.invalidate_user(user_id)
+        return moved
@@ -0,0 +1,39 @@
+import sqlite3
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+
+class Command(BaseCommand):
+    help = (
+        'Copy the default SQLite database onto the DATABASE_REPLICAS files '
+        'every --lag seconds, to try replica routing locally.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lag', type=float, default=1.0)
+        parser.add_argument(
+            '--once', action='store_true', help='Copy once and exit.'
+        )
+
+    def handle(self, *args, **options):
+        primary = connections['default']
+        if primary.vendor != 'sqlite':
+            raise CommandError('Only SQLite databases can be copied.')
+        if not settings.DATABASE_REPLICAS:
+            raise CommandError('DATABASE_REPLICAS is empty.')
+
+        while True:
+            primary.ensure_connection()
+            for alias in settings.DATABASE_REPLICAS:
+                replica = sqlite3.connect(settings.DATABASES[alias]['NAME'])
+                try:
+                    # A consistent snapshot, even while the primary is
+                    # being written to.
+                    primary.connection.backup(replica)
+                finally:
+                    replica.close()
+            if options['once']:
+                return
+            time.sleep(options['lag'])
@@ -1,14 +1,79 @@
+from collections import defaultdict
+from decouple import config
+from django.db import connections, transaction
+from django.db.models import F
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.http import Http404, StreamingHttpResponse
+from django.utils import timezone
+from rest_framework import serializers, status
+from rest_framework.decorators import action
+from rest_framework.response import Response
 from rest_framework.viewsets import GenericViewSet
-from drf.users import LimitOffsetPagination
-from drf.models import Message
+from drf.users import SwitchablePagination
+from drf.models import User, Message
 from drf.serializers import MessageSerializer
 from rest_framework.mixins import (
-    CreateModelMixin, ListModelMixin,
-    RetrieveModelMixin, UpdateModelMixin, DestroyModelMixin)
+    CreateModelMixin, RetrieveModelMixin, UpdateModelMixin, DestroyModelMixin)
+from drf.db_routers import replica_reads
+from drf.mixins import (
+    ConditionalGetMixin, ReplicaReadMixin, ValuesListModelMixin)
 from rest_framework.authentication import BaseAuthentication
-from rest_framework.exceptions import AuthenticationFailed
-from drf.common_methods import authorization, AuthorizeError
-from rest_framework.filters import SearchFilter
+from rest_framework.exceptions import AuthenticationFailed, ValidationError
+from drf.common_methods import (
+    aauthorization, adjust_message_count, authorization, AuthorizeError)
+from drf.search import FullTextSearchFilter
+from drf.sharding import sharding_enabled
+from drf.renderers import CSVRenderer, NDJSONRenderer
+from drf.response_cache import ResponseCacheMixin, response_cache
+
+EXPORT_CHUNK_SIZE = config('EXPORT_CHUNK_SIZE', default=2000, cast=int)
+BULK_BATCH_SIZE = config('BULK_BATCH_SIZE', default=500, cast=int)
+BULK_MAX_ITEMS = config('BULK_MAX_ITEMS', default=5000, cast=int)
+SINGLE_STATEMENT_WRITES = config(
+    'SINGLE_STATEMENT_WRITES', default=False, cast=bool
+)
+
+
+def query_param_flag(request, name, default):
+    value = request.query_params.get(name)
+    if value is None:
+        return default
+    return value.lower() not in ('0', 'false', 'no', 'off')
+
+
+def stream_rows(queryset, chunk_size):
+    """Iterate ``queryset`` through a server-side cursor where there is one.
+
+    On PostgreSQL the cursor is opened inside a transaction: in autocommit
+    mode Django declares it WITH HOLD, and the server then copies the whole
+    result when the declaring statement commits.
+    """
+    if connections[queryset.db].vendor != 'postgresql':
+        yield from queryset.iterator(chunk_size=chunk_size)
+        return
+    with transaction.atomic(using=queryset.db):
+        yield from queryset.iterator(chunk_size=chunk_size)
+
+
+def delete_owned_messages(user_id, ids):
+    """Delete the messages of ``user_id`` among ``ids`` in one statement.
+
+    Runs ``DELETE ... WHERE id IN (...) AND user_id = ? RETURNING id`` and
+    returns the deleted ids. Messages have no dependent rows, so nothing
+    needs collecting; the caller adjusts the message count and caches
+    instead of the per-row delete signals.
+    """
+    alias = Message.objects.for_user(user_id).db
+    connection = connections[alias]
+    quote_name = connection.ops.quote_name
+    pk = quote_name(Message._meta.pk.column)
+    sql = 'DELETE FROM %s WHERE %s IN (%s) AND %s = %%s RETURNING %s' % (
+        quote_name(Message._meta.db_table), pk, ', '.join(['%s'] * len(ids)),
+        quote_name(Message._meta.get_field('user').column), pk,
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [*ids, user_id])
+        return {row[0] for row in cursor.fetchall()}
 
 
 class JWTAuthentication(BaseAuthentication):
@@ -20,19 +85,328 @@ class JWTAuthentication(BaseAuthentication):
         except AuthorizeError:
             raise AuthenticationFailed('invalid jwt.')
 
+    async def aauthenticate(self, request):
+        token = request.headers.get('Authorization')
+        try:
+            user = await aauthorization(token)
+            return (user, None)
+        except AuthorizeError:
+            raise AuthenticationFailed('invalid jwt.')
+
 
 class MessageViewSet(
-    CreateModelMixin, ListModelMixin,
+    ReplicaReadMixin, ResponseCacheMixin, ConditionalGetMixin,
+    CreateModelMixin, ValuesListModelMixin,
     UpdateModelMixin, RetrieveModelMixin,
     DestroyModelMixin, GenericViewSet
      ):
     def get_queryset(self):
         user = self.request.user
-        return Message.objects.filter(user=user)
+        if self.action in ('list', 'retrieve'):
+            # Every row belongs to the authenticated user; the related
+            # manager hands that same object to each message's ``user``.
+            queryset = user.message_set.all()
+        elif sharding_enabled():
+            # Users live on the directory database, so there is no join;
+            # ``user`` is loaded from there when serializing.
+            queryset = Message.objects.for_user(user.pk).only(
+                'id', 'title', 'body', 'version', 'updated_at', 'user_id',
+            )
+        else:
+            queryset = Message.objects.filter(
+                user_id=user.pk
+            ).select_related('user').only(
+                'id', 'title', 'body', 'version', 'updated_at',
+                'user__id', 'user__email', 'user__json_web_token',
+            )
+        return queryset.order_by('id')
+
+    def get_owned_queryset(self):
+        """The requested message as ``WHERE id = ? AND user_id = ?``."""
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        try:
+            return Message.objects.for_user(self.request.user.pk).filter(
+                pk=self.kwargs[lookup_url_kwarg],
+            )
+        except (TypeError, ValueError, DjangoValidationError):
+            raise Http404
+
+    def update(self, request, *args, **kwargs):
+        if not self.single_statement_writes:
+            return super().update(request, *args, **kwargs)
+
+        partial = kwargs.pop('partial', False)
+        serializer = self.get_serializer(data=request.data, partial=partial)
+        serializer.is_valid(raise_exception=True)
+        changes = serializer.validated_data
+        queryset = self.get_owned_queryset()
+        # One UPDATE of the changed columns; ownership is in the WHERE clause.
+        if changes:
+            found = queryset.update(
+                **changes, version=F('version') + 1,
+                updated_at=timezone.now(),
+            )
+        else:
+            found = queryset.exists()
+        if not found:
+            raise Http404(
+                'No %s matches the given query.' % Message._meta.object_name
+            )
+        response_cache.invalidate_user_on_commit(
+            request.user.pk, queryset.db
+        )
+
+        missing = [
+            field.source for field in serializer._writable_fields
+            if field.source not in changes
+        ]
+        if missing:
+            changes.update(queryset.values(*missing).get())
+        message = Message(
+            pk=self.kwargs[self.lookup_url_kwarg or self.lookup_field],
+            user=request.user, **changes
+        )
+        return Response(serializer.to_representation(message))
+
+    def destroy(self, request, *args, **kwargs):
+        if not self.single_statement_writes:
+            return super().destroy(request, *args, **kwargs)
+
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        try:
+            pk = Message._meta.pk.to_python(self.kwargs[lookup_url_kwarg])
+        except DjangoValidationError:
+            raise Http404
+        user_id = request.user.pk
+        alias = Message.objects.for_user(user_id).db
+        with transaction.atomic(using=alias):
+            # The affected row count decides the 404.
+            if not delete_owned_messages(user_id, [pk]):
+                raise Http404(
+                    'No %s matches the given query.'
+                    % Message._meta.object_name
+                )
+            adjust_message_count(user_id, -1)
+            response_cache.invalidate_user_on_commit(user_id, alias)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    def get_list_validators(self, rows, count):
+        # Every row embeds the user, so its changes invalidate the list.
+        # Read it again, from the directory database: the authenticated one
+        # may come from token_cache and shards only hold a mirror, and both
+        # miss writes made with update().
+        user = User.objects.filter(pk=self.request.user.pk).values_list(
+            'version', 'updated_at'
+        )
+        validators = user.first()
+        if validators is None:
+            # The user may not have reached the replica yet.
+            with replica_reads(False):
+                validators = user.get()
+        user_version, user_updated_at = validators
+        return {
+            **super().get_list_validators(rows, count),
+            'user_version': user_version,
+            'user_updated_at': user_updated_at,
+        }
+
+    def get_object_validators(self, instance):
+        return {
+            **super().get_object_validators(instance),
+            'user_version': instance.user.version,
+            'user_updated_at': instance.user.updated_at,
+        }
+
+    def get_cached_count(self):
+        # The cached count only covers the unfiltered list.
+        for backend in self.filter_backends:
+            param = getattr(backend, 'search_param', None)
+            if param and self.request.query_params.get(param):
+                return None
+        return User.objects.values_list('message_count', flat=True).get(
+            pk=self.request.user.pk
+        )
+
+    @action(
+        detail=False, methods=['get'],
+        renderer_classes=[NDJSONRenderer, CSVRenderer],
+    )
+    def export(self, request):
+        """Stream every message of the user, oldest first.
+
+        ``?format=csv`` (or ``Accept: text/csv``) switches from NDJSON to
+        CSV; ``?after=<id>`` resumes after the last id received.
+        """
+        try:
+            after = serializers.IntegerField(min_value=0).run_validation(
+                request.query_params.get('after', 0)
+            )
+        except ValidationError as exc:
+            raise ValidationError({'after': exc.detail})
+        fields = ('id', 'title', 'body')
+        rows = stream_rows(Message.objects.for_user(request.user.pk).filter(
+            id__gt=after
+        ).order_by('id').values_list(*fields), EXPORT_CHUNK_SIZE)
+        renderer = request.accepted_renderer
+        content_type = renderer.media_type
+        if renderer.charset:
+            content_type += '; charset=%s' % renderer.charset
+        response = StreamingHttpResponse(
+            renderer.render_stream(fields, rows), content_type=content_type
+        )
+        response['Content-Disposition'] = (
+            'attachment; filename="messages.%s"' % renderer.format
+        )
+        return response
+
+    def get_bulk_items(self, items):
+        if not isinstance(items, list):
+            raise ValidationError(
+                {'non_field_errors': ['Expected a list of items.']}
+            )
+        if not items:
+            raise ValidationError(
+                {'non_field_errors': ['This list may not be empty.']}
+            )
+        if len(items) > BULK_MAX_ITEMS:
+            raise ValidationError({'non_field_errors': [
+                'Ensure this list has no more than %d items.' % BULK_MAX_ITEMS
+            ]})
+        return items
+
+    @action(detail=False, methods=['post'], url_path='bulk')
+    def bulk_create(self, request):
+        """Create a JSON array of ``{title, body}`` in one transaction.
+
+        By default the batch is all-or-nothing; with ``?atomic=false`` the
+        valid items are created and the invalid ones reported.
+        """
+        items = self.get_bulk_items(request.data)
+        child = self.get_serializer()
+        valid, errors = [], []
+        for index, item in enumerate(items):
+            try:
+                valid.append(child.run_validation(item))
+            except ValidationError as exc:
+                errors.append({'index': index, 'errors': exc.detail})
+
+        if not valid or (errors and query_param_flag(request, 'atomic', True)):
+            return Response(
+                {'errors': errors}, status=status.HTTP_400_BAD_REQUEST
+            )
+
+        user_id = request.user.pk
+        queryset = Message.objects.for_user(user_id)
+        with transaction.atomic(using=queryset.db):
+            created = queryset.bulk_create(
+                [Message(user_id=user_id, **data) for data in valid],
+                batch_size=BULK_BATCH_SIZE,
+            )
+            adjust_message_count(user_id, len(created))
+            response_cache.invalidate_user_on_commit(user_id, queryset.db)
+        return Response({
+            'created': len(created),
+            'ids': [message.pk for message in created],
+            'errors': errors,
+        }, status=status.HTTP_201_CREATED)
+
+    @action(detail=False, methods=['patch'], url_path='batch')
+    def batch_update(self, request):
+        """Apply ``[{id, title?, body?}, ...]`` with ``bulk_update``.
+
+        Items are grouped by the set of fields they change so each group is
+        one ``UPDATE ... WHERE id IN (...) AND user_id = ?``.
+        """
+        items = self.get_bulk_items(request.data)
+        id_field = serializers.IntegerField(min_value=1)
+        child = self.get_serializer(partial=True)
+        changes, errors = {}, []
+        for index, item in enumerate(items):
+            try:
+                if not isinstance(item, dict):
+                    raise ValidationError({'non_field_errors': [
+                        'Invalid data. Expected a dictionary.'
+                    ]})
+                message_id = id_field.run_validation(item.get('id'))
+                if message_id in changes:
+                    raise ValidationError({'id': ['Duplicated id.']})
+                data = child.run_validation(item)
+                if not data:
+                    raise ValidationError(
+                        {'non_field_errors': ['No fields to update.']}
+                    )
+            except ValidationError as exc:
+                errors.append({'index': index, 'errors': exc.detail})
+            else:
+                changes[message_id] = data
+        if errors:
+            return Response(
+                {'errors': errors}, status=status.HTTP_400_BAD_REQUEST
+            )
+
+        user_id = request.user.pk
+        queryset = Message.objects.for_user(user_id)
+        with transaction.atomic(using=queryset.db):
+            owned = set(queryset.filter(
+                id__in=list(changes)
+            ).values_list('id', flat=True))
+            groups = defaultdict(list)
+            updated_at = timezone.now()
+            for message_id, data in changes.items():
+                if message_id in owned:
+                    groups[tuple(sorted(data))].append(Message(
+                        id=message_id, user_id=user_id, **data,
+                        version=F('version') + 1, updated_at=updated_at,
+                    ))
+            for fields, messages in groups.items():
+                queryset.bulk_update(
+                    messages, fields + ('updated_at', 'version'),
+                    batch_size=BULK_BATCH_SIZE,
+                )
+            if owned:
+                response_cache.invalidate_user_on_commit(
+                    user_id, queryset.db
+                )
+        return Response({
+            'updated': [pk for pk in changes if pk in owned],
+            'not_found': [pk for pk in changes if pk not in owned],
+        })
+
+    @batch_update.mapping.delete
+    def batch_destroy(self, request):
+        """Delete ``{"ids": [...]}`` in a single statement.
+
+        One ``DELETE ... WHERE id IN (...) AND user_id = ? RETURNING id``
+        (see ``delete_owned_messages()``) reports which ids were deleted.
+        """
+        ids = serializers.ListField(
+            child=serializers.IntegerField(min_value=1),
+            allow_empty=False, max_length=BULK_MAX_ITEMS,
+        )
+        try:
+            ids = list(dict.fromkeys(ids.run_validation(
+                request.data.get('ids') if isinstance(request.data, dict)
+                else None
+            )))
+        except ValidationError as exc:
+            raise ValidationError({'ids': exc.detail})
+
+        user_id = request.user.pk
+        alias = Message.objects.for_user(user_id).db
+        with transaction.atomic(using=alias):
+            deleted = delete_owned_messages(user_id, ids)
+            if deleted:
+                adjust_message_count(user_id, -len(deleted))
+                response_cache.invalidate_user_on_commit(user_id, alias)
+        return Response({
+            'deleted': [pk for pk in ids if pk in deleted],
+            'not_found': [pk for pk in ids if pk not in deleted],
+        })
 
     queryset = Message.objects.all()
+    single_statement_writes = SINGLE_STATEMENT_WRITES
     serializer_class = MessageSerializer
-    pagination_class = LimitOffsetPagination
+    pagination_class = SwitchablePagination
     authentication_classes = [JWTAuthentication]
-    filter_backends = [SearchFilter]
+    filter_backends = [FullTextSearchFilter]
     search_fields = ['title', 'body']
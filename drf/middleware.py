@@ -0,0 +1,44 @@
+from django.conf import settings
+from django.contrib.auth import middleware as auth
+from django.contrib.messages import middleware as messages
+from django.contrib.sessions import middleware as sessions
+from django.middleware import csrf
+
+
+def is_api_request(request):
+    return request.path_info.startswith(tuple(settings.API_PATH_PREFIXES))
+
+
+class SkipAPIMixin:
+    """Passes requests under ``API_PATH_PREFIXES`` straight through.
+
+    The API authenticates with JWTs only, so sessions, CSRF tokens,
+    ``request.user`` and flash messages are never used there.
+    """
+
+    def __call__(self, request):
+        if is_api_request(request):
+            # A coroutine when the stack runs async, as the handler expects.
+            return self.get_response(request)
+        return super().__call__(request)
+
+
+class SessionMiddleware(SkipAPIMixin, sessions.SessionMiddleware):
+    pass
+
+
+class CsrfViewMiddleware(SkipAPIMixin, csrf.CsrfViewMiddleware):
+    def process_view(self, request, callback, callback_args, callback_kwargs):
+        if is_api_request(request):
+            return None
+        return super().process_view(
+            request, callback, callback_args, callback_kwargs
+        )
+
+
+class AuthenticationMiddleware(SkipAPIMixin, auth.AuthenticationMiddleware):
+    pass
+
+
+class MessageMiddleware(SkipAPIMixin, messages.MessageMiddleware):
+    pass
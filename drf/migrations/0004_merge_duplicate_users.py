@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:39
+
+from django.db import migrations
+from drf.dedupe import merge_duplicate_users
+
+
+def merge_duplicates(apps, schema_editor):
+    merge_duplicate_users(
+        apps.get_model('drf', 'User'), apps.get_model('drf', 'Message'),
+        using=schema_editor.connection.alias,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('drf', '0003_user_token_version'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicates, migrations.RunPython.noop),
+    ]
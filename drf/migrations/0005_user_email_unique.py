@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('drf', '0004_merge_duplicate_users'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='user',
+            name='email',
+            field=models.EmailField(max_length=128, unique=True),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('drf', '0005_user_email_unique'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['user', 'id'], name='messages_user_id_id_idx'),
+        ),
+        migrations.AlterField(
+            model_name='message',
+            name='user',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='drf.user'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:41
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_messages(apps, schema_editor):
+    User = apps.get_model('drf', 'User')
+    Message = apps.get_model('drf', 'Message')
+    counts = (
+        Message.objects.filter(user_id=OuterRef('pk'))
+        .order_by().values('user_id').annotate(n=Count('id')).values('n')
+    )
+    User.objects.using(schema_editor.connection.alias).update(
+        message_count=Coalesce(Subquery(counts), 0)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('drf', '0006_message_user_id_id_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='message_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(count_messages, migrations.RunPython.noop),
+    ]
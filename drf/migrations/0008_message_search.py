@@ -0,0 +1,21 @@
+from django.db import migrations
+from drf.search import install_message_search, uninstall_message_search
+
+
+def install(apps, schema_editor):
+    install_message_search(schema_editor)
+
+
+def uninstall(apps, schema_editor):
+    uninstall_message_search(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('drf', '0007_user_message_count'),
+    ]
+
+    operations = [
+        migrations.RunPython(install, uninstall),
+    ]
@@ -0,0 +1,59 @@
+from django.db import migrations, models
+from django.utils import timezone
+from drf.search import install_message_search
+
+
+def reinstall_search(apps, schema_editor):
+    # Adding columns rebuilds ``messages`` on SQLite, dropping its triggers.
+    install_message_search(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('drf', '0008_message_search'),
+    ]
+
+    # The old TimeFields only stored the time of day and cannot be cast to
+    # a timestamp, so existing rows start out at the migration time.
+    operations = [
+        migrations.RemoveField(model_name='user', name='create_at'),
+        migrations.RemoveField(model_name='user', name='updated_at'),
+        migrations.AddField(
+            model_name='user',
+            name='create_at',
+            field=models.DateTimeField(
+                auto_now_add=True, default=timezone.now
+            ),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='version',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name='message',
+            name='create_at',
+            field=models.DateTimeField(
+                auto_now_add=True, default=timezone.now
+            ),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='message',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='message',
+            name='version',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.RunPython(reinstall_search, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:10
+
+import datetime
+from django.db import migrations, models, router
+from drf.sharding import WORKER_BITS
+
+
+def create_leases(apps, schema_editor):
+    IdWorkerLease = apps.get_model('drf', 'IdWorkerLease')
+    alias = schema_editor.connection.alias
+    if not router.allow_migrate_model(alias, IdWorkerLease):
+        return
+    expired = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+    IdWorkerLease.objects.using(alias).bulk_create([
+        IdWorkerLease(worker_id=worker_id, expires_at=expired)
+        for worker_id in range(1 << WORKER_BITS)
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('drf', '0009_versioned_rows'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IdWorkerLease',
+            fields=[
+                ('worker_id', models.PositiveSmallIntegerField(
+                    primary_key=True, serialize=False
+                )),
+                ('owner', models.CharField(blank=True, max_length=32)),
+                ('expires_at', models.DateTimeField()),
+            ],
+            options={
+                'db_table': 'id_worker_leases',
+            },
+        ),
+        migrations.RunPython(create_leases, migrations.RunPython.noop),
+    ]
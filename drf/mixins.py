@@ -0,0 +1,217 @@
+import datetime
+import hashlib
+from decouple import config
+from django.utils.cache import (
+    get_conditional_response, patch_cache_control, patch_vary_headers)
+from django.http import Http404
+from django.utils.http import http_date, quote_etag
+from rest_framework.mixins import ListModelMixin
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.response import Response
+from drf.db_routers import (
+    is_pinned, pin_user, reading_from_replicas, replica_reads, use_replicas)
+
+FAST_LIST = config('FAST_LIST', default=False, cast=bool)
+
+
+class ValuesListModelMixin(ListModelMixin):
+    """``list()`` that skips model instances when ``fast_list`` is set.
+
+    Rows are fetched with ``.values()`` and rendered by the serializer's
+    ``to_representation_values()`` (see ``ValuesSerializerMixin``), giving
+    the same response body as the regular serializer path.
+    """
+
+    fast_list = FAST_LIST
+    # Columns fetched with each row besides the serialized ones.
+    extra_values_fields = ()
+
+    def list(self, request, *args, **kwargs):
+        if not self.fast_list:
+            return super().list(request, *args, **kwargs)
+
+        serializer = self.get_serializer()
+        related = serializer.get_values_related()
+        queryset = self.filter_queryset(self.get_queryset()).values(
+            *serializer.get_values_fields(related), *self.extra_values_fields
+        )
+
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(
+                serializer.to_representation_values(page, related)
+            )
+
+        return Response(serializer.to_representation_values(queryset, related))
+
+
+class ConditionalGetMixin:
+    """ETag/Last-Modified and 304 responses for ``list()`` and ``retrieve()``.
+
+    A list page is validated by the total count and the ``pk`` and
+    ``version`` of its rows (see ``get_list_validators()``), a single
+    object by the fetched row. A conditional list request only fetches
+    those columns, so an unchanged page is answered before anything is
+    serialized; other requests take them from the page they fetch. The
+    model needs ``version`` and ``updated_at`` (see ``VersionedModel``).
+
+    Lists are only validated when the paginator's ``conditional`` is true
+    (the default): paginations that avoid a full count skip it.
+    """
+
+    # Lets ``fast_list`` pages be validated like model instances.
+    extra_values_fields = ('version', 'updated_at')
+
+    def get_list_paginator(self):
+        paginator = self.paginator
+        get_pagination_class = getattr(
+            paginator, 'get_pagination_class', None
+        )
+        if get_pagination_class is not None:
+            paginator = get_pagination_class(self.request)()
+        return paginator
+
+    def list_is_conditional(self):
+        return getattr(self.get_list_paginator(), 'conditional', True)
+
+    def get_list_validators(self, rows, count):
+        # The count moves the pagination links, the rows cover the page.
+        return {
+            'count': count,
+            'rows': [(pk, version) for pk, version, _ in rows],
+            'updated_at': max(
+                (updated_at for _, _, updated_at in rows), default=None
+            ),
+        }
+
+    def get_row_validators(self, row):
+        if isinstance(row, dict):
+            return row['id'], row['version'], row['updated_at']
+        return row.pk, row.version, row.updated_at
+
+    def fetch_list_validators(self, queryset):
+        """Validators of the requested page, without building the body."""
+        paginator = self.get_list_paginator()
+        offset = paginator.get_offset(self.request)
+        limit = paginator.get_limit(self.request)
+        page = list(queryset.values_list(
+            'pk', 'version', 'updated_at'
+        )[offset:offset + limit])
+        if page and len(page) < limit:
+            # A short page is the last one.
+            count = offset + len(page)
+        else:
+            count = paginator.get_count(queryset)
+        return self.get_list_validators(page, count)
+
+    def paginate_queryset(self, queryset):
+        self.page = super().paginate_queryset(queryset)
+        return self.page
+
+    def get_object_validators(self, instance):
+        return {
+            'pk': instance.pk,
+            'version': instance.version,
+            'updated_at': instance.updated_at,
+        }
+
+    def conditional_response(self, request, validators, get_response):
+        key = repr((
+            request.accepted_renderer.format,
+            sorted(request.query_params.lists()),
+            sorted(validators.items()),
+        ))
+        etag = quote_etag(
+            hashlib.md5(key.encode(), usedforsecurity=False).hexdigest()
+        )
+        timestamps = [
+            value for value in validators.values()
+            if isinstance(value, datetime.datetime)
+        ]
+        last_modified = None
+        if timestamps:
+            last_modified = int(max(timestamps).timestamp())
+
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            response = get_response()
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+            if last_modified is not None:
+                response['Last-Modified'] = http_date(last_modified)
+            patch_cache_control(response, private=True, no_cache=True)
+            patch_vary_headers(response, ['Authorization'])
+        return response
+
+    def list(self, request, *args, **kwargs):
+        if not self.list_is_conditional():
+            return super().list(request, *args, **kwargs)
+
+        if not (
+            request.headers.get('If-None-Match')
+            or request.headers.get('If-Modified-Since')
+        ):
+            response = super().list(request, *args, **kwargs)
+            # ``SwitchablePagination`` keeps the paginator it delegated to.
+            paginator = getattr(self.paginator, 'paginator', self.paginator)
+            validators = self.get_list_validators(
+                [self.get_row_validators(row) for row in self.page],
+                paginator.count,
+            )
+            return self.conditional_response(
+                request, validators, lambda: response
+            )
+
+        queryset = self.filter_queryset(self.get_queryset())
+        validators = self.fetch_list_validators(queryset)
+        return self.conditional_response(
+            request, validators,
+            lambda: super(ConditionalGetMixin, self).list(
+                request, *args, **kwargs
+            ),
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        return self.conditional_response(
+            request, self.get_object_validators(instance),
+            lambda: Response(self.get_serializer(instance).data),
+        )
+
+
+class ReplicaReadMixin:
+    """Serves ``replica_actions`` from read replicas (see ``db_routers``).
+
+    Authentication reads follow the action. A successful unsafe request
+    pins its user to the primary for ``REPLICA_STICKY_SECONDS`` so they read
+    their own writes, and an object missing on a lagging replica is looked
+    up again on the primary.
+    """
+
+    replica_actions = ('list', 'retrieve')
+
+    def dispatch(self, request, *args, **kwargs):
+        with replica_reads(False):
+            return super().dispatch(request, *args, **kwargs)
+
+    def initial(self, request, *args, **kwargs):
+        use_replicas(self.action in self.replica_actions)
+        super().initial(request, *args, **kwargs)
+        if reading_from_replicas() and is_pinned(request.user.pk):
+            use_replicas(False)
+
+    def get_object(self):
+        try:
+            return super().get_object()
+        except Http404:
+            if not reading_from_replicas():
+                raise
+        with replica_reads(False):
+            return super().get_object()
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            pin_user(request.user.pk)
+        return super().finalize_response(request, response, *args, **kwargs)
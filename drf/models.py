@@ -1,23 +1,149 @@
-from django.db import models
+from django.db import connections, models, transaction
+from django.db.models.sql import UpdateQuery
+from drf.sharding import next_id, shard_for_user, sharding_enabled
 
 
-class User(models.Model):
-    email = models.EmailField(max_length=128, blank=False, null=False)
+class VersionedModel(models.Model):
+    """Row with timestamps and a version bumped on every save.
+
+    Writes that bypass ``save()`` (``update()``, ``bulk_update()``) must
+    set ``version=F('version') + 1`` and ``updated_at`` themselves.
+    """
+
+    create_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    version = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        if self._state.adding:
+            return super().save(*args, **kwargs)
+        version = self.version
+        # Bumped in the UPDATE so concurrent saves never reuse a version.
+        self.version = models.F('version') + 1
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = {
+                *update_fields, 'updated_at', 'version'
+            }
+        try:
+            super().save(*args, **kwargs)
+        except Exception:
+            self.version = version
+            raise
+        if isinstance(self.version, models.Expression):
+            # The UPDATE couldn't return the new version.
+            self.refresh_from_db(using=self._state.db, fields=['version'])
+
+    def _do_update(self, base_qs, using, pk_val, values, update_fields,
+                   forced_update):
+        connection = connections[using]
+        if not (
+            values
+            and connection.vendor in ('postgresql', 'sqlite')
+            and connection.features.can_return_columns_from_insert
+        ):
+            return super()._do_update(
+                base_qs, using, pk_val, values, update_fields, forced_update
+            )
+        query = base_qs.filter(pk=pk_val).query.chain(UpdateQuery)
+        query.add_update_fields(values)
+        sql, params = query.get_compiler(using).as_sql()
+        column = self._meta.get_field('version').column
+        with transaction.mark_for_rollback_on_error(using):
+            with connection.cursor() as cursor:
+                cursor.execute('%s RETURNING %s' % (
+                    sql, connection.ops.quote_name(column)
+                ), params)
+                row = cursor.fetchone()
+        if row is None:
+            return False
+        self.version = row[0]
+        return True
+
+
+class User(VersionedModel):
+    email = models.EmailField(
+        max_length=128, blank=False, null=False, unique=True
+    )
     json_web_token = models.CharField(max_length=1024, blank=False, null=False)
-    create_at = models.TimeField(auto_now_add=True)
-    updated_at = models.TimeField(auto_now=True)
+    token_version = models.PositiveIntegerField(default=0)
+    message_count = models.PositiveIntegerField(default=0)
 
     class Meta:
         db_table = "users"
 
 
-class Message(models.Model):
-    user = models.ForeignKey(User, on_delete=models.CASCADE)
+class IdWorkerLease(models.Model):
+    """A worker id of ``drf.sharding.IdGenerator`` and who holds it."""
+
+    worker_id = models.PositiveSmallIntegerField(primary_key=True)
+    owner = models.CharField(max_length=32, blank=True)
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        db_table = 'id_worker_leases'
+
+
+class MessageQuerySet(models.QuerySet):
+    def for_user(self, user_id):
+        """The user's messages, on the shard that holds them."""
+        queryset = self.filter(user_id=user_id)
+        if sharding_enabled():
+            queryset = queryset.using(shard_for_user(user_id))
+        return queryset
+
+    def create(self, **kwargs):
+        # Without a hint the router can't tell the shard of a new row.
+        if self._db is None and sharding_enabled():
+            user = kwargs.get('user')
+            user_id = kwargs['user_id'] if user is None else user.pk
+            return self.using(shard_for_user(user_id)).create(**kwargs)
+        return super().create(**kwargs)
+
+    def bulk_create(self, objs, *args, **kwargs):
+        if not sharding_enabled():
+            return super().bulk_create(objs, *args, **kwargs)
+
+        objs = list(objs)
+        by_shard = {}
+        for obj in objs:
+            if obj.pk is None:
+                obj.pk = next_id()
+            by_shard.setdefault(
+                self._db or shard_for_user(obj.user_id), []
+            ).append(obj)
+        for alias, shard_objs in by_shard.items():
+            super(MessageQuerySet, self.using(alias)).bulk_create(
+                shard_objs, *args, **kwargs
+            )
+        return objs
+
+
+class Message(VersionedModel):
+    # Lookups by user are served by the (user_id, id) index below.
+    user = models.ForeignKey(User, on_delete=models.CASCADE, db_index=False)
     title = models.CharField(max_length=512)
     body = models.TextField(max_length=2048)
 
+    objects = MessageQuerySet.as_manager()
+
     def is_authenticated(self):
         return True
 
+    def save(self, *args, **kwargs):
+        if self.pk is None and sharding_enabled():
+            # Shards can't hand out ids that are unique across all of them.
+            self.pk = next_id()
+            kwargs.setdefault('force_insert', True)
+        super().save(*args, **kwargs)
+
     class Meta:
         db_table = 'messages'
+        indexes = [
+            models.Index(
+                fields=['user', 'id'], name='messages_user_id_id_idx'
+            ),
+        ]
@@ -0,0 +1,53 @@
+from django.http import FileResponse
+from rest_framework.authentication import (
+    BasicAuthentication, SessionAuthentication)
+from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.viewsets import ViewSet
+from drf.profiling import profile_store
+
+# Left out of the list, which stays small however many captures are kept.
+DETAIL_FIELDS = ('queries', 'top')
+
+
+class ProfileViewSet(ViewSet):
+    """Captures of ``drf.profiling.ProfilerMiddleware``, for staff users.
+
+    ``/drf/`` skips the session middleware, so authenticate with HTTP
+    Basic credentials of a Django staff user.
+    """
+
+    authentication_classes = [BasicAuthentication, SessionAuthentication]
+    permission_classes = [IsAdminUser]
+
+    def get_report(self, pk):
+        report = profile_store.get(pk)
+        if report is None:
+            raise NotFound('No profile matches the given query.')
+        return report
+
+    def list(self, request):
+        return Response([
+            {
+                name: value for name, value in report.items()
+                if name not in DETAIL_FIELDS
+            }
+            for report in profile_store.list()
+        ])
+
+    def retrieve(self, request, pk=None):
+        return Response(self.get_report(pk))
+
+    @action(detail=True)
+    def download(self, request, pk=None):
+        """The raw cProfile data, for ``python -m pstats`` or snakeviz."""
+        self.get_report(pk)
+        try:
+            stream = open(profile_store.path(pk, '.prof'), 'rb')
+        except FileNotFoundError:
+            raise NotFound('No profile matches the given query.')
+        return FileResponse(
+            stream, as_attachment=True, filename='%s.prof' % pk
+        )
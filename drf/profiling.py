@@ -0,0 +1,323 @@
+import base64
+import cProfile
+import json
+import os
+import pstats
+import re
+import tempfile
+import time
+import uuid
+from contextlib import ExitStack
+
+from asgiref.sync import (
+    iscoroutinefunction, markcoroutinefunction, sync_to_async)
+from decouple import Csv, config
+from django.core import signing
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.utils import timezone
+from drf.common_methods import AuthorizeError, decode_bearer_token
+
+# Requests are profiled when they carry PROFILE_HEADER signed with
+# PROFILE_SECRET (see the profile_header command) or a JWT of one of
+# PROFILE_USER_IDS. With neither set the middleware removes itself.
+PROFILE_SECRET = config('PROFILE_SECRET', default='')
+PROFILE_USER_IDS = frozenset(config('PROFILE_USER_IDS', default='',
+                                    cast=Csv(int)))
+PROFILE_HEADER = 'X-Profile'
+PROFILE_HEADER_MAX_AGE = config(
+    'PROFILE_HEADER_MAX_AGE', default=24 * 3600, cast=int
+)
+PROFILE_DIR = config(
+    'PROFILE_DIR', default=os.path.join(tempfile.gettempdir(), 'drf-profiles')
+)
+PROFILE_KEEP = config('PROFILE_KEEP', default=100, cast=int)
+PROFILE_MAX_QUERIES = 1000
+PROFILE_TOP_FUNCTIONS = 30
+
+# Functions whose cumulative time makes up each phase; they overlap with
+# the database time of the queries they run.
+PHASES = {
+    'auth': ('rest_framework/request.py', '_authenticate'),
+    'serialize': ('rest_framework/serializers.py', 'data'),
+    'render': ('rest_framework/response.py', 'rendered_content'),
+}
+
+PROFILE_ID = re.compile(r'^\d+-[0-9a-f]{8}$')
+
+
+def _signer():
+    return signing.TimestampSigner(key=PROFILE_SECRET, salt='drf.profiling')
+
+
+def sign_profile_request():
+    """A value for ``PROFILE_HEADER`` valid for PROFILE_HEADER_MAX_AGE."""
+    return _signer().sign('profile')
+
+
+def claimed_user_id(bearer_token):
+    """The ``uid`` claim of a bearer token, unverified, or None."""
+    try:
+        payload = bearer_token[7:].split('.')[1]
+        user_id = json.loads(base64.urlsafe_b64decode(
+            payload + '=' * (-len(payload) % 4)
+        )).get('uid')
+    except (AttributeError, IndexError, TypeError, ValueError):
+        return None
+    return user_id if isinstance(user_id, int) else None
+
+
+def profiled_user_id(request):
+    """Why ``request`` is profiled: ``(True, user id or None)``, or
+    ``(False, None)``. Costs nothing unless a trigger is configured.
+
+    Allowlisted users are recognized by the ``uid`` claim of their token;
+    only tokens claiming one of them are verified here.
+    """
+    value = request.headers.get(PROFILE_HEADER) if PROFILE_SECRET else None
+    if value:
+        try:
+            _signer().unsign(value, max_age=PROFILE_HEADER_MAX_AGE)
+        except signing.BadSignature:
+            pass
+        else:
+            return True, None
+    bearer_token = request.headers.get('Authorization')
+    if PROFILE_USER_IDS and claimed_user_id(bearer_token) in PROFILE_USER_IDS:
+        try:
+            _, user, _ = decode_bearer_token(bearer_token)
+        except AuthorizeError:
+            return False, None
+        if user is not None and user.pk in PROFILE_USER_IDS:
+            return True, user.pk
+    return False, None
+
+
+class QueryRecorder:
+    """Execute wrapper collecting the statements a request runs."""
+
+    def __init__(self, alias, queries):
+        self.alias = alias
+        self.queries = queries
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            if len(self.queries) < PROFILE_MAX_QUERIES:
+                self.queries.append({
+                    'alias': self.alias,
+                    'sql': sql,
+                    'many': many,
+                    'ms': (time.perf_counter() - start) * 1e3,
+                })
+
+
+class Capture:
+    """Profiler and query recorders around one request."""
+
+    def __init__(self, request, user_id, scope='request'):
+        self.request = request
+        self.user_id = user_id
+        self.scope = scope
+        self.queries = []
+        self.profiler = cProfile.Profile()
+        self.stack = ExitStack()
+
+    def record_queries(self):
+        for connection in connections.all():
+            self.stack.enter_context(connection.execute_wrapper(
+                QueryRecorder(connection.alias, self.queries)
+            ))
+
+    def start(self):
+        self.started_at = timezone.now()
+        self.start_time = time.perf_counter()
+        self.profiler.enable()
+
+    def stop(self):
+        self.profiler.disable()
+        self.elapsed = time.perf_counter() - self.start_time
+
+    def __enter__(self):
+        self.record_queries()
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+        self.stack.close()
+
+    def report(self, response):
+        stats = pstats.Stats(self.profiler)
+        breakdown = {'total': self.elapsed * 1e3, 'db': sum(
+            query['ms'] for query in self.queries
+        )}
+        for phase, (suffix, name) in PHASES.items():
+            breakdown[phase] = max((
+                entry[3] * 1e3
+                for (filename, _, function), entry in stats.stats.items()
+                if function == name
+                and filename.replace(os.sep, '/').endswith(suffix)
+            ), default=0.0)
+        top = sorted(
+            stats.stats.items(), key=lambda item: item[1][3], reverse=True
+        )[:PROFILE_TOP_FUNCTIONS]
+        return {
+            'method': self.request.method,
+            'path': self.request.get_full_path(),
+            'status': response.status_code,
+            'user_id': self.user_id,
+            # 'event loop' when other coroutines ran in the same profile.
+            'scope': self.scope,
+            'started_at': self.started_at.isoformat(),
+            'breakdown_ms': breakdown,
+            'query_count': len(self.queries),
+            'queries': self.queries,
+            'top': [
+                {
+                    'function': '%s:%d(%s)' % key,
+                    'calls': entry[1],
+                    'tottime_ms': entry[2] * 1e3,
+                    'cumtime_ms': entry[3] * 1e3,
+                }
+                for key, entry in top
+            ],
+        }
+
+
+class ProfileStore:
+    """The last ``keep`` captures as files in ``directory``.
+
+    Each capture is ``<id>.json`` with the report and ``<id>.prof`` with
+    the raw cProfile data, for ``python -m pstats`` or snakeviz. Ids sort
+    by time, so the oldest are the first to go.
+    """
+
+    def __init__(self, directory=PROFILE_DIR, keep=PROFILE_KEEP):
+        self.directory = directory
+        self.keep = keep
+
+    def path(self, profile_id, extension):
+        if not PROFILE_ID.match(profile_id or ''):
+            return None
+        return os.path.join(self.directory, profile_id + extension)
+
+    def save(self, capture, report):
+        os.makedirs(self.directory, exist_ok=True)
+        profile_id = '%d-%s' % (time.time_ns(), uuid.uuid4().hex[:8])
+        report = {'id': profile_id, **report}
+        # Written aside and renamed, so readers never see partial files.
+        prof_path = self.path(profile_id, '.prof')
+        capture.profiler.dump_stats(prof_path + '.tmp')
+        os.replace(prof_path + '.tmp', prof_path)
+        json_path = self.path(profile_id, '.json')
+        with open(json_path + '.tmp', 'w') as f:
+            json.dump(report, f)
+        os.replace(json_path + '.tmp', json_path)
+        self.prune()
+        return profile_id
+
+    def ids(self):
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        return sorted(
+            name[:-5] for name in names
+            if name.endswith('.json') and PROFILE_ID.match(name[:-5])
+        )
+
+    def prune(self):
+        ids = self.ids()
+        for profile_id in ids[:max(len(ids) - self.keep, 0)]:
+            for extension in ('.json', '.prof'):
+                try:
+                    os.remove(self.path(profile_id, extension))
+                except FileNotFoundError:
+                    # Another process pruned it first.
+                    pass
+
+    def get(self, profile_id):
+        path = self.path(profile_id, '.json')
+        if path is None:
+            return None
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def list(self):
+        reports = (self.get(profile_id) for profile_id in reversed(
+            self.ids()
+        ))
+        return [report for report in reports if report is not None]
+
+
+profile_store = ProfileStore()
+
+
+class ProfilerMiddleware:
+    """Profiles requests chosen by ``profiled_user_id()``.
+
+    Others only pay for that check, and nothing at all when no trigger is
+    configured. Reports are kept in ``profile_store`` and their id is
+    returned in the ``X-Profile-Id`` header.
+
+    Under ASGI the profiler sees the whole event loop, including other
+    requests' coroutines, so only one async request is profiled at a time
+    and the others run unprofiled.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not PROFILE_SECRET and not PROFILE_USER_IDS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.async_capturing = False
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        profiled, user_id = profiled_user_id(request)
+        if not profiled:
+            return self.get_response(request)
+        with Capture(request, user_id) as capture:
+            response = self.get_response(request)
+        return self.store(capture, response)
+
+    async def __acall__(self, request):
+        profiled, user_id = profiled_user_id(request)
+        # A second profiler on the loop thread would replace the first.
+        if not profiled or self.async_capturing:
+            return await self.get_response(request)
+        self.async_capturing = True
+        capture = Capture(request, user_id, scope='event loop')
+        try:
+            # Queries run on the connections of the thread that
+            # sync_to_async uses for this request; only the event loop
+            # thread is profiled.
+            await sync_to_async(capture.record_queries)()
+            capture.start()
+            try:
+                response = await self.get_response(request)
+            finally:
+                capture.stop()
+                await sync_to_async(capture.stack.close)()
+        finally:
+            self.async_capturing = False
+        # Reporting and writing the files would block the event loop.
+        return await sync_to_async(self.store)(capture, response)
+
+    def store(self, capture, response):
+        response['X-Profile-Id'] = profile_store.save(
+            capture, capture.report(response)
+        )
+        return response
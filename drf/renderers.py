@@ -0,0 +1,183 @@
+import csv
+import json
+import math
+from django.conf import settings
+from rest_framework.utils.encoders import JSONEncoder
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+ORJSON_OPTIONS = (
+    orjson.OPT_NON_STR_KEYS
+    | orjson.OPT_PASSTHROUGH_DATETIME
+    | orjson.OPT_PASSTHROUGH_DATACLASS
+) if orjson is not None else 0
+
+
+def has_non_finite_float(data):
+    """Whether ``data`` holds a NaN or an infinity anywhere."""
+    stack = [data]
+    while stack:
+        value = stack.pop()
+        if isinstance(value, float):
+            if not math.isfinite(value):
+                return True
+        elif isinstance(value, dict):
+            stack.extend(value.values())
+        elif isinstance(value, (list, tuple)):
+            stack.extend(value)
+    return False
+
+
+class JSONFragment:
+    """Already serialized JSON that renderers embed verbatim."""
+
+    __slots__ = ('contents', )
+
+    def __init__(self, contents):
+        if isinstance(contents, str):
+            contents = contents.encode()
+        self.contents = contents
+
+    def __eq__(self, other):
+        if isinstance(other, JSONFragment):
+            return self.contents == other.contents
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(self.contents)
+
+    def __reduce__(self):
+        return (JSONFragment, (self.contents, ))
+
+    def __repr__(self):
+        return 'JSONFragment(%r)' % self.contents
+
+
+class FragmentJSONEncoder(JSONEncoder):
+    def default(self, obj):
+        if isinstance(obj, JSONFragment):
+            return json.loads(obj.contents)
+        return super().default(obj)
+
+
+class FastJSONRenderer(JSONRenderer):
+    """``JSONRenderer`` producing the same bytes through orjson.
+
+    Falls back to the stdlib encoder when orjson is not installed, when
+    indented or ASCII-only output is asked for, and for values orjson
+    cannot encode (e.g. integers wider than 64 bits). orjson writes NaN
+    and infinities as ``null``, so output with a ``null`` is checked for
+    them, which the stdlib encoder rejects (or writes as ``NaN`` when
+    ``strict`` is off).
+    """
+
+    encoder_class = FragmentJSONEncoder
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        if (
+            orjson is None or indent is not None
+            or not self.compact or self.ensure_ascii
+        ):
+            return super().render(
+                data, accepted_media_type, renderer_context
+            )
+
+        try:
+            ret = orjson.dumps(
+                data, default=self.default, option=ORJSON_OPTIONS
+            )
+        except TypeError:
+            return super().render(
+                data, accepted_media_type, renderer_context
+            )
+
+        if b'null' in ret and has_non_finite_float(data):
+            return super().render(
+                data, accepted_media_type, renderer_context
+            )
+
+        # Same \u2028 and \u2029 escaping as JSONRenderer.
+        if b'\xe2\x80' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028')
+            ret = ret.replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
+
+    def default(self, obj):
+        if isinstance(obj, JSONFragment):
+            fragment = getattr(orjson, 'Fragment', None)
+            if fragment is not None:
+                return fragment(obj.contents)
+            return orjson.loads(obj.contents)
+        return self.encoder_class().default(obj)
+
+
+class NDJSONRenderer(BaseRenderer):
+    """Newline-delimited JSON, one object per row."""
+
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return FastJSONRenderer().render(data) + b'\n'
+
+    def render_stream(self, fields, rows):
+        renderer = FastJSONRenderer()
+        for row in rows:
+            yield renderer.render(dict(zip(fields, row))) + b'\n'
+
+
+class _Echo:
+    def write(self, value):
+        return value
+
+
+class CSVRenderer(BaseRenderer):
+    """CSV with a header row; a single object renders as one row."""
+
+    media_type = 'text/csv'
+    format = 'csv'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return b''.join(self.render_stream(
+            list(data), [list(data.values())]
+        ))
+
+    def render_stream(self, fields, rows):
+        writer = csv.writer(_Echo())
+        yield writer.writerow(fields).encode()
+        for row in rows:
+            yield writer.writerow(row).encode()
+
+
+class FastJSONParser(JSONParser):
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        if orjson is None:
+            return super().parse(stream, media_type, parser_context)
+
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        try:
+            data = stream.read()
+            if encoding.lower().replace('-', '') != 'utf8':
+                data = data.decode(encoding)
+            return orjson.loads(data)
+        except ValueError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
@@ -0,0 +1,177 @@
+import hashlib
+import threading
+import time
+from functools import partial
+
+from decouple import config
+from django.core.cache import caches
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe
+from rest_framework.response import Response
+
+RESPONSE_CACHE = config('RESPONSE_CACHE', default=False, cast=bool)
+RESPONSE_CACHE_ALIAS = config('RESPONSE_CACHE_ALIAS', default='responses')
+RESPONSE_CACHE_MAX_BYTES = config(
+    'RESPONSE_CACHE_MAX_BYTES', default=256 * 1024, cast=int
+)
+
+# Headers replayed with a cached body.
+CACHED_HEADERS = ('ETag', 'Last-Modified', 'Cache-Control', 'Vary')
+
+
+class ResponseCache:
+    """Rendered responses per user, on top of a Django cache alias.
+
+    Keys embed the user's current generation; bumping it on every write
+    orphans all of that user's pages at once, which then expire through
+    the backend's TTL or culling. Generations start at a timestamp so an
+    evicted counter never comes back at a value that was already used.
+    """
+
+    def __init__(self, alias=RESPONSE_CACHE_ALIAS,
+                 max_bytes=RESPONSE_CACHE_MAX_BYTES):
+        self.alias = alias
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.oversized = 0
+        self._lock = threading.Lock()
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    @staticmethod
+    def generation_key(user_id):
+        return 'drf:generation:%s' % user_id
+
+    def get_generation(self, user_id):
+        key = self.generation_key(user_id)
+        generation = self.cache.get(key)
+        if generation is None:
+            self.cache.add(key, time.time_ns(), timeout=None)
+            generation = self.cache.get(key)
+        return generation
+
+    def invalidate_user(self, user_id):
+        key = self.generation_key(user_id)
+        try:
+            self.cache.incr(key)
+        except ValueError:
+            self.cache.set(key, time.time_ns(), timeout=None)
+
+    def invalidate_user_on_commit(self, user_id, using=None):
+        # Bumping earlier would let a concurrent read cache the old rows
+        # under the new generation.
+        transaction.on_commit(
+            partial(self.invalidate_user, user_id), using=using
+        )
+
+    def make_key(self, request, prefix):
+        # Blank parameters are dropped and the rest sorted, so equivalent
+        # query strings share an entry.
+        params = sorted(
+            (name, values) for name, values in request.query_params.lists()
+            if any(value.strip() for value in values)
+        )
+        digest = hashlib.md5(
+            repr((request.accepted_renderer.format, params)).encode(),
+            usedforsecurity=False,
+        ).hexdigest()
+        user_id = request.user.pk
+        return 'drf:response:%s:%s:%s:%s' % (
+            prefix, user_id, self.get_generation(user_id), digest
+        )
+
+    def get(self, request, key):
+        """The cached response for ``key`` (or a 304 for it), or ``None``."""
+        entry = self.cache.get(key)
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+
+        headers = entry['headers']
+        response = get_conditional_response(
+            request, etag=headers.get('ETag'),
+            last_modified=parse_http_date_safe(
+                headers.get('Last-Modified', '')
+            ),
+        )
+        if response is None:
+            response = HttpResponse(
+                entry['content'], content_type=entry['content_type']
+            )
+        for name, value in headers.items():
+            response[name] = value
+        response['X-Cache'] = 'HIT'
+        return response
+
+    def set(self, key, response):
+        """Store ``response`` once it is rendered (a post-render callback)."""
+        if response.status_code != 200:
+            return
+        if len(response.content) > self.max_bytes:
+            with self._lock:
+                self.oversized += 1
+            return
+        self.cache.set(key, {
+            'content': response.content,
+            'content_type': response['Content-Type'],
+            'headers': {
+                name: response[name] for name in CACHED_HEADERS
+                if response.has_header(name)
+            },
+        })
+        with self._lock:
+            self.stores += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+                'stores': self.stores,
+                'oversized': self.oversized,
+            }
+
+    def reset_stats(self):
+        with self._lock:
+            self.hits = self.misses = self.stores = self.oversized = 0
+
+
+response_cache = ResponseCache()
+
+
+class ResponseCacheMixin:
+    """Serves ``list()`` pages from ``response_cache`` per user.
+
+    Writes to the user's rows must call
+    ``response_cache.invalidate_user_on_commit()``; model saves and deletes
+    do so through signals.
+    """
+
+    response_cache_enabled = RESPONSE_CACHE
+
+    def list(self, request, *args, **kwargs):
+        if not self.response_cache_enabled:
+            return super().list(request, *args, **kwargs)
+
+        key = response_cache.make_key(request, self.basename)
+        response = response_cache.get(request, key)
+        if response is not None:
+            return response
+
+        response = super().list(request, *args, **kwargs)
+        if isinstance(response, Response):
+            response['X-Cache'] = 'MISS'
+            response.add_post_render_callback(
+                partial(response_cache.set, key)
+            )
+        return response
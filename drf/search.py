@@ -0,0 +1,136 @@
+import re
+from django.db import connections
+from django.db.models import BooleanField, FloatField
+from django.db.models.expressions import RawSQL
+from rest_framework.filters import SearchFilter
+
+SQLITE_FTS_INSTALL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5("
+    "title, body, content='messages', content_rowid='id', prefix='2 3')",
+    "CREATE TRIGGER IF NOT EXISTS messages_fts_ai AFTER INSERT ON messages "
+    "BEGIN "
+    "INSERT INTO messages_fts(rowid, title, body) "
+    "VALUES (new.id, new.title, new.body); "
+    "END",
+    "CREATE TRIGGER IF NOT EXISTS messages_fts_ad AFTER DELETE ON messages "
+    "BEGIN "
+    "INSERT INTO messages_fts(messages_fts, rowid, title, body) "
+    "VALUES ('delete', old.id, old.title, old.body); "
+    "END",
+    "CREATE TRIGGER IF NOT EXISTS messages_fts_au "
+    "AFTER UPDATE OF title, body ON messages "
+    "BEGIN "
+    "INSERT INTO messages_fts(messages_fts, rowid, title, body) "
+    "VALUES ('delete', old.id, old.title, old.body); "
+    "INSERT INTO messages_fts(rowid, title, body) "
+    "VALUES (new.id, new.title, new.body); "
+    "END",
+    "INSERT INTO messages_fts(messages_fts) VALUES ('rebuild')",
+]
+
+SQLITE_FTS_UNINSTALL = [
+    "DROP TRIGGER IF EXISTS messages_fts_ai",
+    "DROP TRIGGER IF EXISTS messages_fts_ad",
+    "DROP TRIGGER IF EXISTS messages_fts_au",
+    "DROP TABLE IF EXISTS messages_fts",
+]
+
+POSTGRES_FTS_INSTALL = [
+    "ALTER TABLE messages ADD COLUMN IF NOT EXISTS search_vector tsvector "
+    "GENERATED ALWAYS AS (to_tsvector('simple', "
+    "coalesce(title, '') || ' ' || coalesce(body, ''))) STORED",
+    "CREATE INDEX IF NOT EXISTS messages_search_vector_idx "
+    "ON messages USING GIN (search_vector)",
+]
+
+POSTGRES_FTS_UNINSTALL = [
+    "DROP INDEX IF EXISTS messages_search_vector_idx",
+    "ALTER TABLE messages DROP COLUMN IF EXISTS search_vector",
+]
+
+
+def install_message_search(schema_editor):
+    """Create the full-text index for ``messages`` on backends that have one.
+
+    SQLite drops triggers whenever Django rebuilds a table, so migrations
+    that remake ``messages`` must call this again.
+    """
+    statements = {
+        'sqlite': SQLITE_FTS_INSTALL,
+        'postgresql': POSTGRES_FTS_INSTALL,
+    }.get(schema_editor.connection.vendor, [])
+    for statement in statements:
+        schema_editor.execute(statement, params=None)
+
+
+def uninstall_message_search(schema_editor):
+    statements = {
+        'sqlite': SQLITE_FTS_UNINSTALL,
+        'postgresql': POSTGRES_FTS_UNINSTALL,
+    }.get(schema_editor.connection.vendor, [])
+    for statement in statements:
+        schema_editor.execute(statement, params=None)
+
+
+class SQLiteSearchBackend:
+    """FTS5 external-content table kept in sync by triggers.
+
+    bm25() only works in a query that runs the MATCH, so the rank is read
+    back per matched row by rowid, which FTS5 looks up without a scan.
+    """
+
+    def search(self, queryset, terms):
+        query = ' '.join(
+            '"%s"*' % term.replace('"', '""') for term in terms
+        )
+        table = queryset.model._meta.db_table
+        return queryset.filter(id__in=RawSQL(
+            'SELECT rowid FROM "messages_fts" WHERE "messages_fts" MATCH %s',
+            [query],
+        )).annotate(search_rank=RawSQL(
+            'SELECT bm25("messages_fts") FROM "messages_fts" '
+            'WHERE "messages_fts" MATCH %%s '
+            'AND "messages_fts"."rowid" = "%s"."id"' % table,
+            [query], output_field=FloatField(),
+        )).order_by('search_rank', 'id')
+
+
+class PostgresSearchBackend:
+    """Generated ``tsvector`` column with a GIN index."""
+
+    def search(self, queryset, terms):
+        words = [word for term in terms for word in re.findall(r'\w+', term)]
+        if not words:
+            return queryset.none()
+        query = ' & '.join('%s:*' % word for word in words)
+        table = queryset.model._meta.db_table
+        return queryset.annotate(search_match=RawSQL(
+            '"%s"."search_vector" @@ to_tsquery(\'simple\', %%s)' % table,
+            [query], output_field=BooleanField(),
+        ), search_rank=RawSQL(
+            'ts_rank("%s"."search_vector", to_tsquery(\'simple\', %%s))'
+            % table,
+            [query], output_field=FloatField(),
+        )).filter(search_match=True).order_by('-search_rank', 'id')
+
+
+class FullTextSearchFilter(SearchFilter):
+    """``SearchFilter`` served from the database's full-text index.
+
+    Every term is prefix-matched and results come best match first. Databases
+    without a backend keep the ``icontains`` search over ``search_fields``.
+    """
+
+    search_backends = {
+        'sqlite': SQLiteSearchBackend(),
+        'postgresql': PostgresSearchBackend(),
+    }
+
+    def filter_queryset(self, request, queryset, view):
+        terms = self.get_search_terms(request)
+        if not terms:
+            return queryset
+        backend = self.search_backends.get(connections[queryset.db].vendor)
+        if backend is None:
+            return super().filter_queryset(request, queryset, view)
+        return backend.search(queryset, terms)
@@ -1,26 +1,156 @@
+import hashlib
+from django.db import IntegrityError, models, transaction
 from rest_framework import serializers
 from drf.models import User, Message
-from drf.common_methods import create_jwt
+from drf.common_methods import create_jwt, ConflictError
+from drf.fragment_cache import FRAGMENT_CACHE, fragment_cache
+from drf.renderers import FastJSONRenderer, JSONFragment
+from drf.sharding import next_id, sharding_enabled
 
 
-class UserSerializer(serializers.ModelSerializer):
+class ValuesSerializerMixin:
+    """Builds representations straight from ``QuerySet.values()`` rows.
+
+    The output matches ``to_representation()`` for readable fields backed by
+    model columns; any other field must be supplied by
+    ``get_values_related()``, which is computed once per list.
+    """
+
+    def get_values_related(self):
+        return {}
+
+    def get_values_fields(self, related=None):
+        if related is None:
+            related = self.get_values_related()
+        fields = ['id']
+        for field in self._readable_fields:
+            if field.field_name not in related and field.source not in fields:
+                fields.append(field.source)
+        return fields
+
+    def to_representation_values(self, rows, related=None):
+        if related is None:
+            related = self.get_values_related()
+        fields = [
+            (field.field_name, field.source, field.to_representation)
+            for field in self._readable_fields
+        ]
+        data = []
+        for row in rows:
+            ret = {}
+            for field_name, source, to_representation in fields:
+                if field_name in related:
+                    ret[field_name] = related[field_name]
+                    continue
+                value = row[source]
+                if value is None:
+                    ret[field_name] = None
+                else:
+                    ret[field_name] = to_representation(value)
+            data.append(ret)
+        return data
+
+
+class FragmentCacheListSerializer(serializers.ListSerializer):
+    """Builds lists from per-row JSON fragments kept in ``fragment_cache``.
+
+    The child provides ``get_fragment_key(instance)``; all keys of a list
+    are fetched in one batch and misses are rendered and stored back. Only
+    used when the response goes through ``FastJSONRenderer``, which embeds
+    the fragments as they are.
+    """
+
+    def use_fragments(self):
+        request = self.context.get('request')
+        return self.child.fragment_cache_enabled and isinstance(
+            getattr(request, 'accepted_renderer', None), FastJSONRenderer
+        )
+
+    def to_representation(self, data):
+        if not self.use_fragments():
+            return super().to_representation(data)
+
+        if isinstance(data, models.manager.BaseManager):
+            data = data.all()
+        items = list(data)
+        keys = [self.child.get_fragment_key(item) for item in items]
+        fragments = fragment_cache.get_many(keys)
+        renderer = FastJSONRenderer()
+        missing = {}
+        for key, item in zip(keys, items):
+            if key not in fragments:
+                missing[key] = fragments[key] = JSONFragment(
+                    renderer.render(self.child.to_representation(item))
+                )
+        if missing:
+            fragment_cache.set_many(missing)
+        return [fragments[key] for key in keys]
+
+
+class UserSerializer(ValuesSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ('email', 'json_web_token')
         read_only_fields = ('json_web_token', )
+        # Uniqueness is enforced by the database index, see create().
+        extra_kwargs = {'email': {'validators': []}}
 
     def create(self, validated_data):
-        jwt_token = create_jwt(validated_data['email'])
-        validated_data['json_web_token'] = jwt_token
-        return super().create(validated_data)
+        email = validated_data['email']
+        try:
+            # A savepoint when nested, so a conflict leaves the outer
+            # transaction usable.
+            with transaction.atomic():
+                if sharding_enabled():
+                    # Allocated up front so the token, which carries the
+                    # id, is written by the INSERT itself.
+                    pk = next_id()
+                    return super().create({
+                        **validated_data, 'id': pk,
+                        'json_web_token': create_jwt(email, pk, 0),
+                    })
+                # The sequence hands out the id; the token follows in the
+                # same transaction. Nobody has seen the row yet, so it
+                # keeps its first version.
+                user = super().create(
+                    {**validated_data, 'json_web_token': ''}
+                )
+                user.json_web_token = create_jwt(email, user.pk, 0)
+                User.objects.filter(pk=user.pk).update(
+                    json_web_token=user.json_web_token
+                )
+                return user
+        except IntegrityError as e:
+            raise ConflictError from e
 
 
-class MessageSerializer(serializers.ModelSerializer):
+class MessageSerializer(ValuesSerializerMixin, serializers.ModelSerializer):
     user = UserSerializer(read_only=True, many=False)
 
+    fragment_cache_enabled = FRAGMENT_CACHE
+
     class Meta:
         model = Message
         fields = ('title', 'body', 'user')
+        list_serializer_class = FragmentCacheListSerializer
+
+    def get_fragment_key(self, instance):
+        # The embedded user is keyed by its representation rather than its
+        # version, which also moves with message_count.
+        user = instance.user
+        user_digests = self.__dict__.setdefault('_user_digests', {})
+        if user.pk not in user_digests:
+            user_digests[user.pk] = hashlib.md5(repr(
+                sorted(self.fields['user'].to_representation(user).items())
+            ).encode(), usedforsecurity=False).hexdigest()
+        return 'message:%s:%s:%s' % (
+            instance.pk, instance.version, user_digests[user.pk]
+        )
+
+    def get_values_related(self):
+        # List rows all belong to the authenticated user.
+        user = self.context['request'].user
+        return {'user': self.fields['user'].to_representation(user)}
 
     def create(self, validated_data):
         request = self.context['request']
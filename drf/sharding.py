@@ -0,0 +1,216 @@
+import datetime
+import threading
+import time
+import uuid
+
+from decouple import config
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.utils import timezone
+
+# Fixes the worker id of this process, e.g. to a pod ordinal. Left empty,
+# each process leases a free one from the directory database for
+# WORKER_LEASE_SECONDS and renews it halfway through.
+SHARD_WORKER_ID = config('SHARD_WORKER_ID', default='')
+WORKER_LEASE_SECONDS = config('WORKER_LEASE_SECONDS', default=600, cast=int)
+
+# Ids: 41 bits of milliseconds since ID_EPOCH_MS, 10 bits of worker id
+# (unique per process) and a 12 bit sequence.
+ID_EPOCH_MS = 1704067200000  # 2024-01-01T00:00:00Z
+WORKER_BITS = 10
+SEQUENCE_BITS = 12
+
+# Takes the worker id whose lease ran out first, if any has.
+ACQUIRE_LEASE_SQL = (
+    'UPDATE {table} SET owner = %s, expires_at = %s '
+    'WHERE worker_id = ('
+    'SELECT worker_id FROM {table} WHERE expires_at <= %s '
+    'ORDER BY expires_at LIMIT 1'
+    ') AND expires_at <= %s '
+    'RETURNING worker_id'
+)
+
+
+def sharding_enabled():
+    return bool(settings.MESSAGE_SHARDS)
+
+
+def jump_hash(key, buckets):
+    """Jump consistent hash (Lamping and Veach).
+
+    Going from ``n`` to ``n + 1`` buckets only moves ``1 / (n + 1)`` of the
+    keys, all of them into the new bucket.
+    """
+    bucket, jump = -1, 0
+    while jump < buckets:
+        bucket = jump
+        key = (key * 2862933555777941757 + 1) & 0xFFFFFFFFFFFFFFFF
+        jump = int((bucket + 1) * ((1 << 31) / ((key >> 33) + 1)))
+    return bucket
+
+
+def shard_for_user(user_id, shards=None):
+    """The database holding the messages of ``user_id``."""
+    if shards is None:
+        shards = settings.MESSAGE_SHARDS
+    if not shards:
+        return DEFAULT_DB_ALIAS
+    return shards[jump_hash(int(user_id), len(shards))]
+
+
+class IdGenerator:
+    """Time ordered 64-bit ids that don't collide across shards.
+
+    Unlike per-database sequences, ids stay unique when rows move between
+    shards, as every process has its own worker id: a fixed ``worker_id``
+    or one leased from ``IdWorkerLease`` rows on the directory database.
+    A process never generates ids on a lease that may have run out.
+    """
+
+    def __init__(self, worker_id=None):
+        if worker_id is not None and not 0 <= worker_id < 1 << WORKER_BITS:
+            raise ValueError(
+                'worker_id must be below %d.' % (1 << WORKER_BITS)
+            )
+        self.worker_id = worker_id
+        self.leased = worker_id is None
+        self._owner = uuid.uuid4().hex
+        self._renew_at = float('-inf')
+        self._pending = None
+        self._last = -1
+        self._sequence = 0
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        with self._lock:
+            if self.leased:
+                self.lease()
+            # Never step back, even if the clock does; an exhausted
+            # sequence borrows the next millisecond.
+            now = max(time.time_ns() // 1000000 - ID_EPOCH_MS, self._last)
+            if now == self._last:
+                self._sequence = (self._sequence + 1) % (1 << SEQUENCE_BITS)
+                if self._sequence == 0:
+                    now += 1
+            else:
+                self._sequence = 0
+            self._last = now
+            return (
+                now << (WORKER_BITS + SEQUENCE_BITS)
+                | self.worker_id << SEQUENCE_BITS
+                | self._sequence
+            )
+
+    def lease(self):
+        pending = self._pending
+        if pending is not None and not pending.in_atomic_block:
+            # Taken or renewed in a transaction that was rolled back.
+            self._pending = None
+            self._renew_at = float('-inf')
+        if time.monotonic() < self._renew_at:
+            return
+
+        # drf.models imports this module.
+        from drf.models import IdWorkerLease
+        now = timezone.now()
+        expires_at = now + datetime.timedelta(seconds=WORKER_LEASE_SECONDS)
+        leases = IdWorkerLease.objects.using(DEFAULT_DB_ALIAS)
+        if self.worker_id is None or not leases.filter(
+            worker_id=self.worker_id, owner=self._owner
+        ).update(expires_at=expires_at):
+            self.worker_id = self.acquire(now, expires_at)
+        self._renew_at = time.monotonic() + WORKER_LEASE_SECONDS / 2
+
+        connection = connections[DEFAULT_DB_ALIAS]
+        if connection.in_atomic_block:
+            self._pending = connection
+            transaction.on_commit(
+                lambda: self.confirm(connection), using=DEFAULT_DB_ALIAS
+            )
+
+    def acquire(self, now, expires_at):
+        from drf.models import IdWorkerLease
+        connection = connections[DEFAULT_DB_ALIAS]
+        adapt = connection.ops.adapt_datetimefield_value
+        sql = ACQUIRE_LEASE_SQL.format(table=connection.ops.quote_name(
+            IdWorkerLease._meta.db_table
+        ))
+        with connection.cursor() as cursor:
+            # Another process may take the same row first.
+            for _ in range(10):
+                cursor.execute(sql, [
+                    self._owner, adapt(expires_at), adapt(now), adapt(now),
+                ])
+                row = cursor.fetchone()
+                if row is not None:
+                    return row[0]
+        raise RuntimeError('No worker id is free to lease.')
+
+    def confirm(self, connection):
+        with self._lock:
+            if self._pending is connection:
+                self._pending = None
+
+
+next_id = IdGenerator(int(SHARD_WORKER_ID) if SHARD_WORKER_ID else None)
+
+
+def mirror_users(users, shard=None):
+    """Copy directory rows onto their shards as foreign key targets.
+
+    Existing copies are left alone: shards only need the primary key, user
+    data is always read from the directory.
+    """
+    by_shard = {}
+    for user in users:
+        by_shard.setdefault(
+            shard or shard_for_user(user.pk), []
+        ).append(user)
+    for alias, shard_users in by_shard.items():
+        model = type(shard_users[0])
+        fields = model._meta.concrete_fields
+        model._base_manager.using(alias).bulk_create([
+            model(**{
+                field.attname: getattr(user, field.attname)
+                for field in fields
+            })
+            for user in shard_users
+        ], ignore_conflicts=True)
+
+
+class ShardRouter:
+    """Puts messages on ``MESSAGE_SHARDS`` by the hash of their user.
+
+    Queries are routed through their ``instance`` hint (a message, or the
+    user of a related manager); use ``Message.objects.for_user()`` for the
+    rest. Everything else is left to the next router.
+    """
+
+    def shard_for_hints(self, hints):
+        instance = hints.get('instance')
+        if instance is None:
+            return None
+        if instance._meta.label == 'drf.Message':
+            return shard_for_user(instance.user_id)
+        if instance._meta.label == 'drf.User':
+            return shard_for_user(instance.pk)
+        return None
+
+    def db_for_read(self, model, **hints):
+        if sharding_enabled() and model._meta.label == 'drf.Message':
+            return self.shard_for_hints(hints)
+        return None
+
+    db_for_write = db_for_read
+
+    def allow_relation(self, obj1, obj2, **hints):
+        labels = {obj1._meta.label, obj2._meta.label}
+        if sharding_enabled() and 'drf.Message' in labels:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in settings.MESSAGE_SHARDS:
+            # Messages and the user rows they point at.
+            return app_label == 'drf' and model_name != 'idworkerlease'
+        return None
@@ -0,0 +1,60 @@
+from django.db import DEFAULT_DB_ALIAS
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from drf.common_methods import adjust_message_count
+from drf.models import User, Message
+from drf.response_cache import response_cache
+from drf.sharding import mirror_users, shard_for_user, sharding_enabled
+from drf.sqlite import configure_connection, production_profile
+from drf.token_cache import token_cache
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user_tokens(sender, instance, **kwargs):
+    token_cache.invalidate_user(instance.pk)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user_responses(sender, instance, **kwargs):
+    response_cache.invalidate_user_on_commit(instance.pk)
+
+
+@receiver(post_save, sender=Message)
+@receiver(post_delete, sender=Message)
+def invalidate_message_responses(sender, instance, using, **kwargs):
+    response_cache.invalidate_user_on_commit(instance.user_id, using)
+
+
+@receiver(post_save, sender=Message)
+def count_created_message(sender, instance, created, **kwargs):
+    if created:
+        adjust_message_count(instance.user_id, 1)
+
+
+@receiver(post_delete, sender=Message)
+def count_deleted_message(sender, instance, **kwargs):
+    adjust_message_count(instance.user_id, -1)
+
+
+@receiver(post_save, sender=User)
+def mirror_user_to_shard(sender, instance, created, using, **kwargs):
+    if created and using == DEFAULT_DB_ALIAS and sharding_enabled():
+        mirror_users([instance])
+
+
+@receiver(post_delete, sender=User)
+def delete_user_from_shard(sender, instance, using, **kwargs):
+    if using == DEFAULT_DB_ALIAS and sharding_enabled():
+        # Cascades to the user's messages on that shard.
+        User.objects.using(shard_for_user(instance.pk)).filter(
+            pk=instance.pk
+        ).delete()
+
+
+@receiver(connection_created)
+def configure_sqlite(sender, connection, **kwargs):
+    if production_profile(connection):
+        configure_connection(connection)
@@ -0,0 +1,77 @@
+import random
+import time
+
+from decouple import config
+from django.conf import settings
+from django.db import OperationalError
+
+# Upper bound of the first retry's wait in seconds, doubled on each retry.
+SQLITE_LOCK_BACKOFF = config('SQLITE_LOCK_BACKOFF', default=0.01, cast=float)
+
+LOCK_ERRORS = ('database is locked', 'database table is locked')
+
+
+def production_profile(connection):
+    return (
+        connection.vendor == 'sqlite'
+        and settings.SQLITE_PROFILE == 'production'
+    )
+
+
+def is_lock_error(exc):
+    return isinstance(exc, OperationalError) and str(exc).startswith(
+        LOCK_ERRORS
+    )
+
+
+def backoff(attempt, base=SQLITE_LOCK_BACKOFF):
+    """Full jitter: a random wait below an exponentially growing cap.
+
+    Writers that collided don't wake up together and collide again.
+    """
+    return random.uniform(0, base * 2 ** attempt)
+
+
+class RetryOnLock:
+    """Execute wrapper retrying statements that found the database locked.
+
+    ``busy_timeout`` already waits inside SQLite; this catches what gets
+    through it under sustained contention. Only statements outside a
+    transaction are retried, which includes the ``BEGIN IMMEDIATE`` taking
+    the write lock: a statement failing halfway through a transaction
+    fails the transaction.
+    """
+
+    def __init__(self, retries=None, sleep=time.sleep):
+        self.retries = retries
+        self.sleep = sleep
+
+    def __call__(self, execute, sql, params, many, context):
+        retries = self.retries
+        if retries is None:
+            retries = settings.SQLITE_LOCK_RETRIES
+        attempt = 0
+        while True:
+            try:
+                return execute(sql, params, many, context)
+            except OperationalError as exc:
+                if (
+                    attempt >= retries or not is_lock_error(exc)
+                    or context['connection'].in_atomic_block
+                ):
+                    raise
+            self.sleep(backoff(attempt))
+            attempt += 1
+
+
+def configure_connection(connection):
+    """Apply ``SQLITE_PRAGMAS`` and ``RetryOnLock`` to a new connection."""
+    with connection.cursor() as cursor:
+        for name, value in settings.SQLITE_PRAGMAS.items():
+            cursor.execute('PRAGMA %s = %s' % (name, value))
+    # The wrapper object outlives its connections.
+    if not any(
+        isinstance(wrapper, RetryOnLock)
+        for wrapper in connection.execute_wrappers
+    ):
+        connection.execute_wrappers.append(RetryOnLock())
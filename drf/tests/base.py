@@ -0,0 +1,22 @@
+from django.test import TestCase
+from drf.common_methods import create_jwt
+from drf.models import User
+from drf.token_cache import token_cache
+
+
+def auth_headers(user):
+    """Headers carrying a claims token of ``user``."""
+    return {'Authorization': 'Bearer ' + create_jwt(
+        user.email, user.pk, user.token_version
+    )}
+
+
+class UserTestCase(TestCase):
+    """``self.user`` and its ``self.headers``, with an empty token cache."""
+
+    def setUp(self):
+        token_cache.clear()
+        self.user = User.objects.create(
+            email='test@test.com', json_web_token=create_jwt('test@test.com')
+        )
+        self.headers = auth_headers(self.user)
@@ -0,0 +1,173 @@
+from unittest import mock
+from django.test import AsyncClient, override_settings
+from django.urls import reverse
+from drf.models import User, Message
+from drf.common_methods import TokenUser
+from drf.tests.base import UserTestCase
+from drf.users import LimitOffsetPagination, NoCountPagination
+
+
+class AsyncMessageViewTest(UserTestCase):
+    def setUp(self):
+        super().setUp()
+        self.messages = [
+            Message.objects.create(
+                user=self.user, title='title %d' % i, body='body %d' % i
+            )
+            for i in range(7)
+        ]
+
+    async def test_list_matches_sync_view(self):
+        for params in ({}, {'limit': 3, 'offset': 2}, {'search': 'title 4'}):
+            sync = await self.async_client.get(
+                reverse('message-list'), params, headers=self.headers
+            )
+            response = await self.async_client.get(
+                reverse('async-message-list'), params, headers=self.headers
+            )
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.json()['count'], sync.json()['count'])
+            self.assertEqual(
+                response.json()['results'], sync.json()['results']
+            )
+
+    async def test_list_pagination_modes_match_sync_view(self):
+        for name in ('cursor', 'nocount', 'estimate', 'cached'):
+            params = {'pagination': name, 'limit': 3}
+            sync = await self.async_client.get(
+                reverse('message-list'), params, headers=self.headers
+            )
+            response = await self.async_client.get(
+                reverse('async-message-list'), params, headers=self.headers
+            )
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.json().keys(), sync.json().keys())
+            self.assertEqual(
+                response.json()['results'], sync.json()['results']
+            )
+
+    async def test_offset_and_nocount_pages_use_the_async_orm(self):
+        sync_paginate = mock.patch.object(
+            LimitOffsetPagination, 'paginate_queryset',
+            side_effect=AssertionError('paginated in a worker thread'),
+        )
+        sync_nocount = mock.patch.object(
+            NoCountPagination, 'paginate_queryset',
+            side_effect=AssertionError('paginated in a worker thread'),
+        )
+        with sync_paginate, sync_nocount:
+            for params in ({'offset': 2}, {'pagination': 'nocount'}):
+                response = await self.async_client.get(
+                    reverse('async-message-list'), params,
+                    headers=self.headers
+                )
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(len(response.json()['results']), 5)
+
+    async def test_user_is_loaded_only_when_needed(self):
+        with mock.patch.object(
+            TokenUser, 'aload', autospec=True, side_effect=TokenUser.aload
+        ) as aload:
+            response = await self.async_client.get(
+                reverse('async-message-list'), {'offset': 100},
+                headers=self.headers
+            )
+            self.assertEqual(response.json()['results'], [])
+            response = await self.async_client.get(
+                reverse('async-message-detail', kwargs={'pk': 0}),
+                headers=self.headers
+            )
+            self.assertEqual(response.status_code, 404)
+            aload.assert_not_called()
+
+            response = await self.async_client.get(
+                reverse('async-message-list'), headers=self.headers
+            )
+            self.assertEqual(
+                response.json()['results'][0]['user']['email'],
+                'test@test.com'
+            )
+            aload.assert_called_once()
+
+    @override_settings(
+        MIDDLEWARE=['django.middleware.csrf.CsrfViewMiddleware']
+    )
+    async def test_create_is_csrf_exempt(self):
+        client = AsyncClient(enforce_csrf_checks=True)
+        response = await client.post(
+            reverse('async-message-list'),
+            {'title': 'new', 'body': 'body'},
+            content_type='application/json', headers=self.headers
+        )
+        self.assertEqual(response.status_code, 201)
+
+    async def test_retrieve(self):
+        message = self.messages[0]
+        response = await self.async_client.get(
+            reverse('async-message-detail', kwargs={'pk': message.pk}),
+            headers=self.headers
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['title'], message.title)
+        self.assertEqual(response.json()['user']['email'], 'test@test.com')
+
+    async def test_retrieve_other_users_message(self):
+        other = await User.objects.acreate(email='other@test.com')
+        message = await Message.objects.acreate(
+            user=other, title='title', body='body'
+        )
+        response = await self.async_client.get(
+            reverse('async-message-detail', kwargs={'pk': message.pk}),
+            headers=self.headers
+        )
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(
+            response.json()['detail'], 'No Message matches the given query.'
+        )
+
+    async def test_create(self):
+        response = await self.async_client.post(
+            reverse('async-message-list'),
+            {'title': 'new', 'body': 'body'},
+            content_type='application/json', headers=self.headers
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['title'], 'new')
+        message = await Message.objects.order_by('id').alast()
+        self.assertEqual(message.title, 'new')
+        self.assertEqual(message.user_id, self.user.pk)
+        user = await User.objects.aget(pk=self.user.pk)
+        self.assertEqual(user.message_count, 8)
+
+    async def test_create_invalid_data(self):
+        response = await self.async_client.post(
+            reverse('async-message-list'), {'body': 'body'},
+            content_type='application/json', headers=self.headers
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            response.json()['title'], ['This field is required.']
+        )
+
+    async def test_invalid_jwt(self):
+        for headers in ({}, {'Authorization': 'Bearer invalid'}):
+            response = await self.async_client.get(
+                reverse('async-message-list'), headers=headers
+            )
+            self.assertEqual(response.status_code, 403)
+            self.assertEqual(response.json()['detail'], 'invalid jwt.')
+
+    async def test_revoked_jwt(self):
+        await User.objects.filter(pk=self.user.pk).aupdate(token_version=1)
+        response = await self.async_client.get(
+            reverse('async-message-list'), headers=self.headers
+        )
+        self.assertEqual(response.status_code, 403)
+
+    async def test_email_jwt(self):
+        response = await self.async_client.get(
+            reverse('async-message-list'),
+            headers={'Authorization': 'Bearer ' + self.user.json_web_token}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['count'], 7)
@@ -0,0 +1,262 @@
+import json
+import os
+import tempfile
+import warnings
+from unittest import mock
+from django.conf import settings
+from django.db import connections
+from django.test import override_settings
+from django.urls import reverse
+from drf.common_methods import create_jwt
+from drf.db_routers import (
+    ReplicaRouter, check_pin_cache, is_pinned, pin_cache, replica_pool,
+    replica_reads)
+from drf.models import User, Message
+from drf.tests.base import UserTestCase
+from drf.token_cache import token_cache
+
+
+@override_settings(
+    DATABASE_REPLICAS=['default'], DATABASE_REPLICA_WEIGHTS={}
+)
+class ReplicaRouterTest(UserTestCase):
+    def setUp(self):
+        super().setUp()
+        pin_cache().clear()
+        replica_pool.reset()
+        self.message = Message.objects.create(
+            user=self.user, title='title', body='body'
+        )
+
+    def test_reads_use_replicas_only_when_enabled(self):
+        router = ReplicaRouter()
+        self.assertEqual(router.db_for_read(Message), 'default')
+        with replica_reads():
+            self.assertEqual(router.db_for_read(Message), 'default')
+            self.assertEqual(router.db_for_write(Message), 'default')
+        with mock.patch.object(replica_pool, 'choose', return_value=None):
+            with replica_reads():
+                self.assertEqual(router.db_for_read(Message), 'default')
+
+    @override_settings(
+        DATABASE_REPLICAS=['replica1', 'replica2'],
+        DATABASE_REPLICA_WEIGHTS={'replica1': 0, 'replica2': 3},
+    )
+    def test_weighted_choice_of_healthy_replicas(self):
+        with mock.patch.object(replica_pool, 'check', return_value=True):
+            self.assertEqual(
+                {replica_pool.choose() for _ in range(20)}, {'replica2'}
+            )
+        replica_pool.reset()
+        with mock.patch.object(
+            replica_pool, 'check', side_effect=lambda alias: False
+        ) as check:
+            self.assertIsNone(replica_pool.choose())
+            self.assertIsNone(replica_pool.choose())
+        self.assertEqual(check.call_count, 2)
+
+    def test_list_and_retrieve_read_from_replicas(self):
+        with mock.patch.object(
+            replica_pool, 'choose', wraps=replica_pool.choose
+        ) as choose:
+            self.client.get(reverse('message-list'), headers=self.headers)
+            self.assertTrue(choose.called)
+            choose.reset_mock()
+            self.client.get(
+                reverse('message-detail', kwargs={'pk': self.message.pk}),
+                headers=self.headers
+            )
+            self.assertTrue(choose.called)
+            choose.reset_mock()
+            self.client.put(
+                reverse('message-detail', kwargs={'pk': self.message.pk}),
+                json.dumps({'title': 'new', 'body': 'body'}),
+                content_type='application/json', headers=self.headers
+            )
+            self.assertFalse(choose.called)
+
+    def test_write_pins_user_to_primary(self):
+        self.client.post(
+            reverse('message-list'),
+            json.dumps({'title': 'new', 'body': 'body'}),
+            content_type='application/json', headers=self.headers
+        )
+        self.assertTrue(is_pinned(self.user.pk))
+        with mock.patch.object(replica_pool, 'choose') as choose:
+            response = self.client.get(
+                reverse('message-list'), headers=self.headers
+            )
+        self.assertEqual(response.json()['count'], 2)
+        self.assertFalse(choose.called)
+
+    def test_created_user_is_pinned(self):
+        response = self.client.post(
+            reverse('user-list'), json.dumps({'email': 'new@test.com'}),
+            content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 201)
+        user = User.objects.get(email='new@test.com')
+        self.assertTrue(is_pinned(user.pk))
+
+    def test_pins_use_their_own_cache(self):
+        self.client.post(
+            reverse('message-list'),
+            json.dumps({'title': 'new', 'body': 'body'}),
+            content_type='application/json', headers=self.headers
+        )
+        self.assertTrue(is_pinned(self.user.pk))
+        pin_cache().clear()
+        self.assertFalse(is_pinned(self.user.pk))
+
+    def test_process_local_pin_cache_warns(self):
+        self.assertEqual(
+            [error.id for error in check_pin_cache(None)], ['drf.W001']
+        )
+        shared = {**settings.CACHES, 'replica-pins': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        }}
+        with override_settings(CACHES=shared):
+            self.assertEqual(check_pin_cache(None), [])
+        with override_settings(DATABASE_REPLICAS=[]):
+            self.assertEqual(check_pin_cache(None), [])
+
+    def test_failed_write_does_not_pin(self):
+        self.client.post(
+            reverse('message-list'), json.dumps({'body': 'body'}),
+            content_type='application/json', headers=self.headers
+        )
+        self.assertFalse(is_pinned(self.user.pk))
+
+
+class ReplicaFileTest(UserTestCase):
+    """``replica1`` as a real SQLite file next to the test database.
+
+    ``replicate()`` copies the primary's rows over as replication would;
+    rows written after that are missing from it like on a lagging replica.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.replica_dir = tempfile.TemporaryDirectory()
+        databases = {**settings.DATABASES, 'replica1': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.path.join(cls.replica_dir.name, 'replica.sqlite3'),
+        }}
+        cls.replica_settings = override_settings(
+            DATABASES=databases, DATABASE_REPLICAS=['replica1'],
+            DATABASE_REPLICA_WEIGHTS={},
+        )
+        with warnings.catch_warnings():
+            # The connection is set up to match below.
+            warnings.simplefilter('ignore')
+            cls.replica_settings.enable()
+        connections.settings['replica1'] = connections.configure_settings(
+            databases
+        )['replica1']
+        try:
+            # Replicas are never migrated (see ReplicaRouter).
+            with connections['replica1'].schema_editor() as editor:
+                editor.create_model(User)
+                editor.create_model(Message)
+            cls.databases = {*cls.databases, 'replica1'}
+            super().setUpClass()
+        except Exception:
+            cls.remove_replica()
+            raise
+
+    @classmethod
+    def tearDownClass(cls):
+        try:
+            super().tearDownClass()
+        finally:
+            cls.remove_replica()
+
+    @classmethod
+    def remove_replica(cls):
+        connections['replica1'].close()
+        del connections['replica1']
+        del connections.settings['replica1']
+        cls.databases = set(cls.databases) - {'replica1'}
+        cls.replica_settings.disable()
+        cls.replica_dir.cleanup()
+
+    def setUp(self):
+        super().setUp()
+        pin_cache().clear()
+        replica_pool.reset()
+        self.message = Message.objects.create(
+            user=self.user, title='title', body='body'
+        )
+        self.replicate()
+
+    def replicate(self):
+        with connections['replica1'].cursor() as cursor:
+            cursor.execute('DELETE FROM messages')
+            cursor.execute('DELETE FROM users')
+        for model in (User, Message):
+            model.objects.using('replica1').bulk_create(
+                model.objects.using('default').order_by('pk')
+            )
+
+    def test_reads_go_to_the_replica(self):
+        Message.objects.create(user=self.user, title='new', body='body')
+        with replica_reads():
+            self.assertEqual(Message.objects.count(), 1)
+        self.assertEqual(Message.objects.count(), 2)
+        response = self.client.get(
+            reverse('message-list'), headers=self.headers
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['count'], 1)
+
+        self.replicate()
+        response = self.client.get(
+            reverse('message-list'), headers=self.headers
+        )
+        self.assertEqual(response.json()['count'], 2)
+
+    def test_reads_its_own_writes(self):
+        response = self.client.post(
+            reverse('message-list'),
+            json.dumps({'title': 'new', 'body': 'body'}),
+            content_type='application/json', headers=self.headers
+        )
+        self.assertEqual(response.status_code, 201)
+        message = Message.objects.order_by('id').last()
+        response = self.client.get(
+            reverse('message-list'), headers=self.headers
+        )
+        self.assertEqual(response.json()['count'], 2)
+        response = self.client.get(
+            reverse('message-detail', kwargs={'pk': message.pk}),
+            headers=self.headers
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_missing_rows_are_read_from_the_primary(self):
+        message = Message.objects.create(
+            user=self.user, title='new', body='body'
+        )
+        response = self.client.get(
+            reverse('message-detail', kwargs={'pk': message.pk}),
+            headers=self.headers
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['title'], 'new')
+
+    def test_authorization_falls_back_to_the_primary(self):
+        user = User.objects.create(
+            email='new@test.com', json_web_token=create_jwt('new@test.com')
+        )
+        for token in (
+            create_jwt(user.email, user.pk, user.token_version),
+            user.json_web_token,
+        ):
+            with self.subTest(token=token):
+                token_cache.clear()
+                response = self.client.get(
+                    reverse('message-list'),
+                    headers={'Authorization': 'Bearer ' + token}
+                )
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.json()['count'], 0)
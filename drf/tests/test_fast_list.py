@@ -0,0 +1,71 @@
+from unittest import mock
+from django.test import Client
+from django.urls import reverse
+from drf.models import User, Message
+from drf.common_methods import create_jwt
+from drf.messages import MessageViewSet
+from drf.tests.base import UserTestCase
+from drf.users import UserViewSet
+
+
+class FastListParityTest(UserTestCase):
+    def setUp(self):
+        super().setUp()
+        other = User.objects.create(
+            email='other@test.com',
+            json_web_token=create_jwt('other@test.com')
+        )
+        for i in range(12):
+            Message.objects.create(
+                user_id=self.user.id,
+                title='title %d é ' % i, body='body "%d"\n' % i
+            )
+        Message.objects.create(user_id=other.id, title='other', body='other')
+        self.client = Client()
+
+    def get_both(self, viewset, url, params):
+        with mock.patch.object(viewset, 'fast_list', False):
+            expected = self.client.get(url, params, headers=self.headers)
+        with mock.patch.object(viewset, 'fast_list', True):
+            response = self.client.get(url, params, headers=self.headers)
+        self.assertEqual(response.status_code, expected.status_code)
+        self.assertEqual(response.content, expected.content)
+        self.assertEqual(response.get('ETag'), expected.get('ETag'))
+        return response
+
+    def test_messages_parity(self):
+        for params in (
+            {},
+            {'limit': '3', 'offset': '4'},
+            {'limit': 'sdsd', 'offset': 'dsds'},
+            {'offset': '100'},
+            {'pagination': 'nocount', 'limit': '5'},
+            {'pagination': 'cached'},
+            {'pagination': 'estimate'},
+            {'pagination': 'cursor', 'limit': '4'},
+            {'search': 'body'},
+            {'search': 'title 1'},
+        ):
+            with self.subTest(params=params):
+                self.get_both(MessageViewSet, reverse('message-list'), params)
+
+    def test_messages_cursor_next_page_parity(self):
+        response = self.get_both(
+            MessageViewSet, reverse('message-list'),
+            {'pagination': 'cursor', 'limit': '5'}
+        )
+        self.get_both(MessageViewSet, response.json()['next'], {})
+
+    def test_users_parity(self):
+        for params in ({}, {'limit': '1'}, {'pagination': 'cursor'}):
+            with self.subTest(params=params):
+                self.get_both(UserViewSet, reverse('user-list'), params)
+
+    def test_messages_fast_list_skips_models(self):
+        with mock.patch.object(MessageViewSet, 'fast_list', True), \
+                mock.patch.object(Message, '__init__') as init:
+            response = self.client.get(
+                reverse('message-list'), headers=self.headers
+            )
+        self.assertEqual(response.status_code, 200)
+        init.assert_not_called()
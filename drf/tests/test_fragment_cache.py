@@ -0,0 +1,75 @@
+from unittest import mock
+from django.core.cache import caches
+from django.urls import reverse
+from drf.fragment_cache import fragment_cache
+from drf.models import Message
+from drf.serializers import MessageSerializer
+from drf.tests.base import UserTestCase
+from drf.token_cache import token_cache
+
+
+@mock.patch.object(MessageSerializer, 'fragment_cache_enabled', True)
+class FragmentCacheTest(UserTestCase):
+    def setUp(self):
+        super().setUp()
+        caches[fragment_cache.alias].clear()
+        fragment_cache.reset_stats()
+        self.messages = [
+            Message.objects.create(
+                user=self.user, title='title %d' % i, body='body %d' % i
+            )
+            for i in range(6)
+        ]
+
+    def get(self, params=None):
+        return self.client.get(
+            reverse('message-list'), params, headers=self.headers
+        )
+
+    def test_same_body_as_without_cache(self):
+        with mock.patch.object(
+            MessageSerializer, 'fragment_cache_enabled', False
+        ):
+            expected = self.get().content
+        self.assertEqual(self.get().content, expected)
+        self.assertEqual(self.get().content, expected)
+        self.assertEqual(fragment_cache.stats()['hits'], 5)
+        self.assertEqual(fragment_cache.stats()['misses'], 5)
+
+    def test_overlapping_pages_share_fragments(self):
+        self.get({'limit': 3})
+        self.get({'limit': 3, 'offset': 1})
+        self.get({'search': 'title'})
+        self.assertEqual(fragment_cache.stats()['hits'], 2 + 4)
+        self.assertEqual(fragment_cache.stats()['misses'], 3 + 1 + 1)
+
+    def test_changed_rows_miss(self):
+        self.get()
+        message = self.messages[0]
+        message.title = 'changed'
+        message.save()
+        response = self.get()
+        self.assertEqual(response.json()['results'][0]['title'], 'changed')
+        self.assertEqual(fragment_cache.stats()['hits'], 4)
+
+        self.user.email = 'changed@test.com'
+        self.user.save()
+        token_cache.clear()
+        response = self.get()
+        self.assertEqual(
+            response.json()['results'][0]['user']['email'],
+            'changed@test.com'
+        )
+        self.assertEqual(fragment_cache.stats()['hits'], 4)
+
+    def test_message_count_does_not_miss(self):
+        self.get()
+        Message.objects.create(user=self.user, title='new', body='body')
+        token_cache.clear()
+        self.get()
+        self.assertEqual(fragment_cache.stats()['hits'], 5)
+
+    def test_browsable_api_skips_fragments(self):
+        response = self.get({'format': 'api'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(fragment_cache.stats()['misses'], 0)
@@ -0,0 +1,57 @@
+import random
+from io import StringIO
+from django.core.management import call_command
+from django.db.models import Count
+from django.test import TestCase
+from drf.common_methods import authorization
+from drf.management.commands.generate_data import message_counts
+from drf.models import User, Message
+from drf.token_cache import token_cache
+
+
+class GenerateDataTest(TestCase):
+    def generate(self, **options):
+        # The search index can't be rebuilt inside the test transaction.
+        call_command(
+            'generate_data', workers=1, keep_search_index=True,
+            stdout=StringIO(), **options
+        )
+
+    def test_message_counts_are_skewed_and_deterministic(self):
+        counts = message_counts(random.Random(1), 1000, 100000, 1.16)
+        self.assertEqual(sum(counts), 100000)
+        self.assertEqual(
+            counts, message_counts(random.Random(1), 1000, 100000, 1.16)
+        )
+        top_fifth = sum(sorted(counts, reverse=True)[:200])
+        self.assertGreater(top_fifth, 50000)
+
+    def test_generates_users_with_tokens_and_messages(self):
+        token_cache.clear()
+        User.objects.create(email='old@test.com', json_web_token='x')
+        self.generate(users=5, messages=200, seed=3)
+
+        users = User.objects.filter(email__endswith='@load.test')
+        self.assertEqual(users.count(), 5)
+        self.assertEqual(Message.objects.count(), 200)
+        actual = dict(Message.objects.values('user_id').annotate(
+            n=Count('id')
+        ).values_list('user_id', 'n'))
+        for user in users:
+            self.assertEqual(user.message_count, actual.get(user.pk, 0))
+            self.assertEqual(
+                authorization('Bearer ' + user.json_web_token).pk, user.pk
+            )
+        lengths = [len(body) for body in Message.objects.values_list(
+            'body', flat=True
+        )]
+        self.assertTrue(all(0 < length <= 2048 for length in lengths))
+        self.assertGreater(len(set(lengths)), 50)
+
+        # Ids continue after the existing rows.
+        created = Message.objects.create(
+            user=users.first(), title='title', body='body'
+        )
+        self.assertGreater(
+            created.pk, Message.objects.exclude(pk=created.pk).latest('pk').pk
+        )
@@ -0,0 +1,50 @@
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase
+from django.urls import reverse
+from drf.middleware import (
+    AuthenticationMiddleware, CsrfViewMiddleware, MessageMiddleware,
+    SessionMiddleware)
+
+
+def view(request):
+    return HttpResponse()
+
+
+class SkipAPIMiddlewareTest(TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def run_stack(self, request):
+        handler = view
+        for middleware in (
+            MessageMiddleware, AuthenticationMiddleware, SessionMiddleware
+        ):
+            handler = middleware(handler)
+        handler(request)
+        return request
+
+    def test_api_requests_skip_session_auth_and_messages(self):
+        request = self.run_stack(self.factory.get(reverse('message-list')))
+        self.assertFalse(hasattr(request, 'session'))
+        self.assertFalse(hasattr(request, 'user'))
+        self.assertFalse(hasattr(request, '_messages'))
+
+        request = self.run_stack(self.factory.get('/admin/'))
+        self.assertTrue(hasattr(request, 'session'))
+        self.assertTrue(hasattr(request, 'user'))
+        self.assertTrue(hasattr(request, '_messages'))
+
+    def test_csrf_is_only_checked_outside_the_api(self):
+        middleware = CsrfViewMiddleware(view)
+        request = self.factory.post(reverse('message-list'))
+        self.assertIsNone(middleware.process_view(request, view, (), {}))
+        request = self.factory.post('/admin/login/')
+        self.assertEqual(
+            middleware.process_view(request, view, (), {}).status_code, 403
+        )
+
+    def test_api_responses_set_no_cookies(self):
+        response = self.client.get(reverse('user-list'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.cookies, {})
+        self.assertFalse(hasattr(response.wsgi_request, 'session'))
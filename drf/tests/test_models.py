@@ -1,3 +1,5 @@
+from unittest import mock
+from django.db import IntegrityError, connection, transaction
 from django.test import TestCase
 from decouple import config
 from drf.models import User, Message
@@ -9,9 +11,6 @@ JWT_SECRET_KEY = config('JWT_SECRET_KEY')
 class UserModelTest(TestCase):
     def setUp(self):
         self.jwt_code = create_jwt('test@test.com')
-        self.user = User.objects.create(
-            email='test@test.com', json_web_token=create_jwt('test@test.com')
-        )
         self.user = User.objects.create(
             email='test@test.com', json_web_token=self.jwt_code
         )
@@ -26,9 +25,48 @@ class UserModelTest(TestCase):
     def test_user_table_name(self):
         self.assertEqual(self.user._meta.db_table, 'users')
 
+    def test_model_user_email_unique(self):
+        with self.assertRaises(IntegrityError):
+            User.objects.create(
+                email='test@test.com', json_web_token=self.jwt_code
+            )
+
     def test_model_message_create(self):
         self.assertEqual(self.message.title, 'testtiltle')
         self.assertEqual(self.message.body, 'testbody')
 
     def test_message_table_name(self):
         self.assertEqual(self.message._meta.db_table, 'messages')
+
+    def test_model_save_bumps_version(self):
+        self.assertEqual(self.message.version, 1)
+        updated_at = self.message.updated_at
+        self.message.title = 'updated'
+        self.message.save(update_fields=['title'])
+        self.message.refresh_from_db()
+        self.assertEqual(self.message.version, 2)
+        self.assertGreater(self.message.updated_at, updated_at)
+        self.assertGreaterEqual(
+            self.message.updated_at, self.message.create_at
+        )
+
+    def test_model_concurrent_saves_bump_version(self):
+        stale = Message.objects.get(pk=self.message.pk)
+        self.message.save()
+        stale.save()
+        self.assertEqual(self.message.version, 2)
+        self.assertEqual(stale.version, 3)
+
+    def test_model_save_reads_version_back_without_returning(self):
+        with mock.patch.object(
+            connection.features, 'can_return_columns_from_insert', False
+        ), self.assertNumQueries(2):
+            self.message.save()
+        self.assertEqual(self.message.version, 2)
+
+    def test_model_failed_save_keeps_version(self):
+        other = User.objects.create(email='other@test.com')
+        other.email = self.user.email
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            other.save()
+        self.assertEqual(other.version, 1)
@@ -0,0 +1,211 @@
+import asyncio
+import base64
+import tempfile
+import threading
+from unittest import mock
+from django.contrib.auth.models import User as StaffUser
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpResponse
+from django.test import RequestFactory, override_settings
+from django.urls import reverse
+from drf import profiling
+from drf.models import User, Message
+from drf.profiling import ProfilerMiddleware
+from drf.tests.base import UserTestCase
+
+
+class ProfilingTestCase(UserTestCase):
+    def setUp(self):
+        super().setUp()
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        for name, value in (
+            ('PROFILE_SECRET', 'secret'),
+            ('PROFILE_USER_IDS', frozenset()),
+        ):
+            patcher = mock.patch.object(profiling, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.store = profiling.profile_store
+        for name, value in (('directory', self.directory.name), ('keep', 3)):
+            patcher = mock.patch.object(self.store, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        Message.objects.create(user=self.user, title='title', body='body')
+
+    def get_messages(self, **headers):
+        return self.client.get(
+            reverse('message-list'), headers={**self.headers, **headers}
+        )
+
+
+class ProfilerTest(ProfilingTestCase):
+    def test_unconfigured_middleware_removes_itself(self):
+        with mock.patch.object(profiling, 'PROFILE_SECRET', ''):
+            with self.assertRaises(MiddlewareNotUsed):
+                ProfilerMiddleware(lambda request: HttpResponse())
+
+    def test_only_signed_requests_are_profiled(self):
+        response = self.get_messages()
+        self.assertFalse(response.has_header('X-Profile-Id'))
+        response = self.get_messages(**{'X-Profile': 'profile:bad:sig'})
+        self.assertFalse(response.has_header('X-Profile-Id'))
+        self.assertEqual(self.store.list(), [])
+
+        response = self.get_messages(
+            **{'X-Profile': profiling.sign_profile_request()}
+        )
+        self.assertEqual(response.status_code, 200)
+        report = self.store.get(response['X-Profile-Id'])
+        self.assertEqual(report['path'], reverse('message-list'))
+        self.assertEqual(report['status'], 200)
+        self.assertEqual(report['scope'], 'request')
+        self.assertEqual(report['query_count'], len(report['queries']))
+        self.assertTrue(any(
+            'messages' in query['sql'] for query in report['queries']
+        ))
+        self.assertEqual(set(report['breakdown_ms']), {
+            'total', 'db', 'auth', 'serialize', 'render'
+        })
+        self.assertGreater(report['breakdown_ms']['serialize'], 0)
+        self.assertTrue(report['top'])
+
+    def test_allowlisted_users_are_profiled(self):
+        with mock.patch.object(
+            profiling, 'PROFILE_USER_IDS', frozenset([self.user.pk])
+        ):
+            response = self.get_messages()
+        report = self.store.get(response['X-Profile-Id'])
+        self.assertEqual(report['user_id'], self.user.pk)
+
+    def test_other_users_tokens_are_not_verified(self):
+        other = User.objects.create(email='other@test.com')
+        with mock.patch.object(
+            profiling, 'PROFILE_USER_IDS', frozenset([other.pk])
+        ), mock.patch.object(
+            profiling, 'decode_bearer_token',
+            wraps=profiling.decode_bearer_token,
+        ) as decode:
+            response = self.get_messages()
+            self.assertFalse(response.has_header('X-Profile-Id'))
+            decode.assert_not_called()
+            for token in ('', 'Bearer a.b.c', 'Bearer a.W10.c'):
+                response = self.get_messages(Authorization=token)
+                self.assertFalse(response.has_header('X-Profile-Id'))
+            decode.assert_not_called()
+
+    async def test_async_reports_are_saved_off_the_event_loop(self):
+        loop_thread = threading.get_ident()
+        save = self.store.save
+        threads = []
+
+        def record_thread(*args):
+            threads.append(threading.get_ident())
+            return save(*args)
+
+        with mock.patch.object(self.store, 'save', record_thread):
+            response = await self.async_client.get(
+                reverse('async-message-list'), headers={
+                    **self.headers,
+                    'X-Profile': profiling.sign_profile_request(),
+                }
+            )
+        self.assertTrue(response.has_header('X-Profile-Id'))
+        self.assertEqual(len(threads), 1)
+        self.assertNotEqual(threads[0], loop_thread)
+
+    async def test_async_requests_are_profiled(self):
+        response = await self.async_client.get(
+            reverse('async-message-list'), headers={
+                **self.headers,
+                'X-Profile': profiling.sign_profile_request(),
+            }
+        )
+        self.assertEqual(response.status_code, 200)
+        report = self.store.get(response['X-Profile-Id'])
+        self.assertEqual(report['path'], reverse('async-message-list'))
+        self.assertTrue(report['queries'])
+        self.assertEqual(report['scope'], 'event loop')
+
+    async def test_overlapping_async_requests_are_profiled_once(self):
+        both_running = asyncio.Barrier(2)
+
+        async def get_response(request):
+            await both_running.wait()
+            return HttpResponse()
+
+        middleware = ProfilerMiddleware(get_response)
+        request = RequestFactory().get('/', headers={
+            'X-Profile': profiling.sign_profile_request(),
+        })
+        responses = await asyncio.gather(
+            middleware(request), middleware(request)
+        )
+        self.assertEqual(
+            [response.has_header('X-Profile-Id') for response in responses],
+            [True, False],
+        )
+        self.assertFalse(middleware.async_capturing)
+
+    def test_store_keeps_the_newest_captures(self):
+        ids = [
+            self.get_messages(
+                **{'X-Profile': profiling.sign_profile_request()}
+            )['X-Profile-Id']
+            for _ in range(5)
+        ]
+        self.assertEqual(self.store.ids(), ids[2:])
+        self.assertEqual(
+            [report['id'] for report in self.store.list()], ids[:1:-1]
+        )
+        self.assertIsNone(self.store.get('../../etc/passwd'))
+
+
+@override_settings(
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher']
+)
+class ProfileViewSetTest(ProfilingTestCase):
+    def staff_headers(self, is_staff=True):
+        StaffUser.objects.create_user('admin', password='pw',
+                                      is_staff=is_staff)
+        credentials = base64.b64encode(b'admin:pw').decode()
+        return {'Authorization': 'Basic ' + credentials}
+
+    def test_staff_can_list_retrieve_and_download(self):
+        profile_id = self.get_messages(
+            **{'X-Profile': profiling.sign_profile_request()}
+        )['X-Profile-Id']
+        headers = self.staff_headers()
+
+        response = self.client.get(reverse('profile-list'), headers=headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([report['id'] for report in response.json()],
+                         [profile_id])
+        self.assertNotIn('queries', response.json()[0])
+
+        response = self.client.get(
+            reverse('profile-detail', args=[profile_id]), headers=headers
+        )
+        self.assertIn('queries', response.json())
+
+        response = self.client.get(
+            reverse('profile-download', args=[profile_id]), headers=headers
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(b''.join(response.streaming_content))
+
+        response = self.client.get(
+            reverse('profile-detail', args=['1-00000000']), headers=headers
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_other_users_are_refused(self):
+        response = self.client.get(
+            reverse('profile-list'), headers=self.staff_headers(False)
+        )
+        self.assertEqual(response.status_code, 403)
+        response = self.client.get(
+            reverse('profile-list'), headers=self.headers
+        )
+        self.assertEqual(response.status_code, 401)
@@ -0,0 +1,105 @@
+import datetime
+import decimal
+import io
+import uuid
+from unittest import mock
+from django.test import SimpleTestCase
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.serializer_helpers import ReturnDict, ReturnList
+from drf.renderers import FastJSONParser, FastJSONRenderer, JSONFragment
+
+
+class FastJSONRendererTest(SimpleTestCase):
+    data = {
+        'results': ReturnList([
+            ReturnDict({'title': 'é 中 \u2028\u2029', 'body': 'a"b\n'},
+                       serializer=None),
+        ], serializer=None),
+        'count': 2 ** 40,
+        'next': None,
+        'flag': True,
+        'ratio': 0.1,
+        'price': decimal.Decimal('1.10'),
+        'when': datetime.datetime(2024, 1, 2, 3, 4, 5, 6000,
+                                  tzinfo=datetime.timezone.utc),
+        'day': datetime.date(2024, 1, 2),
+        'uuid': uuid.UUID(int=1),
+        'lazy': gettext_lazy('Invalid cursor'),
+        1: 'int key',
+    }
+
+    def test_matches_json_renderer(self):
+        self.assertEqual(
+            FastJSONRenderer().render(self.data),
+            JSONRenderer().render(self.data)
+        )
+
+    def test_matches_json_renderer_without_orjson(self):
+        with mock.patch('drf.renderers.orjson', None):
+            self.assertEqual(
+                FastJSONRenderer().render(self.data),
+                JSONRenderer().render(self.data)
+            )
+
+    def test_indent_matches_json_renderer(self):
+        media_type = 'application/json; indent=4'
+        self.assertEqual(
+            FastJSONRenderer().render(self.data, media_type),
+            JSONRenderer().render(self.data, media_type)
+        )
+
+    def test_big_int_falls_back(self):
+        data = {'count': 2 ** 70}
+        self.assertEqual(
+            FastJSONRenderer().render(data), JSONRenderer().render(data)
+        )
+
+    def test_non_finite_floats_match_json_renderer(self):
+        for value in (float('nan'), float('inf'), float('-inf')):
+            data = {'results': [{'ratio': value}], 'next': None}
+            with self.assertRaisesMessage(ValueError, 'not JSON compliant'):
+                FastJSONRenderer().render(data)
+            renderer = FastJSONRenderer()
+            renderer.strict = False
+            legacy = JSONRenderer()
+            legacy.strict = False
+            self.assertEqual(renderer.render(data), legacy.render(data))
+
+    def test_none(self):
+        self.assertEqual(FastJSONRenderer().render(None), b'')
+
+    def test_fragment(self):
+        data = {'results': [JSONFragment('{"title":"a"}'), {'title': 'b'}]}
+        expected = b'{"results":[{"title":"a"},{"title":"b"}]}'
+        self.assertEqual(FastJSONRenderer().render(data), expected)
+        with mock.patch('drf.renderers.orjson', None):
+            self.assertEqual(FastJSONRenderer().render(data), expected)
+
+
+class FastJSONParserTest(SimpleTestCase):
+    def parse(self, content, parser_context=None):
+        return FastJSONParser().parse(
+            io.BytesIO(content), parser_context=parser_context
+        )
+
+    def test_matches_json_parser(self):
+        content = '{"title": "é \\u00e9", "n": [1, 2.5, null]}'.encode()
+        self.assertEqual(
+            self.parse(content),
+            JSONParser().parse(io.BytesIO(content))
+        )
+
+    def test_other_encoding(self):
+        content = '{"title": "é"}'.encode('latin-1')
+        self.assertEqual(
+            self.parse(content, {'encoding': 'latin-1'}), {'title': 'é'}
+        )
+
+    def test_invalid(self):
+        for content in (b'{"title": "a"}sd', b'{"n": NaN}', b'\xff'):
+            with self.subTest(content=content):
+                with self.assertRaises(ParseError):
+                    self.parse(content)
@@ -0,0 +1,102 @@
+import json
+from unittest import mock
+from django.core.cache import caches
+from django.urls import reverse
+from drf.messages import MessageViewSet
+from drf.models import User, Message
+from drf.response_cache import response_cache
+from drf.tests.base import UserTestCase, auth_headers
+
+
+@mock.patch.object(MessageViewSet, 'response_cache_enabled', True)
+class ResponseCacheTest(UserTestCase):
+    def setUp(self):
+        super().setUp()
+        caches[response_cache.alias].clear()
+        response_cache.reset_stats()
+        self.message = Message.objects.create(
+            user=self.user, title='title', body='body'
+        )
+        self.url = reverse('message-list')
+
+    def get(self, params=None, **headers):
+        return self.client.get(
+            self.url, params, headers={**self.headers, **headers}
+        )
+
+    def test_repeated_read_is_served_from_cache(self):
+        response = self.get({'limit': 5, 'offset': 0})
+        self.assertEqual(response['X-Cache'], 'MISS')
+        with self.assertNumQueries(0):
+            cached = self.get({'offset': 0, 'limit': 5, 'search': ''})
+        self.assertEqual(cached['X-Cache'], 'HIT')
+        self.assertEqual(cached.content, response.content)
+        self.assertEqual(cached['ETag'], response['ETag'])
+        self.assertEqual(response_cache.stats()['hit_ratio'], 0.5)
+
+    def test_cached_not_modified(self):
+        etag = self.get()['ETag']
+        with self.assertNumQueries(0):
+            response = self.get(**{'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+
+    def test_keys_are_per_user_and_params(self):
+        self.get()
+        self.assertEqual(self.get({'limit': 1})['X-Cache'], 'MISS')
+        other = User.objects.create(email='other@test.com')
+        response = self.client.get(self.url, headers=auth_headers(other))
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.json()['count'], 0)
+
+    def test_writes_invalidate(self):
+        writes = [
+            lambda: self.client.post(
+                self.url, json.dumps({'title': 'new', 'body': 'body'}),
+                content_type='application/json', headers=self.headers
+            ),
+            lambda: self.client.post(
+                reverse('message-bulk-create'),
+                json.dumps([{'title': 'bulk', 'body': 'body'}]),
+                content_type='application/json', headers=self.headers
+            ),
+            lambda: self.client.patch(
+                reverse('message-batch-update'),
+                json.dumps([{'id': self.message.pk, 'title': 'changed'}]),
+                content_type='application/json', headers=self.headers
+            ),
+            lambda: self.client.delete(
+                reverse('message-detail', kwargs={'pk': self.message.pk}),
+                headers=self.headers
+            ),
+        ]
+        for write in writes:
+            before = self.get().content
+            self.assertEqual(self.get()['X-Cache'], 'HIT')
+            with self.captureOnCommitCallbacks(execute=True):
+                write()
+            response = self.get()
+            self.assertEqual(response['X-Cache'], 'MISS')
+            self.assertNotEqual(response.content, before)
+
+    def test_invalidate_without_generation(self):
+        key = response_cache.generation_key(self.user.pk)
+        response_cache.invalidate_user(self.user.pk)
+        generation = caches[response_cache.alias].get(key)
+        response_cache.invalidate_user(self.user.pk)
+        self.assertEqual(
+            caches[response_cache.alias].get(key), generation + 1
+        )
+
+    def test_oversized_response_is_not_stored(self):
+        with mock.patch.object(response_cache, 'max_bytes', 10):
+            self.get()
+            self.assertEqual(self.get()['X-Cache'], 'MISS')
+        self.assertEqual(response_cache.stats()['oversized'], 2)
+        self.assertEqual(response_cache.stats()['stores'], 0)
+
+    def test_disabled(self):
+        with mock.patch.object(
+            MessageViewSet, 'response_cache_enabled', False
+        ):
+            self.get()
+            self.assertFalse(self.get().has_header('X-Cache'))
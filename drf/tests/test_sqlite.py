@@ -0,0 +1,71 @@
+from unittest import mock
+from django.db import OperationalError, connection
+from django.test import TestCase, override_settings
+from drf.sqlite import RetryOnLock, configure_connection, production_profile
+
+
+class RetryOnLockTest(TestCase):
+    def setUp(self):
+        self.sleep = mock.Mock()
+        self.retry = RetryOnLock(retries=3, sleep=self.sleep)
+        self.context = {'connection': mock.Mock(in_atomic_block=False)}
+
+    def test_retries_lock_errors_with_growing_waits(self):
+        execute = mock.Mock(side_effect=[
+            OperationalError('database is locked'),
+            OperationalError('database is locked'),
+            'done',
+        ])
+        with mock.patch('drf.sqlite.random.uniform', return_value=0) as wait:
+            self.assertEqual(
+                self.retry(execute, 'SQL', (), False, self.context), 'done'
+            )
+        self.assertEqual(execute.call_count, 3)
+        self.assertEqual(self.sleep.call_count, 2)
+        self.assertLess(wait.call_args_list[0][0][1],
+                        wait.call_args_list[1][0][1])
+
+    def test_gives_up_after_retries(self):
+        execute = mock.Mock(side_effect=OperationalError('database is locked'))
+        with self.assertRaises(OperationalError):
+            self.retry(execute, 'SQL', (), False, self.context)
+        self.assertEqual(execute.call_count, 4)
+
+    def test_other_errors_and_transactions_are_not_retried(self):
+        execute = mock.Mock(side_effect=OperationalError('no such table: x'))
+        with self.assertRaises(OperationalError):
+            self.retry(execute, 'SQL', (), False, self.context)
+        self.context['connection'].in_atomic_block = True
+        execute.side_effect = OperationalError('database is locked')
+        with self.assertRaises(OperationalError):
+            self.retry(execute, 'SQL', (), False, self.context)
+        self.assertEqual(execute.call_count, 2)
+        self.assertFalse(self.sleep.called)
+
+
+class ConfigureConnectionTest(TestCase):
+    def pragma(self, name):
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA %s' % name)
+            return cursor.fetchone()[0]
+
+    @override_settings(SQLITE_PRAGMAS={'cache_size': -1234})
+    def test_applies_pragmas_and_retry_wrapper_once(self):
+        old_cache_size = self.pragma('cache_size')
+        wrappers = connection.execute_wrappers[:]
+        connection.execute_wrappers[:] = []
+        try:
+            configure_connection(connection)
+            configure_connection(connection)
+            self.assertEqual(self.pragma('cache_size'), -1234)
+            self.assertEqual(len(connection.execute_wrappers), 1)
+        finally:
+            connection.execute_wrappers[:] = wrappers
+            with connection.cursor() as cursor:
+                cursor.execute('PRAGMA cache_size = %d' % old_cache_size)
+
+    def test_only_the_production_profile_is_configured(self):
+        with override_settings(SQLITE_PROFILE='development'):
+            self.assertFalse(production_profile(connection))
+        with override_settings(SQLITE_PROFILE='production'):
+            self.assertTrue(production_profile(connection))
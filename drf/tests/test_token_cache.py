@@ -0,0 +1,74 @@
+from unittest import mock
+from drf.common_methods import AuthorizeError, create_jwt, authorization
+from drf.tests.base import UserTestCase
+from drf.token_cache import TokenCache, token_cache
+
+
+class TokenCacheTest(UserTestCase):
+    def setUp(self):
+        super().setUp()
+        self.bearer_token = 'Bearer ' + self.user.json_web_token
+
+    def test_authorization_cache_hit_skips_queries(self):
+        authorization(self.bearer_token)
+        with self.assertNumQueries(0):
+            user = authorization(self.bearer_token)
+        self.assertEqual(user.pk, self.user.pk)
+        self.assertEqual(token_cache.stats()['hits'], 1)
+        self.assertEqual(token_cache.stats()['misses'], 1)
+
+    def test_authorization_claims_token_skips_queries(self):
+        token = create_jwt(self.user.email, self.user.id, 0)
+        # Only the token version is read, once per user.
+        with self.assertNumQueries(1):
+            user = authorization('Bearer ' + token)
+        self.assertEqual(user.pk, self.user.pk)
+        with self.assertNumQueries(0):
+            authorization('Bearer ' + token)
+            authorization('Bearer ' + create_jwt('other', self.user.id, 0))
+        with self.assertNumQueries(1):
+            self.assertEqual(user.email, 'test@test.com')
+
+    def test_authorization_claims_token_checks_version(self):
+        token = 'Bearer ' + create_jwt(self.user.email, self.user.id, 0)
+        authorization(token)
+        self.user.token_version += 1
+        self.user.save()
+        with self.assertRaises(AuthorizeError):
+            authorization(token)
+        self.assertEqual(authorization('Bearer ' + create_jwt(
+            self.user.email, self.user.id, 1
+        )).pk, self.user.pk)
+        self.user.delete()
+        with self.assertRaises(AuthorizeError):
+            authorization('Bearer ' + create_jwt(
+                self.user.email, self.user.id, 1
+            ))
+
+    def test_user_save_invalidates(self):
+        authorization(self.bearer_token)
+        self.user.save()
+        self.assertEqual(token_cache.stats()['size'], 0)
+
+    def test_user_delete_invalidates(self):
+        authorization(self.bearer_token)
+        self.user.delete()
+        self.assertEqual(token_cache.stats()['size'], 0)
+
+    def test_lru_eviction(self):
+        cache = TokenCache(max_size=2, ttl=60)
+        cache.set('a', self.user)
+        cache.set('b', self.user)
+        cache.get('a')
+        cache.set('c', self.user)
+        self.assertIsNotNone(cache.get('a'))
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.stats()['size'], 2)
+
+    def test_ttl_expiry(self):
+        cache = TokenCache(max_size=2, ttl=10)
+        with mock.patch('drf.token_cache.time.monotonic', return_value=0):
+            cache.set('a', self.user)
+        with mock.patch('drf.token_cache.time.monotonic', return_value=11):
+            self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.stats()['size'], 0)
@@ -2,6 +2,8 @@ from django.test import SimpleTestCase
 from django.urls import reverse, resolve
 from drf.users import UserViewSet
 from drf.messages import MessageViewSet
+from drf.profiles import ProfileViewSet
+from drf.async_views import AsyncMessageDetailView, AsyncMessageListView
 
 
 class UrlTest(SimpleTestCase):
@@ -20,3 +22,23 @@ class UrlTest(SimpleTestCase):
     def test_messages_drfs_url_user_detail(self):
         url = reverse('message-detail', kwargs={'pk': 1})
         self.assertEqual(resolve(url).func.cls, MessageViewSet)
+
+    def test_async_messages_url_list(self):
+        url = reverse('async-message-list')
+        self.assertEqual(
+            resolve(url).func.view_class, AsyncMessageListView
+        )
+
+    def test_async_messages_url_detail(self):
+        url = reverse('async-message-detail', kwargs={'pk': 1})
+        self.assertEqual(
+            resolve(url).func.view_class, AsyncMessageDetailView
+        )
+
+    def test_profiles_url_list(self):
+        url = reverse('profile-list')
+        self.assertEqual(resolve(url).func.cls, ProfileViewSet)
+
+    def test_profiles_url_download(self):
+        url = reverse('profile-download', kwargs={'pk': '1-00000000'})
+        self.assertEqual(resolve(url).func.cls, ProfileViewSet)
@@ -1,9 +1,16 @@
+from django.db import connection
+from django.db.models import F
 from django.test import TestCase, Client
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from decouple import config
 from drf.models import User, Message
+from drf.messages import MessageViewSet, stream_rows
+from drf.search import SQLiteSearchBackend
+from unittest import mock
 import json
 from drf.common_methods import create_jwt
+from drf.token_cache import token_cache
 import jwt
 
 JWT_SECRET_KEY = config('JWT_SECRET_KEY')
@@ -11,6 +18,7 @@ JWT_SECRET_KEY = config('JWT_SECRET_KEY')
 
 class DrfTest(TestCase):
     def setUp(self):
+        token_cache.clear()
         create_jwt(email='test@test.com')
         self.user = User.objects.create(
             email='test@test.com',
@@ -32,6 +40,24 @@ class DrfTest(TestCase):
         self.assertEqual(response.status_code, 201)
         self.assertEqual(response.json().get('email'), 'test@test1.com')
 
+    def test_drf_user_create_exist_email(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(
+                reverse('user-list'),
+                json.dumps({"email": "test@test.com"}),
+                **self.json_request
+            )
+        self.assertEqual(response.status_code, 409)
+        self.assertFalse(
+            any(q['sql'].startswith('SELECT') for q in queries.captured_queries)
+        )
+        self.assertEqual(
+            response.json()['detail'], 'user with this email already exists.'
+        )
+        self.assertEqual(
+            User.objects.filter(email='test@test.com').count(), 1
+        )
+
     def test_drf_user_create_invalid_data_invalid_json(self):
         response = self.client.post(
             reverse('user-list'),
@@ -82,6 +108,48 @@ class DrfTest(TestCase):
             ['Enter a valid email address.']
         )
 
+    def test_drf_user_create_token_claims(self):
+        response = self.client.post(
+            reverse('user-list'),
+            json.dumps({"email": "test@test1.com"}),
+            **self.json_request
+        )
+        user = User.objects.get(email='test@test1.com')
+        load_data = jwt.decode(
+            response.json()['json_web_token'],
+            JWT_SECRET_KEY, algorithms=["HS256"]
+        )
+        self.assertEqual(
+            user.json_web_token, response.json()['json_web_token']
+        )
+        self.assertEqual(load_data['uid'], user.id)
+        self.assertEqual(load_data['ver'], user.token_version)
+
+    def test_drf_user_create_uses_the_sequence(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(
+                reverse('user-list'),
+                json.dumps({"email": "test@test1.com"}),
+                **self.json_request
+            )
+        self.assertEqual(response.status_code, 201)
+        statements = [
+            q['sql'].split()[0] for q in queries.captured_queries
+            if '"users"' in q['sql'] or 'SAVEPOINT' in q['sql']
+        ]
+        self.assertEqual(
+            statements, ['SAVEPOINT', 'INSERT', 'UPDATE', 'RELEASE']
+        )
+        user = User.objects.get(email='test@test1.com')
+        self.assertEqual(user.pk, self.user.pk + 1)
+        self.assertEqual(user.version, 1)
+        self.assertEqual(response.json()['json_web_token'], create_jwt(
+            user.email, user.pk, 0
+        ))
+        self.assertEqual(user.json_web_token, create_jwt(
+            user.email, user.pk, 0
+        ))
+
     def test_drf_users_list_limit(self):
         User.objects.create(
             email='test3@test3.com',
@@ -298,6 +366,67 @@ class DrfTest(TestCase):
             )
         self.assertEqual(len(response.json()['results']), 3)
 
+    def test_drf_list_messages_full_text_search(self):
+        Message.objects.create(
+            user_id=self.user.id,
+            title='quarterly report', body='numbers are up'
+            )
+        Message.objects.create(
+            user_id=self.user.id,
+            title='lunch', body='report the quarterly numbers'
+            )
+        Message.objects.create(
+            user_id=self.user.id,
+            title='lunch', body='nothing to see'
+            )
+        message = Message.objects.create(
+            user_id=self.user.id,
+            title='quarterly report', body='quarterly numbers'
+            )
+        message.title = 'renamed'
+        message.save()
+        response = self.client.get(
+            reverse('message-list'),
+            {'search': 'quart numb'},
+            headers={'Authorization': self.bearer_token}
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['count'], 3)
+        self.assertEqual(
+            response.json()['results'][0]['body'], 'quarterly numbers'
+            )
+
+    def test_drf_search_works_inside_other_queries(self):
+        Message.objects.create(
+            user_id=self.user.id, title='other', body='nothing'
+            )
+        search = SQLiteSearchBackend().search
+        found = search(Message.objects.all(), ['testbo'])
+        self.assertEqual(found.count(), 1)
+        self.assertEqual(
+            User.objects.filter(id__in=found.values('user_id')).get(),
+            self.user
+            )
+        found = search(Message.objects.filter(title='other'), ['testbo'])
+        self.assertFalse(
+            User.objects.filter(id__in=found.values('user_id')).exists()
+            )
+
+    def test_drf_list_messages_search_other_user(self):
+        other = User.objects.create(
+            email='test2@test2.com',
+            json_web_token=create_jwt('test2@test2.com')
+            )
+        Message.objects.create(
+            user_id=other.id, title='testtiltle', body='testbody'
+            )
+        response = self.client.get(
+            reverse('message-list'),
+            {'search': 'testbody'},
+            headers={'Authorization': self.bearer_token}
+            )
+        self.assertEqual(response.json()['count'], 1)
+
     def test_drf_list_messages_query_params(self):
         Message.objects.create(
             user_id=self.user.id,
@@ -317,6 +446,96 @@ class DrfTest(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertEqual(len(response.json()['results']), 1)
 
+    def test_drf_list_messages_cursor_pagination(self):
+        for i in range(2, 5):
+            Message.objects.create(
+                user_id=self.user.id,
+                title='testtiltle%d' % i, body='testbody%d' % i
+            )
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                reverse('message-list'),
+                {'pagination': 'cursor', 'limit': '3'},
+                headers={'Authorization': self.bearer_token}
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('count', response.json())
+        self.assertFalse(
+            any('COUNT' in q['sql'] for q in queries.captured_queries)
+        )
+        self.assertEqual(
+            [m['body'] for m in response.json()['results']],
+            ['testbody', 'testbody2', 'testbody3']
+        )
+        response = self.client.get(
+            response.json()['next'],
+            headers={'Authorization': self.bearer_token}
+        )
+        self.assertEqual(
+            [m['body'] for m in response.json()['results']], ['testbody4']
+        )
+        self.assertIsNone(response.json()['next'])
+        self.assertIsNotNone(response.json()['previous'])
+
+    def test_drf_list_messages_nocount_pagination(self):
+        Message.objects.create(
+            user_id=self.user.id, title='testtiltle2', body='testbody2'
+            )
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                reverse('message-list'),
+                {'pagination': 'nocount', 'limit': '1'},
+                headers={'Authorization': self.bearer_token}
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('count', response.json())
+        self.assertFalse(
+            any('COUNT' in q['sql'] for q in queries.captured_queries)
+        )
+        self.assertEqual(len(response.json()['results']), 1)
+        response = self.client.get(
+            response.json()['next'],
+            headers={'Authorization': self.bearer_token}
+        )
+        self.assertEqual(response.json()['results'][0]['body'], 'testbody2')
+        self.assertIsNone(response.json()['next'])
+
+    def test_drf_list_messages_cached_count_pagination(self):
+        Message.objects.create(
+            user_id=self.user.id, title='testtiltle2', body='testbody2'
+            )
+        Message.objects.create(
+            user_id=self.user.id, title='testtiltle3', body='testbody3'
+            ).delete()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                reverse('message-list'),
+                {'pagination': 'cached', 'limit': '1'},
+                headers={'Authorization': self.bearer_token}
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['count'], 2)
+        self.assertFalse(
+            any('COUNT' in q['sql'] for q in queries.captured_queries)
+        )
+        # Search matches word prefixes since the full-text index, so
+        # 'body2' no longer finds 'testbody2'.
+        response = self.client.get(
+            reverse('message-list'),
+            {'pagination': 'cached', 'search': 'testbody2'},
+            headers={'Authorization': self.bearer_token}
+        )
+        self.assertEqual(response.json()['count'], 1)
+
+    def test_drf_list_messages_estimate_pagination(self):
+        response = self.client.get(
+            reverse('message-list'),
+            {'pagination': 'estimate'},
+            headers={'Authorization': self.bearer_token}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['count'], 1)
+
     def test_drf_list_messages_wrong_query(self):
         Message.objects.create(
             user_id=self.user.id,
@@ -338,6 +557,525 @@ class DrfTest(TestCase):
             response.json()['results'][2]['body'], 'testbody3'
             )
 
+    def test_drf_message_detail_claims_token(self):
+        token = create_jwt(
+            self.user.email, self.user.id, self.user.token_version
+        )
+        response = self.client.get(
+            reverse('message-detail', kwargs={'pk': self.message.id}),
+            headers={'Authorization': 'Bearer ' + token}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['user']['email'], 'test@test.com')
+
+    def test_drf_message_create_revoked_token(self):
+        token = create_jwt(
+            self.user.email, self.user.id, self.user.token_version
+        )
+        self.user.token_version += 1
+        self.user.save()
+        response = self.client.post(
+            reverse('message-list'),
+            json.dumps({"title": "testtitle2", "body": "testbody2"}),
+            **self.json_request, headers={'Authorization': 'Bearer ' + token}
+        )
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(response.json()['detail'], 'invalid jwt.')
+
+    def list_messages_queries(self, messages):
+        for i in range(messages):
+            Message.objects.create(
+                user_id=self.user.id, title='title%d' % i, body='body%d' % i
+            )
+        token_cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                reverse('message-list'), {'limit': '50'},
+                headers={'Authorization': self.bearer_token}
+            )
+        self.assertEqual(
+            len(response.json()['results']), Message.objects.count()
+        )
+        return len(queries)
+
+    def test_drf_list_messages_constant_queries(self):
+        queries = self.list_messages_queries(1)
+        self.assertEqual(self.list_messages_queries(10), queries)
+        self.assertEqual(self.list_messages_queries(30), queries)
+
+    def test_drf_message_update_constant_queries(self):
+        # The UPDATE returns the version it bumped; no read-back.
+        with self.assertNumQueries(3):
+            response = self.client.patch(
+                reverse('message-detail', kwargs={'pk': self.message.id}),
+                json.dumps({"title": "updatetitle"}),
+                **self.json_request,
+                headers={'Authorization': self.bearer_token}
+            )
+        self.assertEqual(response.json()['user']['email'], 'test@test.com')
+
+    def test_drf_message_detail_revoked_token(self):
+        token = create_jwt(
+            self.user.email, self.user.id, self.user.token_version
+        )
+        self.user.token_version += 1
+        self.user.save()
+        response = self.client.get(
+            reverse('message-detail', kwargs={'pk': self.message.id}),
+            headers={'Authorization': 'Bearer ' + token}
+        )
+        self.assertEqual(response.status_code, 403)
+
+    def test_drf_list_messages_revoked_token(self):
+        # The list only needs the user's pk, which is in the token.
+        token = create_jwt(
+            self.user.email, self.user.id, self.user.token_version
+        )
+        User.objects.filter(pk=self.user.pk).update(token_version=1)
+        response = self.client.get(
+            reverse('message-list'),
+            headers={'Authorization': 'Bearer ' + token}
+        )
+        self.assertEqual(response.status_code, 403)
+
+    def test_drf_message_export_ndjson(self):
+        second = Message.objects.create(
+            user_id=self.user.id, title='testtiltle2', body='line\nbreak'
+            )
+        response = self.client.get(
+            reverse('message-export'),
+            headers={'Authorization': self.bearer_token}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = b''.join(response.streaming_content).splitlines()
+        self.assertEqual(
+            [json.loads(line) for line in lines],
+            [
+                {'id': self.message.id, 'title': 'testtiltle',
+                 'body': 'testbody'},
+                {'id': second.id, 'title': 'testtiltle2',
+                 'body': 'line\nbreak'},
+            ]
+        )
+
+    def test_drf_message_export_csv_resume(self):
+        second = Message.objects.create(
+            user_id=self.user.id, title='testtiltle2', body='testbody2'
+            )
+        response = self.client.get(
+            reverse('message-export'),
+            {'format': 'csv', 'after': self.message.id},
+            headers={'Authorization': self.bearer_token}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            b''.join(response.streaming_content).decode(),
+            'id,title,body\r\n%d,testtiltle2,testbody2\r\n' % second.id
+        )
+
+    def test_drf_message_export_invalid_cursor(self):
+        for after in ('abc', '-1', '1.5'):
+            response = self.client.get(
+                reverse('message-export'), {'after': after},
+                headers={'Authorization': self.bearer_token}
+            )
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('after', json.loads(response.content))
+
+    def test_stream_rows_holds_a_transaction_on_postgresql(self):
+        queryset = Message.objects.values_list('id', flat=True)
+        in_transaction = []
+        for vendor in ('sqlite', 'postgresql'):
+            with mock.patch.object(connection, 'vendor', vendor):
+                # TestCase wraps each test in a transaction already.
+                with mock.patch('drf.messages.transaction.atomic') as atomic:
+                    self.assertEqual(
+                        list(stream_rows(queryset, 10)), [self.message.id]
+                    )
+            in_transaction.append(atomic.called)
+        self.assertEqual(in_transaction, [False, True])
+
+    def test_drf_message_export_invalid_jwt(self):
+        response = self.client.get(
+            reverse('message-export'),
+            headers={'Authorization': 'invalidjwt'}
+        )
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(
+            json.loads(response.content), {'detail': 'invalid jwt.'}
+        )
+
+    def test_drf_message_bulk_create(self):
+        items = [
+            {"title": "bulk%d" % i, "body": "bulkbody%d" % i}
+            for i in range(3)
+        ]
+        with self.assertNumQueries(5):
+            response = self.client.post(
+                reverse('message-bulk-create'), json.dumps(items),
+                **self.json_request,
+                headers={'Authorization': self.bearer_token}
+            )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['created'], 3)
+        self.assertEqual(response.json()['errors'], [])
+        self.assertEqual(
+            list(Message.objects.filter(
+                id__in=response.json()['ids']
+            ).values_list('title', flat=True)),
+            ['bulk0', 'bulk1', 'bulk2']
+        )
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.message_count, 4)
+
+    def test_drf_message_bulk_create_atomic(self):
+        items = [
+            {"title": "bulk", "body": "bulkbody"},
+            {"title": "", "body": "bulkbody"},
+            "notanobject",
+        ]
+        response = self.client.post(
+            reverse('message-bulk-create'), json.dumps(items),
+            **self.json_request,
+            headers={'Authorization': self.bearer_token}
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            [error['index'] for error in response.json()['errors']], [1, 2]
+        )
+        self.assertEqual(
+            response.json()['errors'][0]['errors']['title'],
+            ['This field may not be blank.']
+        )
+        self.assertEqual(Message.objects.count(), 1)
+
+    def test_drf_message_bulk_create_partial(self):
+        items = [
+            {"title": "bulk", "body": "bulkbody"},
+            {"body": "bulkbody"},
+        ]
+        response = self.client.post(
+            reverse('message-bulk-create') + '?atomic=false',
+            json.dumps(items),
+            **self.json_request,
+            headers={'Authorization': self.bearer_token}
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['created'], 1)
+        self.assertEqual(
+            response.json()['errors'],
+            [{'index': 1, 'errors': {'title': ['This field is required.']}}]
+        )
+        self.assertEqual(Message.objects.count(), 2)
+
+    def test_drf_message_bulk_create_not_list(self):
+        for payload in ({"title": "bulk", "body": "bulkbody"}, []):
+            response = self.client.post(
+                reverse('message-bulk-create'), json.dumps(payload),
+                **self.json_request,
+                headers={'Authorization': self.bearer_token}
+            )
+            self.assertEqual(response.status_code, 400)
+
+    def test_drf_message_batch_update(self):
+        second = Message.objects.create(
+            user_id=self.user.id, title='testtiltle2', body='testbody2'
+            )
+        other = User.objects.create(
+            email='test2@test2.com',
+            json_web_token=create_jwt('test2@test2.com')
+            )
+        foreign = Message.objects.create(
+            user_id=other.id, title='foreign', body='foreign'
+            )
+        response = self.client.patch(
+            reverse('message-batch-update'),
+            json.dumps([
+                {"id": self.message.id, "title": "new1"},
+                {"id": second.id, "title": "new2", "body": "newbody2"},
+                {"id": foreign.id, "title": "hacked"},
+                {"id": 1024, "body": "missing"},
+            ]),
+            **self.json_request,
+            headers={'Authorization': self.bearer_token}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {
+            'updated': [self.message.id, second.id],
+            'not_found': [foreign.id, 1024],
+        })
+        self.assertEqual(
+            list(Message.objects.order_by('id').values_list('title', 'body')),
+            [('new1', 'testbody'), ('new2', 'newbody2'),
+             ('foreign', 'foreign')]
+        )
+
+    def test_drf_message_batch_update_invalid(self):
+        response = self.client.patch(
+            reverse('message-batch-update'),
+            json.dumps([
+                {"id": self.message.id, "title": ""},
+                {"title": "noid"},
+                {"id": self.message.id},
+                "notanobject",
+            ]),
+            **self.json_request,
+            headers={'Authorization': self.bearer_token}
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            [error['index'] for error in response.json()['errors']],
+            [0, 1, 2, 3]
+        )
+        self.message.refresh_from_db()
+        self.assertEqual(self.message.title, 'testtiltle')
+
+    def test_drf_message_batch_destroy(self):
+        second = Message.objects.create(
+            user_id=self.user.id, title='testtiltle2', body='testbody2'
+            )
+        other = User.objects.create(
+            email='test2@test2.com',
+            json_web_token=create_jwt('test2@test2.com')
+            )
+        foreign = Message.objects.create(
+            user_id=other.id, title='foreign', body='foreign'
+            )
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.delete(
+                reverse('message-batch-update'),
+                json.dumps({"ids": [second.id, foreign.id, 1024]}),
+                **self.json_request,
+                headers={'Authorization': self.bearer_token}
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {
+            'deleted': [second.id], 'not_found': [foreign.id, 1024],
+        })
+        self.assertEqual(
+            sum(q['sql'].startswith('DELETE')
+                for q in queries.captured_queries), 1
+        )
+        self.assertFalse(any(
+            '"messages"' in q['sql'] and q['sql'].startswith('SELECT')
+            for q in queries.captured_queries
+        ))
+        self.assertEqual(
+            list(Message.objects.order_by('id').values_list('id', flat=True)),
+            [self.message.id, foreign.id]
+        )
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.message_count, 1)
+
+    def test_drf_message_batch_destroy_invalid(self):
+        for payload in ({"ids": []}, {"ids": ["a"]}, [1]):
+            response = self.client.delete(
+                reverse('message-batch-update'), json.dumps(payload),
+                **self.json_request,
+                headers={'Authorization': self.bearer_token}
+            )
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('ids', response.json())
+
+    def test_drf_list_messages_not_modified(self):
+        url = reverse('message-list')
+        headers = {'Authorization': self.bearer_token}
+        response = self.client.get(url, headers=headers)
+        etag = response['ETag']
+        self.assertTrue(response.has_header('Last-Modified'))
+        # The page's validators, then the embedded user's.
+        with self.assertNumQueries(2):
+            response = self.client.get(
+                url, headers={**headers, 'If-None-Match': etag}
+            )
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(response.content, b'')
+
+        response = self.client.get(
+            url, {'limit': 1}, headers={**headers, 'If-None-Match': etag}
+        )
+        self.assertEqual(response.status_code, 200)
+
+        Message.objects.filter(pk=self.message.pk).update(
+            version=F('version') + 1
+        )
+        response = self.client.get(
+            url, headers={**headers, 'If-None-Match': etag}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_drf_list_messages_not_modified_pages(self):
+        url = reverse('message-list')
+        headers = {'Authorization': self.bearer_token}
+        Message.objects.create(
+            user_id=self.user.id, title='testtiltle2', body='testbody2'
+        )
+        for params in (
+            {}, {'limit': 1, 'offset': 1}, {'offset': 10},
+            {'search': 'testbody2'},
+        ):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url, params, headers=headers)
+            # The validators come from the paginator's count and page.
+            self.assertLessEqual(len([
+                query for query in queries.captured_queries
+                if '"messages"' in query['sql']
+            ]), 2)
+            response = self.client.get(
+                url, params,
+                headers={**headers, 'If-None-Match': response['ETag']}
+            )
+            self.assertEqual(response.status_code, 304)
+
+    def test_drf_list_messages_not_modified_since(self):
+        url = reverse('message-list')
+        headers = {'Authorization': self.bearer_token}
+        last_modified = self.client.get(url, headers=headers)['Last-Modified']
+        response = self.client.get(
+            url, headers={**headers, 'If-Modified-Since': last_modified}
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_drf_list_messages_etag_changes_on_writes(self):
+        url = reverse('message-list')
+        headers = {'Authorization': self.bearer_token}
+        etags = {self.client.get(url, headers=headers)['ETag']}
+        message = Message.objects.create(
+            user_id=self.user.id, title='testtiltle2', body='testbody2'
+        )
+        etags.add(self.client.get(url, headers=headers)['ETag'])
+        self.client.patch(
+            reverse('message-batch-update'),
+            json.dumps([{'id': message.pk, 'title': 'updated'}]),
+            **self.json_request, headers=headers
+        )
+        etags.add(self.client.get(url, headers=headers)['ETag'])
+        self.client.delete(
+            reverse('message-batch-update'),
+            json.dumps({'ids': [message.pk]}),
+            **self.json_request, headers=headers
+        )
+        etags.add(self.client.get(url, headers=headers)['ETag'])
+        self.assertEqual(len(etags), 4)
+
+    def test_drf_list_messages_nocount_not_conditional(self):
+        response = self.client.get(
+            reverse('message-list'), {'pagination': 'nocount'},
+            headers={'Authorization': self.bearer_token}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header('ETag'))
+
+    def test_drf_message_detail_not_modified(self):
+        url = reverse('message-detail', kwargs={'pk': self.message.id})
+        headers = {'Authorization': self.bearer_token}
+        etag = self.client.get(url, headers=headers)['ETag']
+        response = self.client.get(
+            url, headers={**headers, 'If-None-Match': etag}
+        )
+        self.assertEqual(response.status_code, 304)
+
+        self.client.put(
+            url, json.dumps({'title': 'updated', 'body': 'updatebody'}),
+            **self.json_request, headers=headers
+        )
+        response = self.client.get(
+            url, headers={**headers, 'If-None-Match': etag}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['title'], 'updated')
+
+    def test_drf_user_detail_not_modified(self):
+        url = reverse('user-detail', kwargs={'pk': self.user.id})
+        etag = self.client.get(url)['ETag']
+        response = self.client.get(url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        self.user.save()
+        response = self.client.get(url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+
+    @mock.patch.object(MessageViewSet, 'single_statement_writes', True)
+    def test_drf_message_single_statement_update(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.patch(
+                reverse('message-detail', kwargs={'pk': self.message.id}),
+                json.dumps({"title": "updatetitle"}),
+                **self.json_request,
+                headers={'Authorization': self.bearer_token}
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {
+            'title': 'updatetitle', 'body': 'testbody',
+            'user': {
+                'email': 'test@test.com',
+                'json_web_token': self.user.json_web_token,
+            },
+        })
+        updates = [
+            q['sql'] for q in queries.captured_queries
+            if q['sql'].startswith('UPDATE')
+        ]
+        self.assertEqual(len(updates), 1)
+        self.assertNotIn('"body"', updates[0].split('WHERE')[0])
+        self.message.refresh_from_db()
+        self.assertEqual(self.message.title, 'updatetitle')
+
+        response = self.client.put(
+            reverse('message-detail', kwargs={'pk': self.message.id}),
+            json.dumps({"title": "puttitle", "body": "putbody"}),
+            **self.json_request,
+            headers={'Authorization': self.bearer_token}
+        )
+        self.assertEqual(response.json()['body'], 'putbody')
+
+    @mock.patch.object(MessageViewSet, 'single_statement_writes', True)
+    def test_drf_message_single_statement_not_found(self):
+        other = User.objects.create(
+            email='test2@test2.com',
+            json_web_token=create_jwt('test2@test2.com')
+            )
+        foreign = Message.objects.create(
+            user_id=other.id, title='foreign', body='foreign'
+            )
+        for pk in ('abc', foreign.id, 1024):
+            response = self.client.patch(
+                reverse('message-detail', kwargs={'pk': pk}),
+                json.dumps({"title": "updatetitle"}),
+                **self.json_request,
+                headers={'Authorization': self.bearer_token}
+            )
+            self.assertEqual(response.status_code, 404)
+            response = self.client.delete(
+                reverse('message-detail', kwargs={'pk': pk}),
+                headers={'Authorization': self.bearer_token}
+            )
+            self.assertEqual(response.status_code, 404)
+        self.assertEqual(
+            response.json()['detail'], 'No Message matches the given query.'
+        )
+        foreign.refresh_from_db()
+        self.assertEqual(foreign.title, 'foreign')
+
+    @mock.patch.object(MessageViewSet, 'single_statement_writes', True)
+    def test_drf_message_single_statement_destroy(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.delete(
+                reverse('message-detail', kwargs={'pk': self.message.id}),
+                headers={'Authorization': self.bearer_token}
+            )
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(
+            [q['sql'].split()[0] for q in queries.captured_queries
+             if not q['sql'].startswith(('SAVEPOINT', 'RELEASE'))],
+            ['SELECT', 'DELETE', 'UPDATE']
+        )
+        self.assertFalse(Message.objects.exists())
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.message_count, 0)
+
     def test_drf_message_detail(self):
         response = self.client.get(
             reverse('message-detail', kwargs={'pk': self.message.id}),
@@ -0,0 +1,122 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from decouple import config
+
+JWT_CACHE_MAX_SIZE = config('JWT_CACHE_MAX_SIZE', default=10000, cast=int)
+JWT_CACHE_TTL = config('JWT_CACHE_TTL', default=300, cast=float)
+
+
+class TokenCache:
+    """In-process LRU cache of verified bearer tokens to resolved users.
+
+    It also remembers the current ``token_version`` of users, which claims
+    tokens are checked against; both are dropped by ``invalidate_user()``.
+    """
+
+    def __init__(self, max_size=JWT_CACHE_MAX_SIZE, ttl=JWT_CACHE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._keys_by_user = {}
+        self._versions = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(token):
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def get(self, token):
+        if self.max_size <= 0:
+            return None
+        key = self.make_key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            user, expires_at = entry
+            if expires_at <= time.monotonic():
+                self._discard(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return user
+
+    def set(self, token, user):
+        if self.max_size <= 0:
+            return
+        key = self.make_key(token)
+        with self._lock:
+            self._discard(key)
+            self._entries[key] = (user, time.monotonic() + self.ttl)
+            self._keys_by_user.setdefault(user.pk, set()).add(key)
+            while len(self._entries) > self.max_size:
+                self._discard(next(iter(self._entries)))
+
+    def get_version(self, user_id):
+        if self.max_size <= 0:
+            return None
+        with self._lock:
+            entry = self._versions.get(user_id)
+            if entry is None:
+                return None
+            token_version, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._versions[user_id]
+                return None
+            self._versions.move_to_end(user_id)
+            return token_version
+
+    def set_version(self, user_id, token_version):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._versions.pop(user_id, None)
+            self._versions[user_id] = (
+                token_version, time.monotonic() + self.ttl
+            )
+            while len(self._versions) > self.max_size:
+                self._versions.popitem(last=False)
+
+    def invalidate_user(self, user_id):
+        with self._lock:
+            for key in self._keys_by_user.pop(user_id, ()):
+                self._entries.pop(key, None)
+            self._versions.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_user.clear()
+            self._versions.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+            }
+
+    def _discard(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        user_id = entry[0].pk
+        keys = self._keys_by_user.get(user_id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_user[user_id]
+
+
+token_cache = TokenCache()
@@ -1,7 +1,9 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
+from drf.async_views import AsyncMessageDetailView, AsyncMessageListView
 from drf.users import UserViewSet
 from drf.messages import MessageViewSet
+from drf.profiles import ProfileViewSet
 
 user_router = DefaultRouter()
 user_router.register('', UserViewSet)
@@ -9,7 +11,19 @@ user_router.register('', UserViewSet)
 message_router = DefaultRouter()
 message_router.register('', MessageViewSet)
 
+profile_router = DefaultRouter()
+profile_router.register('', ProfileViewSet, basename='profile')
+
 urlpatterns = [
     path('users/', include(user_router.urls)),
     path('messages/', include(message_router.urls)),
+    path('profiles/', include(profile_router.urls)),
+    path(
+        'async/messages/', AsyncMessageListView.as_view(),
+        name='async-message-list'
+    ),
+    path(
+        'async/messages/<int:pk>/', AsyncMessageDetailView.as_view(),
+        name='async-message-detail'
+    ),
 ]
@@ -1,8 +1,16 @@
+import json
+from asgiref.sync import sync_to_async
+from django.db import connections
 from rest_framework.viewsets import GenericViewSet
-from rest_framework.pagination import LimitOffsetPagination
+from rest_framework.pagination import (
+    BasePagination, CursorPagination, LimitOffsetPagination)
+from rest_framework.response import Response
 from rest_framework.mixins import (
-    CreateModelMixin, ListModelMixin, RetrieveModelMixin)
+    CreateModelMixin, RetrieveModelMixin)
 from .serializers import UserSerializer
+from drf.db_routers import pin_user
+from drf.mixins import (
+    ConditionalGetMixin, ReplicaReadMixin, ValuesListModelMixin)
 from drf.models import User
 
 
@@ -13,10 +21,217 @@ class LimitOffsetPagination(LimitOffsetPagination):
     offset_query_param = 'offset'
     max_limit = 50
 
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """``paginate_queryset()`` on the async ORM."""
+        self.request = request
+        self.limit = self.get_limit(request)
+        if self.limit is None:
+            return None
+
+        self.count = await queryset.acount()
+        self.offset = self.get_offset(request)
+        if self.count > self.limit and self.template is not None:
+            self.display_page_controls = True
+        if self.count == 0 or self.offset > self.count:
+            return []
+        return [
+            row async for row in queryset[self.offset:self.offset + self.limit]
+        ]
+
+
+class NoCountPagination(LimitOffsetPagination):
+    """Limit/offset without ``COUNT(*)``.
+
+    Fetches ``limit + 1`` rows to find out whether there is a next page.
+    """
+
+    template = None
+    # A list validator would scan the rows this class avoids counting.
+    conditional = False
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.limit = self.get_limit(request)
+        if self.limit is None:
+            return None
+
+        self.offset = self.get_offset(request)
+        page = list(queryset[self.offset:self.offset + self.limit + 1])
+        # Lower bound of the real count, enough for get_next_link().
+        self.count = self.offset + len(page)
+        return page[:self.limit]
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.limit = self.get_limit(request)
+        if self.limit is None:
+            return None
+
+        self.offset = self.get_offset(request)
+        page = [
+            row async for row in
+            queryset[self.offset:self.offset + self.limit + 1]
+        ]
+        self.count = self.offset + len(page)
+        return page[:self.limit]
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data
+        })
+
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        del response_schema['properties']['count']
+        response_schema['required'] = ['results']
+        return response_schema
+
+
+class EstimatedCountPagination(LimitOffsetPagination):
+    """Reports the planner's row estimate instead of an exact count.
+
+    Only PostgreSQL keeps statistics good enough for this; other backends,
+    and estimates below ``exact_count_threshold``, use an exact count.
+    """
+
+    exact_count_threshold = 1000
+    conditional = False
+    # get_count() runs EXPLAIN synchronously.
+    apaginate_queryset = None
+
+    def get_count(self, queryset):
+        if connections[queryset.db].vendor == 'postgresql':
+            plan = json.loads(queryset.explain(format='json'))
+            estimate = plan[0]['Plan']['Plan Rows']
+            if estimate >= self.exact_count_threshold:
+                return estimate
+        return super().get_count(queryset)
+
+
+class CachedCountPagination(LimitOffsetPagination):
+    """Takes the count from ``view.get_cached_count()`` when available."""
+
+    conditional = False
+    # view.get_cached_count() reads the user synchronously.
+    apaginate_queryset = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.view = view
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_count(self, queryset):
+        get_cached_count = getattr(self.view, 'get_cached_count', None)
+        if get_cached_count is not None:
+            count = get_cached_count()
+            if count is not None:
+                return count
+        return super().get_count(queryset)
+
+
+class CursorPagination(CursorPagination):
+    page_size = LimitOffsetPagination.default_limit
+    page_size_query_param = LimitOffsetPagination.limit_query_param
+    max_page_size = LimitOffsetPagination.max_limit
+    ordering = 'id'
+    conditional = False
+
+
+class SwitchablePagination(BasePagination):
+    """Delegates to one of ``pagination_classes`` picked per request.
+
+    Clients choose with ``?pagination=<name>``; a request that carries a
+    cursor keeps using cursor pagination so the opaque next/previous links
+    work unchanged. Unknown names fall back to ``default_pagination``.
+    """
+
+    pagination_query_param = 'pagination'
+    pagination_classes = {
+        'offset': LimitOffsetPagination,
+        'cursor': CursorPagination,
+        'nocount': NoCountPagination,
+        'estimate': EstimatedCountPagination,
+        'cached': CachedCountPagination,
+    }
+    default_pagination = 'offset'
+
+    def __init__(self):
+        self.paginator = self.pagination_classes[self.default_pagination]()
+
+    def get_pagination_class(self, request):
+        return self.pagination_classes[self.get_pagination_name(request)]
+
+    def get_pagination_name(self, request):
+        if CursorPagination.cursor_query_param in request.query_params:
+            return 'cursor'
+        name = request.query_params.get(self.pagination_query_param)
+        if name in self.pagination_classes:
+            return name
+        return self.default_pagination
+
+    def paginate_queryset(self, queryset, request, view=None):
+        name = self.get_pagination_name(request)
+        self.paginator = self.pagination_classes[name]()
+        return self.paginator.paginate_queryset(queryset, request, view)
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """Async ``paginate_queryset()``: offset and nocount pages use the
+        async ORM, the other modes run in a worker thread."""
+        name = self.get_pagination_name(request)
+        self.paginator = self.pagination_classes[name]()
+        apaginate = getattr(self.paginator, 'apaginate_queryset', None)
+        if apaginate is None:
+            apaginate = sync_to_async(self.paginator.paginate_queryset)
+        return await apaginate(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        return self.paginator.get_paginated_response(data)
+
+    def get_paginated_response_schema(self, schema):
+        return self.paginator.get_paginated_response_schema(schema)
+
+    def get_results(self, data):
+        return self.paginator.get_results(data)
+
+    def to_html(self):
+        return self.paginator.to_html()
+
+    @property
+    def display_page_controls(self):
+        return getattr(self.paginator, 'display_page_controls', False)
+
+    def get_schema_operation_parameters(self, view):
+        parameters = [{
+            'name': self.pagination_query_param,
+            'required': False,
+            'in': 'query',
+            'description': 'Pagination mode.',
+            'schema': {
+                'type': 'string',
+                'enum': list(self.pagination_classes),
+            },
+        }]
+        seen = {parameter['name'] for parameter in parameters}
+        for pagination_class in self.pagination_classes.values():
+            for parameter in (
+                pagination_class().get_schema_operation_parameters(view)
+            ):
+                if parameter['name'] not in seen:
+                    seen.add(parameter['name'])
+                    parameters.append(parameter)
+        return parameters
+
 
 class UserViewSet(
-        CreateModelMixin, ListModelMixin, RetrieveModelMixin, GenericViewSet
+        ReplicaReadMixin, ConditionalGetMixin, CreateModelMixin,
+        ValuesListModelMixin, RetrieveModelMixin, GenericViewSet
         ):
-    queryset = User.objects.all()
+    def perform_create(self, serializer):
+        super().perform_create(serializer)
+        # The new user authenticates with the token from this response.
+        pin_user(serializer.instance.pk)
+
+    queryset = User.objects.order_by('id')
     serializer_class = UserSerializer
-    pagination_class = LimitOffsetPagination
+    pagination_class = SwitchablePagination